@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Approximate Execution
+=====================
+
+Stratified reservoir samples and estimators for an interactive fast path:
+indicators are computed on a bounded sample, every estimate carries a
+confidence interval, and the exact computation runs in the background and
+replaces the approximate answer once it is done.
+
+- StratifiedReservoir: one reservoir of at most ``per_stratum`` rows per
+  (month x category) stratum, maintained incrementally with Algorithm R and
+  vectorized per batch, so new submissions are folded in without revisiting
+  old ones. Stratum sizes are tracked exactly, so per-month and per-category
+  counts (and the overall total) carry no sampling error.
+- ReservoirSample: the sampled rows with design weights (``_weight`` =
+  stratum size / stratum sample size) and stratified estimators for totals
+  and ratios (proportions, means) with finite-population-corrected standard
+  errors.
+- ExactRefresher: runs the exact computation on a background thread,
+  coalescing requests for the same key, bounding the queued runs and keeping
+  the latest results.
+
+Usage:
+    reservoir = StratifiedReservoir(per_stratum=200)
+    reservoir.update(new_submissions)
+    sample = reservoir.sample()
+    share = sample.ratio(is_positive, np.ones(len(sample)))   # Estimate
+    share.value, share.lower, share.upper
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from statistics import NormalDist
+from typing import Dict, Any, Callable, Hashable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ingest_log import IngestLog, row_keys
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PER_STRATUM = 200
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MAX_PENDING = 8
+STRATUM_SEPARATOR = '|'
+
+
+class Estimate:
+    """
+    A point estimate with its standard error and a normal confidence interval.
+    """
+
+    def __init__(self, value: float, standard_error: float = 0.0, confidence: float = DEFAULT_CONFIDENCE):
+        self.value = float(value)
+        self.standard_error = float(standard_error)
+        self.confidence = confidence
+
+    @property
+    def margin(self) -> float:
+        """Half-width of the confidence interval."""
+        return NormalDist().inv_cdf((1 + self.confidence) / 2) * self.standard_error
+
+    @property
+    def lower(self) -> float:
+        return self.value - self.margin
+
+    @property
+    def upper(self) -> float:
+        return self.value + self.margin
+
+    @property
+    def relative_error(self) -> float:
+        """Margin relative to the value (0 for exact values)."""
+        if self.margin == 0:
+            return 0.0
+        return self.margin / abs(self.value) if self.value else float('inf')
+
+    def scaled(self, factor: float, offset: float = 0.0) -> 'Estimate':
+        """The estimate of ``factor * x + offset``."""
+        return Estimate(self.value * factor + offset, self.standard_error * abs(factor), self.confidence)
+
+    def to_dict(self, precision: Optional[int] = None) -> Dict[str, Any]:
+        """Interval bounds (rounded to ``precision`` decimals when given), level and standard error."""
+        def rounded(value: float, extra: int = 0) -> float:
+            return round(value, precision + extra) if precision is not None else value
+        return {
+            'lower': rounded(self.lower),
+            'upper': rounded(self.upper),
+            'level': self.confidence,
+            'standardError': rounded(self.standard_error, 2)
+        }
+
+
+def stratum_keys(data: pd.DataFrame, date_column: Optional[str] = 'date',
+                 strata: Sequence[str] = ('category',)) -> np.ndarray:
+    """
+    Stratum key per row: the 'YYYY-MM' month of ``date_column`` and the ``strata`` values.
+
+    Missing columns count as one value, so frames without dates or categories
+    still get well-defined (coarser) strata. Each component is factorized once
+    and keys are formatted per distinct combination only.
+    """
+    components = []
+    if date_column and date_column in data.columns:
+        dates = pd.to_datetime(data[date_column])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        months = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+        codes, uniques = pd.factorize(months, use_na_sentinel=False)
+        labels = [str(month) for month in uniques]
+        components.append((codes, labels))
+    else:
+        components.append((np.zeros(len(data), dtype=np.int64), ['all']))
+    for column in strata:
+        if column in data.columns:
+            codes, uniques = pd.factorize(data[column], use_na_sentinel=False)
+            components.append((codes, ['' if pd.isna(value) else str(value) for value in uniques]))
+
+    combined = np.zeros(len(data), dtype=np.int64)
+    for codes, labels in components:
+        combined = combined * len(labels) + codes
+    distinct, inverse = np.unique(combined, return_inverse=True)
+    keys = []
+    for value in distinct.tolist():
+        parts = []
+        for codes, labels in reversed(components):
+            value, code = divmod(value, len(labels))
+            parts.append(labels[code])
+        keys.append(STRATUM_SEPARATOR.join(reversed(parts)))
+    return np.array(keys, dtype=object)[inverse.reshape(-1)]
+
+
+class ReservoirSample:
+    """
+    A stratified sample with design weights and stratified estimators.
+    """
+
+    def __init__(self, frame: pd.DataFrame, stratum_sizes: Dict[str, int],
+                 confidence: float = DEFAULT_CONFIDENCE):
+        """
+        Args:
+            frame: Sampled rows with a ``_stratum`` column
+            stratum_sizes: Population size (rows seen) per stratum key
+            confidence: Confidence level of the reported intervals
+        """
+        frame = frame.reset_index(drop=True)
+        self.codes, strata = pd.factorize(frame['_stratum'])
+        self.strata = list(strata)
+        self.population_sizes = np.array([stratum_sizes[key] for key in self.strata], dtype=np.float64)
+        self.sample_sizes = np.bincount(self.codes, minlength=len(self.strata)).astype(np.float64)
+        self.population = int(sum(stratum_sizes.values()))
+        self.confidence = confidence
+        weights = (self.population_sizes / self.sample_sizes)[self.codes] if len(frame) else np.empty(0)
+        self.frame = frame.assign(_weight=weights, _row=np.arange(len(frame)))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _expand(self, values: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Values over the whole sample; rows outside ``rows`` (a domain) contribute zero."""
+        values = np.asarray(values, dtype=np.float64)
+        if rows is None:
+            return np.nan_to_num(values)
+        full = np.zeros(len(self.frame), dtype=np.float64)
+        full[np.asarray(rows, dtype=np.int64)] = np.nan_to_num(values)
+        return full
+
+    def _total(self, y: np.ndarray) -> Estimate:
+        n = self.sample_sizes
+        sums = np.bincount(self.codes, weights=y, minlength=len(n))
+        squares = np.bincount(self.codes, weights=y * y, minlength=len(n))
+        means = np.divide(sums, n, out=np.zeros_like(sums), where=n > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variances = np.where(n > 1, (squares - n * means ** 2) / (n - 1), 0.0)
+        variances = np.clip(variances, 0.0, None)
+        population = self.population_sizes
+        # Stratified total with the finite population correction (1 - n_h / N_h)
+        variance = np.sum(np.divide(population ** 2 * (1 - n / population) * variances, n,
+                                    out=np.zeros_like(n), where=n > 0))
+        return Estimate(float(np.sum(population * means)), float(np.sqrt(variance)), self.confidence)
+
+    def total(self, y: np.ndarray, rows: Optional[np.ndarray] = None) -> Estimate:
+        """
+        Estimate the population total of ``y``.
+
+        Args:
+            y: Values per sampled row (per row of ``rows`` when given); NaN counts as 0
+            rows: Sample row positions (``_row``) the values belong to, e.g. a filtered subset
+
+        Returns:
+            The estimate
+        """
+        return self._total(self._expand(y, rows))
+
+    def ratio(self, y: np.ndarray, x: np.ndarray, rows: Optional[np.ndarray] = None) -> Optional[Estimate]:
+        """
+        Estimate the ratio of two population totals (a proportion when ``y`` is a subset of ``x``).
+
+        The standard error is linearized: the variance of the total of ``y - R x``
+        divided by the squared estimated total of ``x``.
+
+        Returns:
+            The estimate, or None when ``x`` has no weight in the sample
+        """
+        y, x = self._expand(y, rows), self._expand(x, rows)
+        denominator = self._total(x).value
+        if denominator == 0:
+            return None
+        ratio = self._total(y).value / denominator
+        residual = self._total(y - ratio * x)
+        return Estimate(ratio, residual.standard_error / abs(denominator), self.confidence)
+
+    def proportion(self, mask: np.ndarray, rows: Optional[np.ndarray] = None) -> Optional[Estimate]:
+        """Estimate the share of rows (of the domain ``rows``) where ``mask`` holds."""
+        mask = np.asarray(mask, dtype=np.float64)
+        return self.ratio(mask, np.ones(len(mask)), rows)
+
+    def mean(self, values: np.ndarray, rows: Optional[np.ndarray] = None) -> Optional[Estimate]:
+        """Estimate the population mean of ``values`` over the rows where they are present."""
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        return self.ratio(np.where(present, values, 0.0), present.astype(np.float64), rows)
+
+
+class StratifiedReservoir:
+    """
+    Per-stratum reservoir samples maintained incrementally.
+    """
+
+    def __init__(self, per_stratum: int = DEFAULT_PER_STRATUM, date_column: Optional[str] = 'date',
+                 strata: Sequence[str] = ('category',), seed: Optional[int] = None):
+        """
+        Initialize an empty reservoir.
+
+        Args:
+            per_stratum: Maximum sampled rows per stratum
+            date_column: Date column the month strata are derived from
+            strata: Further stratification columns
+            seed: Random seed (for reproducible samples)
+        """
+        self.per_stratum = int(per_stratum)
+        self.date_column = date_column
+        self.strata = list(strata)
+        self.seen: Dict[str, int] = {}
+        self.ingested = IngestLog()
+        self.rows = pd.DataFrame({'_stratum': pd.Series(dtype=object), '_slot': pd.Series(dtype=np.int64)})
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def population(self) -> int:
+        return int(sum(self.seen.values()))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def update(self, data: pd.DataFrame, only_new: bool = False) -> 'StratifiedReservoir':
+        """
+        Fold new rows into the per-stratum reservoirs.
+
+        Row ``t`` of a stratum's stream (1-based) fills slot ``t - 1`` while the
+        reservoir is not full, and afterwards replaces a uniformly drawn slot
+        ``j < t`` when ``j < per_stratum``. All draws of a batch are made at once;
+        when several rows hit the same slot, the latest one wins, exactly as if
+        they had been processed one by one.
+
+        Args:
+            data: New rows
+            only_new: Fold in only the submissions (by ID) not added by an earlier
+                ``only_new`` update, and record them (lets callers pass the full,
+                growing frame; late-synced submissions are still added)
+
+        Returns:
+            The reservoir itself
+        """
+        if only_new and len(data):
+            data = data[self.ingested.claim(row_keys(data))]
+        if len(data) == 0:
+            return self
+
+        keys = stratum_keys(data, self.date_column, self.strata)
+        codes, uniques = pd.factorize(keys)
+        seen_before = np.array([self.seen.get(key, 0) for key in uniques], dtype=np.int64)
+        rank = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+        position = seen_before[codes] + rank + 1
+
+        draws = (self._rng.random(len(position)) * position).astype(np.int64)
+        filling = position <= self.per_stratum
+        slots = np.where(filling, position - 1, draws)
+        accepted = np.flatnonzero(filling | (draws < self.per_stratum))
+
+        batch = data.iloc[accepted].assign(_stratum=keys[accepted], _slot=slots[accepted])
+        combined = pd.concat([self.rows, batch], ignore_index=True) if len(self.rows) else batch.reset_index(drop=True)
+        self.rows = combined.drop_duplicates(['_stratum', '_slot'], keep='last').reset_index(drop=True)
+
+        for key, count in zip(uniques, np.bincount(codes, minlength=len(uniques))):
+            self.seen[key] = self.seen.get(key, 0) + int(count)
+        return self
+
+    def sample(self, confidence: float = DEFAULT_CONFIDENCE) -> ReservoirSample:
+        """The current sample with design weights."""
+        return ReservoirSample(self.rows.drop(columns='_slot'), self.seen, confidence)
+
+    def month_counts(self) -> Dict[str, int]:
+        """Exact row counts per 'YYYY-MM' month (from the stratum sizes)."""
+        counts: Dict[str, int] = {}
+        for key, count in self.seen.items():
+            month = key.split(STRATUM_SEPARATOR, 1)[0]
+            counts[month] = counts.get(month, 0) + count
+        return dict(sorted(counts.items()))
+
+    def save(self, path: str):
+        """
+        Persist the reservoir as a single npz file (written atomically).
+
+        Numeric, boolean and datetime columns of the sampled rows are stored as arrays;
+        other columns go into the JSON metadata with their dtype, so loading never
+        unpickles anything.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {}
+        columns = []
+        for position, column in enumerate(self.rows.columns):
+            values = self.rows[column]
+            spec = {'name': column, 'dtype': str(values.dtype)}
+            if isinstance(values.dtype, pd.DatetimeTZDtype):
+                spec['tz'] = str(values.dt.tz)
+                values = values.dt.tz_convert('UTC').dt.tz_localize(None)
+            if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'biufmM':
+                arrays[f'column_{position}'] = values.to_numpy()
+            else:
+                spec['values'] = [None if _is_missing(value) else value for value in values.tolist()]
+            columns.append(spec)
+        meta = {
+            'per_stratum': self.per_stratum,
+            'date_column': self.date_column,
+            'strata': self.strata,
+            'seen': self.seen,
+            'columns': columns,
+            'rng_state': self._rng.bit_generator.state
+        }
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, ingested=self.ingested.hashes, meta=np.array(json.dumps(meta, default=str)), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'StratifiedReservoir':
+        """Load a reservoir written with ``save``."""
+        with np.load(path) as stored:
+            meta = json.loads(str(stored['meta']))
+            reservoir = cls(meta['per_stratum'], meta['date_column'], meta['strata'])
+            reservoir.seen = meta['seen']
+            reservoir.ingested = IngestLog(stored['ingested'])
+            rows = {}
+            for position, spec in enumerate(meta['columns']):
+                if 'values' not in spec:
+                    values = pd.Series(stored[f'column_{position}'])
+                    if 'tz' in spec:
+                        values = values.dt.tz_localize('UTC').dt.tz_convert(spec['tz'])
+                else:
+                    values = pd.Series(spec['values'], dtype=object)
+                    if spec['dtype'] != 'object':
+                        try:
+                            values = values.astype(spec['dtype'])
+                        except (TypeError, ValueError):
+                            logger.warning(f"Sample column {spec['name']!r} restored as object, not {spec['dtype']}")
+                rows[spec['name']] = values
+        reservoir.rows = pd.DataFrame(rows)
+        reservoir._rng.bit_generator.state = meta['rng_state']
+        return reservoir
+
+
+def _is_missing(value: Any) -> bool:
+    """Whether a scalar cell is missing (list/dict answers never are)."""
+    return not isinstance(value, (list, dict, set, tuple)) and bool(pd.isna(value))
+
+
+class ExactRefresher:
+    """
+    Background runner for the exact computations that replace approximate answers.
+    """
+
+    def __init__(self, max_workers: int = 1, max_results: int = 32, max_pending: int = DEFAULT_MAX_PENDING):
+        """
+        Args:
+            max_workers: Exact computations running at the same time
+            max_results: Completed results kept (least recently stored dropped first)
+            max_pending: Computations running or queued at most; further submissions are dropped
+        """
+        self.max_workers = max_workers
+        self.max_results = max_results
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._running: Dict[Hashable, Future] = {}
+        self._results: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def result(self, key: Hashable) -> Optional[Any]:
+        """The completed exact result for ``key``, or None while it is pending (or never ran)."""
+        with self._lock:
+            return self._results.get(key)
+
+    def pending(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._running
+
+    def submit(self, key: Optional[Hashable], fn: Callable[[], Any],
+               callback: Optional[Callable[[Any], None]] = None) -> Optional[Future]:
+        """
+        Run ``fn`` in the background unless a run for ``key`` is already in progress.
+
+        Args:
+            key: Identifies the computation; concurrent submissions share one run (None runs
+                on its own and its result only reaches ``callback``)
+            fn: The exact computation
+            callback: Called with the result once it is available
+
+        Returns:
+            The future of the (possibly already running) computation, or None when
+            ``max_pending`` computations are already running or queued
+        """
+        keep = key is not None
+        key = key if keep else object()
+        with self._lock:
+            future = self._running.get(key)
+            started = future is None
+            if started and len(self._running) >= self.max_pending:
+                target = f" for {key!r}" if keep else ""
+                logger.warning(f"{len(self._running)} exact computations pending; not scheduling another{target}")
+                return None
+            if started:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='exact-refresh')
+                future = self._executor.submit(fn)
+                self._running[key] = future
+        # Registered outside the lock: a future that has already finished runs the
+        # callback immediately, and ``_finish`` takes the lock itself
+        if started:
+            future.add_done_callback(lambda done: self._finish(key, done, keep))
+        if callback is not None:
+            def notify(done: Future):
+                if done.exception() is None:
+                    callback(done.result())
+            future.add_done_callback(notify)
+        return future
+
+    def _finish(self, key: Hashable, future: Future, keep: bool = True):
+        with self._lock:
+            if self._running.get(key) is future:
+                del self._running[key]
+            if future.exception() is not None:
+                logger.error(f"Exact computation for {key!r} failed: {future.exception()}")
+                return
+            if not keep:
+                return
+            self._results[key] = future.result()
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Categorical Kernels
+===================
+
+Dictionary-encodes low-cardinality columns (category, status, gender, region,
+...) into integer codes once, then answers counts, crosstabs, ratios and
+percentages with ``np.bincount`` on the codes instead of ``value_counts()``,
+``pd.crosstab`` or filtered copies such as ``len(data[data['gender'] == 'male'])``.
+
+Results match the pandas equivalents: value counts are ordered by count with
+ties in order of first appearance, crosstabs have sorted labels and skip
+missing values.
+"""
+
+from typing import Any, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class EncodedColumn(NamedTuple):
+    """Integer codes (-1 for missing) and the sorted labels they index into."""
+    codes: np.ndarray
+    categories: np.ndarray
+
+    @property
+    def n_categories(self) -> int:
+        return len(self.categories)
+
+
+def encode(values: pd.Series) -> EncodedColumn:
+    """Dictionary-encode a column, reusing the codes of categorical columns."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categories = values.cat.categories
+        if not values.cat.ordered and not categories.is_monotonic_increasing:
+            values = values.cat.reorder_categories(categories.sort_values())
+        return EncodedColumn(values.cat.codes.to_numpy(dtype=np.int64), values.cat.categories.to_numpy())
+
+    codes, categories = pd.factorize(values, sort=True, use_na_sentinel=True)
+    return EncodedColumn(codes.astype(np.int64, copy=False), np.asarray(categories))
+
+
+def bincount(encoded: EncodedColumn, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Count rows per category, optionally restricted to a boolean row mask."""
+    codes = encoded.codes if mask is None else encoded.codes[mask]
+    return np.bincount(codes[codes >= 0], minlength=encoded.n_categories)
+
+
+def value_counts(encoded: EncodedColumn, mask: Optional[np.ndarray] = None) -> pd.Series:
+    """Equivalent of ``Series.value_counts()`` computed from the codes."""
+    counts = bincount(encoded, mask)
+    codes = encoded.codes if mask is None else encoded.codes[mask]
+
+    # Break ties by first appearance, like pandas does
+    first_seen = np.full(encoded.n_categories, len(codes), dtype=np.int64)
+    valid = np.flatnonzero(codes >= 0)
+    np.minimum.at(first_seen, codes[valid], valid)
+
+    present = np.flatnonzero(counts)
+    order = present[np.lexsort((first_seen[present], -counts[present]))]
+    return pd.Series(counts[order], index=pd.Index(encoded.categories[order]), name='count')
+
+
+def crosstab(rows: EncodedColumn, columns: EncodedColumn) -> pd.DataFrame:
+    """Equivalent of ``pd.crosstab(rows, columns)`` computed with a single bincount."""
+    valid = (rows.codes >= 0) & (columns.codes >= 0)
+    table = np.bincount(
+        rows.codes[valid] * columns.n_categories + columns.codes[valid],
+        minlength=rows.n_categories * columns.n_categories
+    ).reshape(rows.n_categories, columns.n_categories)
+
+    keep_rows, keep_columns = table.any(axis=1), table.any(axis=0)
+    return pd.DataFrame(
+        table[keep_rows][:, keep_columns],
+        index=pd.Index(rows.categories[keep_rows]),
+        columns=pd.Index(columns.categories[keep_columns])
+    )
+
+
+def count_of(encoded: EncodedColumn, value: Any, mask: Optional[np.ndarray] = None) -> int:
+    """Number of rows equal to ``value`` without materialising a filtered copy."""
+    position = np.searchsorted(encoded.categories, value) if encoded.n_categories else 0
+    if position >= encoded.n_categories or encoded.categories[position] != value:
+        return 0
+    codes = encoded.codes if mask is None else encoded.codes[mask]
+    return int(np.count_nonzero(codes == position))
+
+
+def percentage_of(encoded: EncodedColumn, value: Any, mask: Optional[np.ndarray] = None) -> float:
+    """Percentage of rows (missing values included in the denominator) equal to ``value``."""
+    total = len(encoded.codes) if mask is None else int(np.count_nonzero(mask))
+    return count_of(encoded, value, mask) / total * 100 if total > 0 else 0
+
+
+def ratio_of(encoded: EncodedColumn, numerator: Any, denominator: Any) -> Optional[float]:
+    """Ratio between the counts of two values, or None when the denominator count is zero."""
+    denominator_count = count_of(encoded, denominator)
+    if denominator_count == 0:
+        return None
+    return count_of(encoded, numerator) / denominator_count
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Correlation Kernels
+===================
+
+Pearson correlation screens over very wide variable sets without building the
+N x N matrix that ``DataFrame.corr()`` materialises.
+
+Columns are standardised once into a float32 copy (missing values stay NaN).
+The upper triangle of the matrix is then computed in square tiles of
+``block_size`` variables with float32 matrix products, and every tile is
+streamed through the threshold / top-k filter and the summary statistics
+before the next one is computed.
+
+Missing values are handled with masks, giving pandas' pairwise-complete
+correlations: for a tile with missing values the co-observed counts, sums and
+sums of squares come from products with the 0/1 observation masks; tiles of
+fully observed columns need a single product. Correlations are accurate to
+float32 precision (about 1e-6).
+
+The working memory (standardised copy plus tile buffers) stays under
+``max_memory``; the tile size is derived from it.
+
+Usage:
+    screen = screen_correlations(frame, threshold=0.7, top_k=100)
+    matrix = correlation_matrix(frame)  # small variable sets only
+"""
+
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_MEMORY = 512 * 1024 * 1024
+MIN_BLOCK_SIZE = 32
+MAX_BLOCK_SIZE = 512
+# Co-observed variances below this fraction of the sum of squares are treated as zero
+VARIANCE_TOLERANCE = 1e-5
+
+
+class StandardizedColumns(NamedTuple):
+    """Standardised float32 values (Fortran order, NaN where missing) and their column names."""
+    values: np.ndarray
+    names: List[str]
+    has_missing: np.ndarray
+
+
+def standardize(frame: pd.DataFrame) -> StandardizedColumns:
+    """
+    Standardise each numeric column (mean 0, sample std 1 over its observed values) into float32.
+
+    Columns with fewer than two observed values or no variance are left all-NaN, so
+    their correlations are NaN as in pandas.
+    """
+    values = np.empty((len(frame), frame.shape[1]), dtype=np.float32, order='F')
+    has_missing = np.zeros(frame.shape[1], dtype=bool)
+    for position in range(frame.shape[1]):
+        column = frame.iloc[:, position].to_numpy(dtype=np.float64, na_value=np.nan)
+        observed = ~np.isnan(column)
+        count = int(observed.sum())
+        std = column[observed].std(ddof=1) if count > 1 else 0.0
+        if not std > 0:
+            values[:, position] = np.nan
+            has_missing[position] = True
+            continue
+        values[:, position] = (column - column[observed].mean()) / std
+        has_missing[position] = count < len(column)
+    return StandardizedColumns(values, [str(name) for name in frame.columns], has_missing)
+
+
+def block_size_for(rows: int, columns: int, max_memory: int = DEFAULT_MAX_MEMORY) -> int:
+    """
+    Largest tile size whose buffers, with the standardised copy, fit ``max_memory`` bytes.
+
+    Per tile of ``b`` variables the kernel holds 6 (rows x b) float32 operands (plus a
+    transient NaN mask) and about 160 * b * b bytes of products and intermediate results.
+
+    Raises:
+        ValueError: When even the smallest tile does not fit
+    """
+    available = max_memory - 4 * rows * columns
+    block = min(MAX_BLOCK_SIZE, max(columns, 1))
+    while block > MIN_BLOCK_SIZE and _tile_memory(rows, block) > available:
+        block = max(MIN_BLOCK_SIZE, block // 2)
+    if _tile_memory(rows, block) > available:
+        raise ValueError(
+            f"max_memory={max_memory} is too small for {rows} rows x {columns} variables "
+            f"(needs at least {4 * rows * columns + _tile_memory(rows, block)} bytes)"
+        )
+    return block
+
+
+def _tile_memory(rows: int, block: int) -> int:
+    return 28 * rows * block + 160 * block * block
+
+
+def _operands(values: np.ndarray) -> np.ndarray:
+    """``[zero-filled values | their squares | 0/1 observation mask]`` of a column block."""
+    width = values.shape[1]
+    operands = np.empty((len(values), 3 * width), dtype=np.float32, order='F')
+    mask = np.isnan(values)
+    np.copyto(operands[:, :width], values)
+    operands[:, :width][mask] = 0
+    np.multiply(operands[:, :width], operands[:, :width], out=operands[:, width:2 * width])
+    np.logical_not(mask, out=operands[:, 2 * width:], casting='unsafe')
+    return operands
+
+
+def correlation_tiles(columns: StandardizedColumns,
+                      block_size: int) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Yield ``(row_start, column_start, tile)`` for the tiles on and above the diagonal.
+
+    Tiles are float64 arrays of pairwise-complete correlations (NaN where undefined).
+    """
+    values = columns.values
+    n_columns = values.shape[1]
+    for row_start in range(0, n_columns, block_size):
+        row_block = slice(row_start, row_start + block_size)
+        left = values[:, row_block]
+        left_missing = bool(columns.has_missing[row_block].any())
+        left_operands = _operands(left) if left_missing else None
+        for column_start in range(row_start, n_columns, block_size):
+            column_block = slice(column_start, column_start + block_size)
+            right = values[:, column_block]
+            if not left_missing and not columns.has_missing[column_block].any():
+                tile = (left.T @ right).astype(np.float64) / (len(values) - 1)
+                yield row_start, column_start, np.clip(tile, -1.0, 1.0)
+                continue
+
+            left_stack = left_operands if left_operands is not None else _operands(left)
+            right_stack = _operands(right)
+            height, width = left.shape[1], right.shape[1]
+            # Co-observed sums of x and x^2 and pair counts, then sums of y and y^2, then of x*y
+            x_sums = (left_stack.T @ right_stack[:, 2 * width:]).astype(np.float64)
+            y_sums = (left_stack[:, 2 * height:].T @ right_stack[:, :2 * width]).astype(np.float64)
+            sum_xy = (left_stack[:, :height].T @ right_stack[:, :width]).astype(np.float64)
+            sum_x, sum_xx, count = np.vsplit(x_sums, 3)
+            sum_y, sum_yy = y_sums[:, :width], y_sums[:, width:]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                covariance = sum_xy - sum_x * sum_y / count
+                variance_x = sum_xx - sum_x * sum_x / count
+                variance_y = sum_yy - sum_y * sum_y / count
+                tile = covariance / np.sqrt(variance_x * variance_y)
+            undefined = ((count < 2) | (variance_x <= VARIANCE_TOLERANCE * sum_xx)
+                         | (variance_y <= VARIANCE_TOLERANCE * sum_yy))
+            tile[undefined] = np.nan
+            yield row_start, column_start, np.clip(tile, -1.0, 1.0)
+
+
+def correlation_matrix(frame: pd.DataFrame, max_memory: int = DEFAULT_MAX_MEMORY) -> pd.DataFrame:
+    """
+    Full pairwise-complete correlation matrix (``frame.corr()`` equivalent) from the tiles.
+
+    Holds the float64 N x N result, so use it for variable sets small enough to report.
+    """
+    columns = standardize(frame)
+    size = len(columns.names)
+    matrix = np.empty((size, size), dtype=np.float64)
+    for row_start, column_start, tile in correlation_tiles(
+            columns, block_size_for(len(frame), size, max_memory)):
+        rows, cols = tile.shape
+        matrix[row_start:row_start + rows, column_start:column_start + cols] = tile
+        matrix[column_start:column_start + cols, row_start:row_start + rows] = tile.T
+    defined = ~np.isnan(np.diag(matrix))
+    matrix[np.diag_indices(size)] = np.where(defined, 1.0, np.nan)
+    return pd.DataFrame(matrix, index=columns.names, columns=columns.names)
+
+
+def screen_correlations(frame: pd.DataFrame, threshold: float = 0.7, top_k: Optional[int] = None,
+                        max_memory: int = DEFAULT_MAX_MEMORY) -> Dict[str, Any]:
+    """
+    Variable pairs with ``|r| >= threshold`` (optionally only the ``top_k`` strongest) and the
+    mean and max over all pairs, without holding the correlation matrix.
+
+    Args:
+        frame: Numeric columns to correlate (rows are observations)
+        threshold: Minimum absolute correlation of reported pairs
+        top_k: Keep only the k (>= 1) pairs with the largest absolute correlation
+        max_memory: Working memory cap in bytes (standardised copy plus tile buffers)
+
+    Returns:
+        Dict with ``pairs`` (variable1, variable2, correlation) in matrix order, ``total_pairs``,
+        ``mean_correlation`` and ``max_correlation`` (NaN when any pair is undefined, like the
+        matrix-based summary) and the ``block_size`` used
+    """
+    columns = standardize(frame)
+    size = len(columns.names)
+    block_size = block_size_for(len(frame), size, max_memory)
+    rows = np.empty(0, dtype=np.int64)
+    cols = np.empty(0, dtype=np.int64)
+    kept = np.empty(0, dtype=np.float64)
+    total = 0
+    total_sum = 0.0
+    maximum = -np.inf
+
+    for row_start, column_start, tile in correlation_tiles(columns, block_size):
+        tile_rows, tile_cols = np.indices(tile.shape)
+        tile_rows += row_start
+        tile_cols += column_start
+        upper = tile_rows < tile_cols
+        values = tile[upper]
+        total += len(values)
+        if len(values):
+            # NaN propagates, as in the summary of a full matrix
+            total_sum += values.sum()
+            maximum = np.maximum(maximum, values.max())
+
+        strength = np.abs(values)
+        selected = strength >= threshold
+        if top_k is not None and len(kept) >= top_k:
+            selected &= strength > np.sort(np.abs(kept))[-top_k]
+        if not selected.any():
+            continue
+        rows = np.concatenate([rows, tile_rows[upper][selected]])
+        cols = np.concatenate([cols, tile_cols[upper][selected]])
+        kept = np.concatenate([kept, values[selected]])
+        if top_k is not None and len(kept) > top_k:
+            best = np.argpartition(-np.abs(kept), top_k - 1)[:top_k]
+            rows, cols, kept = rows[best], cols[best], kept[best]
+
+    order = np.lexsort((cols, rows))
+    return {
+        'pairs': [
+            (columns.names[i], columns.names[j], float(value))
+            for i, j, value in zip(rows[order], cols[order], kept[order])
+        ],
+        'total_pairs': total,
+        'mean_correlation': float(total_sum / total) if total else np.nan,
+        'max_correlation': float(maximum) if total else np.nan,
+        'block_size': block_size
+    }
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Count Cube
+==========
+
+A dense array of case counts over category x status x gender x region x month,
+built in a single pass with ``np.bincount`` over the combined dictionary codes.
+
+Totals, percentages, ratios, category/status distributions, stacked bars, the
+regional choropleth and the monthly series are all projections of the cube
+(sums along axes), so refreshing every output costs O(cube size) rather than
+O(rows x outputs).
+
+Every dimension keeps one extra trailing slot for missing values so totals stay
+exact. Labels are kept in insertion order, which lets ``update()`` append new
+labels and pad the array when new submissions arrive.
+
+A stored cube is refreshed with ``update(data, only_new=True)``: the cube keeps
+an ingest log of the submission IDs it has counted, so passing the full dataset
+again (or retrying a run) adds only the rows it has not seen.
+
+Usage:
+    cube = CountCube.build(data, only_new=True)
+    cube.save('/var/lib/gconnector/cubes/indicator_123.npz')
+
+    cube = CountCube.load('/var/lib/gconnector/cubes/indicator_123.npz')
+    cube.update(data, only_new=True)
+    cube.counts('status')
+"""
+
+import json
+import os
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import categorical_kernels as kernels
+from ingest_log import IngestLog, row_keys
+
+DEFAULT_DIMENSIONS = ('category', 'status', 'gender', 'region', 'month')
+
+
+def _month_labels(data: pd.DataFrame) -> pd.Series:
+    """'YYYY-MM' labels for the date column (reusing the prepared ``_month`` key when present)."""
+    if '_month' in data.columns:
+        months = data['_month']
+    else:
+        months = pd.to_datetime(data['date']).dt.to_period('M')
+    return months.astype(str).where(months.notna(), None)
+
+
+class CountCube:
+    """
+    Dense count array over a fixed set of dimensions.
+    """
+
+    def __init__(self, dimensions: Sequence[str] = DEFAULT_DIMENSIONS,
+                 labels: Optional[Dict[str, List[Any]]] = None, counts: Optional[np.ndarray] = None,
+                 ingested: Optional[IngestLog] = None):
+        """
+        Initialize an empty (or preloaded) cube.
+
+        Args:
+            dimensions: Dimension names; ``month`` is derived from the ``date`` column
+            labels: Per-dimension labels in insertion order (missing slot excluded)
+            counts: Count array of shape ``len(labels[d]) + 1`` per dimension
+            ingested: Submissions already counted (see ``update(only_new=True)``)
+        """
+        self.dimensions = list(dimensions)
+        self.labels = labels or {dimension: [] for dimension in self.dimensions}
+        shape = tuple(len(self.labels[dimension]) + 1 for dimension in self.dimensions)
+        self.counts_array = counts if counts is not None else np.zeros(shape, dtype=np.int64)
+        self.ingested = ingested if ingested is not None else IngestLog()
+
+    @classmethod
+    def build(cls, data: pd.DataFrame, dimensions: Optional[Sequence[str]] = None,
+              weights: Optional[np.ndarray] = None, only_new: bool = False) -> 'CountCube':
+        """
+        Build a cube from a DataFrame in one pass.
+
+        Args:
+            data: Case data
+            dimensions: Dimensions to use (defaults to the DEFAULT_DIMENSIONS present in ``data``)
+            weights: Optional row weights (e.g. sampling weights); see ``update``
+            only_new: Record the submissions counted so later updates skip them; see ``update``
+
+        Returns:
+            The cube
+        """
+        if dimensions is None:
+            dimensions = [
+                dimension for dimension in DEFAULT_DIMENSIONS
+                if dimension in data.columns or (dimension == 'month' and 'date' in data.columns)
+            ]
+        cube = cls(dimensions)
+        cube.update(data, weights, only_new)
+        return cube
+
+    def _column(self, data: pd.DataFrame, dimension: str) -> pd.Series:
+        if dimension == 'month':
+            return _month_labels(data)
+        return data[dimension]
+
+    def update(self, data: pd.DataFrame, weights: Optional[np.ndarray] = None,
+               only_new: bool = False) -> 'CountCube':
+        """
+        Add new rows to the cube, extending dimensions with any labels not seen before.
+
+        Args:
+            data: New case rows
+            weights: Optional row weights; each row then counts as its weight and
+                every cell is rounded to the nearest whole count (estimated counts)
+            only_new: Count only the submissions (by ID) not counted by an earlier
+                ``only_new`` update, and record them, so re-running with the full
+                dataset is idempotent
+
+        Returns:
+            The cube itself
+        """
+        if only_new and len(data):
+            new = self.ingested.claim(row_keys(data, ignore=['_month']))
+            data = data[new]
+            if weights is not None:
+                weights = np.asarray(weights)[new]
+        if len(data) == 0:
+            return self
+
+        positions = []
+        for dimension in self.dimensions:
+            encoded = kernels.encode(self._column(data, dimension))
+            known = {label: i for i, label in enumerate(self.labels[dimension])}
+            new_labels = [label for label in encoded.categories.tolist() if label not in known]
+            for label in new_labels:
+                known[label] = len(known)
+            self.labels[dimension].extend(new_labels)
+
+            # Map batch codes to cube positions; missing values go to the trailing slot
+            lookup = np.array([known[label] for label in encoded.categories.tolist()] + [len(known)], dtype=np.int64)
+            positions.append(lookup[encoded.codes])
+
+        # Grow the array: existing labels keep their positions and the old
+        # missing slot moves to the new last position on every axis
+        shape = tuple(len(self.labels[dimension]) + 1 for dimension in self.dimensions)
+        if shape != self.counts_array.shape:
+            grown = np.zeros(shape, dtype=np.int64)
+            moves = [np.append(np.arange(old - 1), new - 1) for old, new in zip(self.counts_array.shape, shape)]
+            grown[np.ix_(*moves)] = self.counts_array
+            self.counts_array = grown
+
+        flat = np.ravel_multi_index(positions, shape) if positions else np.zeros(len(data), dtype=np.int64)
+        if weights is None:
+            self.counts_array += np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        else:
+            weighted = np.bincount(flat, weights=np.asarray(weights, dtype=np.float64), minlength=int(np.prod(shape)))
+            self.counts_array += np.rint(weighted).astype(np.int64).reshape(shape)
+        return self
+
+    def _axis(self, dimension: str) -> int:
+        return self.dimensions.index(dimension)
+
+    def marginal(self, dimensions: Sequence[str]) -> np.ndarray:
+        """Sum the cube down to the given dimensions (in the order given, missing slots included)."""
+        axes = [self._axis(dimension) for dimension in dimensions]
+        other = tuple(axis for axis in range(len(self.dimensions)) if axis not in axes)
+        reduced = self.counts_array.sum(axis=other)
+        # Remaining axes come out in cube order; reorder them to the requested order
+        return np.transpose(reduced, np.argsort(np.argsort(axes)))
+
+    def total(self) -> int:
+        return int(self.counts_array.sum())
+
+    def counts(self, dimension: str) -> pd.Series:
+        """Per-label counts ordered by count (ties by label), like ``value_counts()``."""
+        values = self.marginal([dimension])[:-1]
+        labels = np.array(self.labels[dimension], dtype=object)
+        label_rank = np.argsort(np.argsort(labels.astype(str), kind='stable'))
+        present = np.flatnonzero(values)
+        order = present[np.lexsort((label_rank[present], -values[present]))]
+        return pd.Series(values[order], index=pd.Index(labels[order].tolist()), name='count')
+
+    def count_of(self, dimension: str, label: Any) -> int:
+        if label not in self.labels[dimension]:
+            return 0
+        return int(self.marginal([dimension])[self.labels[dimension].index(label)])
+
+    def crosstab(self, rows: str, columns: str) -> pd.DataFrame:
+        """Two-way table with sorted labels, skipping missing values, like ``pd.crosstab``."""
+        table = self.marginal([rows, columns])[:-1, :-1]
+        row_order = np.argsort(np.array(self.labels[rows], dtype=str), kind='stable')
+        column_order = np.argsort(np.array(self.labels[columns], dtype=str), kind='stable')
+        table = table[row_order][:, column_order]
+        keep_rows, keep_columns = table.any(axis=1), table.any(axis=0)
+        return pd.DataFrame(
+            table[keep_rows][:, keep_columns],
+            index=pd.Index([self.labels[rows][i] for i in row_order[keep_rows]]),
+            columns=pd.Index([self.labels[columns][i] for i in column_order[keep_columns]])
+        )
+
+    def series(self, dimension: str = 'month') -> pd.Series:
+        """Non-zero counts per label in sorted label order (e.g. the monthly series)."""
+        values = self.marginal([dimension])[:-1]
+        order = np.argsort(np.array(self.labels[dimension], dtype=str), kind='stable')
+        order = order[values[order] > 0]
+        return pd.Series(values[order], index=pd.Index([self.labels[dimension][i] for i in order]))
+
+    def save(self, path: str):
+        """Persist the cube as a single npz file (written atomically)."""
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, counts=self.counts_array, ingested=self.ingested.hashes,
+                 meta=np.array(json.dumps({'dimensions': self.dimensions, 'labels': self.labels}, default=str)))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CountCube':
+        """Load a cube written with ``save``."""
+        with np.load(path) as stored:
+            meta = json.loads(str(stored['meta']))
+            ingested = IngestLog(stored['ingested']) if 'ingested' in stored.files else None
+            return cls(meta['dimensions'], meta['labels'], stored['counts'], ingested)
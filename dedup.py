@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Duplicate Submission Detection
+==============================
+
+Removes duplicate submissions (re-uploads, connector retries) from a
+normalized form DataFrame before indicators count rows.
+
+- Exact duplicates: one 64-bit hash per row over the data fields
+  (``pd.util.hash_pandas_object``), ignoring ``_id``, timestamps and form
+  metadata; the first row of each hash group is kept.
+- Near duplicates: MinHash signatures over the row's (field, value) pairs and
+  LSH banding. Rows sharing a band bucket become candidates, candidates are
+  verified on their estimated Jaccard similarity and grouped with a vectorized
+  union-find, so no all-pairs comparison is ever made.
+
+Usage:
+    deduplicated, report = deduplicate(df, near=True, threshold=0.9)
+"""
+
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+IGNORED_COLUMNS = {
+    '_id', 'id', '__v', 'createdAt', 'updatedAt', 'submittedAt', 'submission_date',
+    'form_id', 'form_name', 'form'
+}
+MISSING_HASH = np.iinfo(np.uint64).max
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def data_columns(df: pd.DataFrame, ignore: Optional[Iterable[str]] = None) -> List[str]:
+    """Columns that define a submission's content (metadata and private columns excluded)."""
+    ignored = IGNORED_COLUMNS | set(ignore or [])
+    return [column for column in df.columns if column not in ignored and not str(column).startswith('_')]
+
+
+def _hashable(values: pd.Series) -> pd.Series:
+    """Make list/dict answers hashable (once per row, only for such columns)."""
+    if values.dtype != object:
+        return values
+    sample = values.dropna()
+    if not len(sample) or not sample.map(lambda v: isinstance(v, (list, dict, set))).any():
+        return values
+    return values.map(lambda v: repr(v) if isinstance(v, (list, dict, set)) else v)
+
+
+def column_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """(rows x columns) uint64 hashes of each (field, value); missing values get MISSING_HASH."""
+    hashes = np.empty((len(df), len(columns)), dtype=np.uint64)
+    # hash_pandas_object only applies hash_key to strings, so the field is mixed in
+    # explicitly; otherwise numeric fields that swap values give the same set
+    salts = pd.util.hash_array(np.array([str(column) for column in columns], dtype=object))
+    for position, column in enumerate(columns):
+        values = _hashable(df[column])
+        hashed = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        hashed = pd.util.hash_array(hashed ^ salts[position])
+        hashes[:, position] = np.where(values.isna().to_numpy(), MISSING_HASH, hashed)
+    return hashes
+
+
+def row_hashes(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """One uint64 content hash per row over ``columns``."""
+    if not columns:
+        return np.zeros(len(df), dtype=np.uint64)
+    frame = pd.DataFrame({column: _hashable(df[column]) for column in columns}, index=df.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def minhash_signatures(hashes: np.ndarray, num_perm: int = 64, seed: int = 1,
+                       chunk_size: int = 1 << 15) -> np.ndarray:
+    """
+    MinHash signatures (rows x num_perm) of each row's set of field hashes.
+
+    Each permutation is the uint64 bijection ``(x ^ b) * a`` (``a`` odd, wrapping
+    multiplication). Missing values are replaced by another value of the same
+    row, which leaves the row's set, and therefore its minimum, unchanged.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    b = rng.integers(0, np.iinfo(np.uint64).max, num_perm, dtype=np.uint64, endpoint=True)
+
+    missing = hashes == MISSING_HASH
+    if missing.any():
+        first_present = np.argmax(~missing, axis=1)
+        filler = hashes[np.arange(len(hashes)), first_present]
+        hashes = np.where(missing, filler[:, None], hashes)
+
+    # Work column by column on cache-sized row chunks with in-place ufuncs;
+    # signatures are filled permutation-major and transposed at the end
+    columns = np.ascontiguousarray(hashes.T)
+    signatures = np.empty((num_perm, len(hashes)), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for start in range(0, len(hashes), chunk_size):
+            block = columns[:, start:start + chunk_size]
+            buffer = np.empty(block.shape[1], dtype=np.uint64)
+            for j in range(num_perm):
+                minimum = signatures[j, start:start + chunk_size]
+                np.bitwise_xor(block[0], b[j], out=minimum)
+                np.multiply(minimum, a[j], out=minimum)
+                for column in block[1:]:
+                    np.bitwise_xor(column, b[j], out=buffer)
+                    np.multiply(buffer, a[j], out=buffer)
+                    np.minimum(minimum, buffer, out=minimum)
+    return signatures.T
+
+
+def _connected_components(n: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Component label (smallest member) per node, by min-label propagation with pointer jumping."""
+    labels = np.arange(n)
+    if not len(left):
+        return labels
+    while True:
+        smallest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, smallest)
+        np.minimum.at(updated, right, smallest)
+        np.minimum.at(updated, labels, updated)
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def near_duplicate_groups(signatures: np.ndarray, threshold: float = 0.9, bands: Optional[int] = None,
+                          max_bucket_size: int = 1000) -> np.ndarray:
+    """
+    Group rows whose estimated Jaccard similarity reaches ``threshold`` using LSH banding.
+
+    Args:
+        signatures: MinHash signatures (rows x num_perm)
+        threshold: Minimum estimated Jaccard similarity
+        bands: Number of bands (defaults to the count whose S-curve midpoint is near ``threshold``)
+        max_bucket_size: Ignore buckets larger than this (degenerate, e.g. all-missing rows)
+
+    Returns:
+        Group label per row (rows in the same group share the label of the first row)
+    """
+    n, num_perm = signatures.shape
+    if bands is None:
+        candidates = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+        bands = min(candidates, key=lambda b: abs((1 / b) ** (b / num_perm) - threshold))
+    rows_per_band = num_perm // bands
+
+    left_parts, right_parts = [], []
+    for band in range(bands):
+        # Combine the band's signature values into one bucket key
+        keys = signatures[:, band * rows_per_band].copy()
+        with np.errstate(over='ignore'):
+            for row in range(band * rows_per_band + 1, (band + 1) * rows_per_band):
+                keys *= _BAND_MULTIPLIER
+                keys ^= signatures[:, row]
+        codes, uniques = pd.factorize(keys)
+        sizes = np.bincount(codes, minlength=len(uniques))
+        # Pair each bucket member with the bucket's first row
+        first = np.full(len(uniques), n, dtype=np.int64)
+        np.minimum.at(first, codes, np.arange(n))
+        keep = (sizes[codes] > 1) & (sizes[codes] <= max_bucket_size)
+        members = np.flatnonzero(keep)
+        leaders = first[codes[members]]
+        distinct = members != leaders
+        left_parts.append(leaders[distinct])
+        right_parts.append(members[distinct])
+
+    left = np.concatenate(left_parts) if left_parts else np.empty(0, dtype=np.int64)
+    right = np.concatenate(right_parts) if right_parts else np.empty(0, dtype=np.int64)
+    if len(left):
+        pairs = np.unique(np.stack([left, right], axis=1), axis=0)
+        left, right = pairs[:, 0], pairs[:, 1]
+        # Verify candidates on the full signature
+        similarity = (signatures[left] == signatures[right]).mean(axis=1)
+        verified = similarity >= threshold
+        left, right = left[verified], right[verified]
+    return _connected_components(n, left, right)
+
+
+def deduplicate(df: pd.DataFrame, columns: Optional[List[str]] = None, ignore: Optional[Iterable[str]] = None,
+                exact: bool = True, near: bool = False, threshold: float = 0.9, num_perm: int = 64,
+                order_by: Optional[str] = 'submission_date') -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Drop exact and (optionally) near-duplicate submissions.
+
+    Args:
+        df: Normalized form DataFrame
+        columns: Data columns defining a submission (defaults to ``data_columns(df, ignore)``)
+        ignore: Extra columns to ignore when ``columns`` is not given
+        exact: Remove rows whose data fields are identical
+        near: Also remove rows whose (field, value) sets have Jaccard similarity >= ``threshold``
+        threshold: Near-duplicate similarity threshold
+        num_perm: MinHash signature length
+        order_by: Keep the earliest row by this column (when present), otherwise the first row
+
+    Returns:
+        (deduplicated DataFrame, report with counts and removed index labels)
+    """
+    columns = columns if columns is not None else data_columns(df, ignore)
+    report = {
+        'input_rows': int(len(df)),
+        'columns': columns,
+        'exact_duplicates': 0,
+        'near_duplicates': 0,
+        'removed_index': []
+    }
+    if len(df) < 2 or not columns or not (exact or near):
+        report['output_rows'] = int(len(df))
+        return df, report
+
+    # Earliest submission wins
+    if order_by and order_by in df.columns:
+        order = np.argsort(df[order_by].to_numpy(), kind='stable')
+    else:
+        order = np.arange(len(df))
+    ordered = df.iloc[order]
+    keep = np.ones(len(df), dtype=bool)
+
+    if exact:
+        duplicated = pd.Series(row_hashes(ordered, columns)).duplicated(keep='first').to_numpy()
+        keep &= ~duplicated
+        report['exact_duplicates'] = int(duplicated.sum())
+
+    if near:
+        candidates = np.flatnonzero(keep)
+        signatures = minhash_signatures(column_hashes(ordered.iloc[candidates], columns), num_perm=num_perm)
+        groups = near_duplicate_groups(signatures, threshold=threshold)
+        near_duplicated = groups != np.arange(len(candidates))
+        keep[candidates[near_duplicated]] = False
+        report['near_duplicates'] = int(near_duplicated.sum())
+
+    removed = ordered.index[~keep]
+    report['removed_index'] = removed.tolist()
+    # Preserve the original row order of the kept rows
+    result = df.iloc[np.sort(order[keep])]
+    report['output_rows'] = int(len(result))
+    return result, report
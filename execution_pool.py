@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Script Execution Pool
+=====================
+
+Runs indicator scripts (anything exposing ``generate_outputs(data, parameters)``,
+such as ``indicator_script_template.py``) in a pool of pre-forked Python
+workers that already have pandas, numpy and the script imported.
+
+Every execution is isolated and bounded:
+
+- a wall-clock timeout enforced by the parent (the worker is killed and replaced)
+- ``RLIMIT_AS`` (address space) set once per worker
+- ``RLIMIT_CPU`` re-armed before each job, so every job gets its own CPU budget
+- workers are recycled after ``max_jobs_per_worker`` jobs or when their peak
+  RSS passes ``rss_high_water_mb``
+
+Each result follows the execution response of the output API specification
+(``executionId``, ``status``, ``executionTime``, ``outputs``, ``executedAt``)
+and carries queue wait, run time and peak RSS in ``metrics``: ``peakRssMb`` is
+the job's own peak (the kernel's high-water mark is reset before each job; None
+where /proc/self/clear_refs is unavailable) and ``workerPeakRssMb`` the peak
+over the worker's lifetime.
+
+Usage:
+    with ExecutionPool('indicator_script_template.py', size=2, timeout=30) as pool:
+        result = pool.execute(data, {'dateRange': 'last_30_days'})
+
+Linux/macOS only (fork start method and the ``resource`` module).
+"""
+
+import importlib
+import importlib.util
+import logging
+import multiprocessing
+import os
+import queue
+import resource
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MEMORY_LIMIT_MB = 2048
+DEFAULT_CPU_LIMIT_S = 60
+
+
+def _load_script(script: str):
+    """Import a script by module name or file path."""
+    if script.endswith('.py') or os.sep in script:
+        name = os.path.splitext(os.path.basename(script))[0]
+        spec = importlib.util.spec_from_file_location(f"indicator_script_{name}", script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return importlib.import_module(script)
+
+
+def _peak_rss_mb() -> float:
+    """Peak RSS over the process lifetime."""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak RSS reported by ``_job_peak_rss_mb`` (Linux 4.0+); False when unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _job_peak_rss_mb() -> Optional[float]:
+    """Peak RSS since the last ``_reset_peak_rss`` (VmHWM)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _worker_main(connection, script: str, memory_limit_mb: Optional[int], cpu_limit_s: Optional[int]):
+    """Worker loop: import once, then run jobs until told to stop."""
+    module = _load_script(script)
+
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    # Kept here because resetting the high-water mark also resets ru_maxrss on Linux
+    worker_peak_rss_mb = 0.0
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+
+        if cpu_limit_s:
+            # RLIMIT_CPU counts the whole process lifetime, so re-arm it relative to now
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            used = int(usage.ru_utime + usage.ru_stime)
+            hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+            soft = used + int(cpu_limit_s)
+            resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+
+        peak_reset = _reset_peak_rss()
+        started = time.perf_counter()
+        try:
+            data, parameters = job
+            outputs = module.generate_outputs(data, parameters)
+            reply = {'success': True, 'outputs': outputs}
+        except MemoryError:
+            reply = {'success': False, 'status': 'memory_limit', 'error': 'Memory limit exceeded'}
+        except Exception as e:
+            reply = {'success': False, 'status': 'failed', 'error': str(e), 'traceback': traceback.format_exc()}
+        reply['run_ms'] = (time.perf_counter() - started) * 1000
+        reply['peak_rss_mb'] = _job_peak_rss_mb() if peak_reset else None
+        worker_peak_rss_mb = max(worker_peak_rss_mb, _peak_rss_mb(), reply['peak_rss_mb'] or 0.0)
+        reply['worker_peak_rss_mb'] = worker_peak_rss_mb
+
+        try:
+            connection.send(reply)
+        except (BrokenPipeError, OSError):
+            return
+        except Exception as e:
+            # Outputs that cannot be pickled; report them instead of dying
+            connection.send({
+                'success': False, 'status': 'failed', 'error': f"Outputs could not be returned: {e}",
+                'run_ms': reply['run_ms'], 'peak_rss_mb': reply['peak_rss_mb'],
+                'worker_peak_rss_mb': reply['worker_peak_rss_mb']
+            })
+
+
+class _Worker:
+    """Parent-side handle of one pre-forked worker process."""
+
+    def __init__(self, context, script: str, memory_limit_mb: Optional[int], cpu_limit_s: Optional[int]):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, script, memory_limit_mb, cpu_limit_s), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.jobs = 0
+        self.peak_rss_mb = 0.0
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class ExecutionPool:
+    """
+    Pool of warm, resource-limited workers for indicator scripts.
+    """
+
+    def __init__(self, script: str = 'indicator_script_template', size: int = 2,
+                 timeout: float = DEFAULT_TIMEOUT, memory_limit_mb: Optional[int] = DEFAULT_MEMORY_LIMIT_MB,
+                 cpu_limit_s: Optional[int] = DEFAULT_CPU_LIMIT_S, max_jobs_per_worker: int = 100,
+                 rss_high_water_mb: Optional[float] = None):
+        """
+        Start the pool.
+
+        Args:
+            script: Module name or path of the script exposing ``generate_outputs``
+            size: Number of worker processes
+            timeout: Default wall-clock limit per execution in seconds
+            memory_limit_mb: Address-space limit per worker (None disables it)
+            cpu_limit_s: CPU seconds per execution (None disables it)
+            max_jobs_per_worker: Recycle a worker after this many executions
+            rss_high_water_mb: Recycle a worker once its peak RSS passes this
+                (defaults to 75% of the memory limit)
+        """
+        self.script = script
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_s = cpu_limit_s
+        self.max_jobs_per_worker = max_jobs_per_worker
+        if rss_high_water_mb is None and memory_limit_mb:
+            rss_high_water_mb = memory_limit_mb * 0.75
+        self.rss_high_water_mb = rss_high_water_mb
+
+        # Fork so workers inherit the already-imported pandas/numpy pages
+        self._context = multiprocessing.get_context('fork')
+        self._idle: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'executions': 0, 'failures': 0, 'timeouts': 0, 'recycled': 0}
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, self.script, self.memory_limit_mb, self.cpu_limit_s)
+
+    def _replace(self, worker: _Worker, kill: bool = False) -> _Worker:
+        worker.stop(kill=kill)
+        with self._lock:
+            self.stats['recycled'] += 1
+        return self._spawn()
+
+    def _release(self, worker: _Worker):
+        """Return a worker to the pool, or stop it when the pool was closed during its job."""
+        with self._lock:
+            if not self._closed:
+                self._idle.put(worker)
+                return
+        worker.stop()
+
+    def execute(self, data: pd.DataFrame, parameters: Optional[Dict[str, Any]] = None,
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run ``generate_outputs(data, parameters)`` on a pooled worker.
+
+        Args:
+            data: Input DataFrame
+            parameters: Execute parameters
+            timeout: Wall-clock limit in seconds (defaults to the pool timeout)
+
+        Returns:
+            Execution result with ``status`` completed/failed/timeout/memory_limit/killed,
+            ``outputs`` and ``metrics``
+        """
+        if self._closed:
+            raise RuntimeError("Execution pool is closed")
+        timeout = self.timeout if timeout is None else timeout
+        execution_id = uuid.uuid4().hex[:12]
+
+        queued = time.perf_counter()
+        worker = self._idle.get()
+        queue_wait_ms = (time.perf_counter() - queued) * 1000
+        worker_pid = worker.pid
+
+        reply: Optional[Dict[str, Any]] = None
+        status = 'completed'
+        exchanged = False
+        started = time.perf_counter()
+        try:
+            try:
+                worker.connection.send((data, parameters))
+                if worker.connection.poll(timeout):
+                    reply = worker.connection.recv()
+                    status = 'completed' if reply.get('success') else reply.get('status', 'failed')
+                else:
+                    status = 'timeout'
+            except (EOFError, BrokenPipeError, ConnectionResetError, OSError):
+                # The worker died mid-job: CPU limit (SIGXCPU), OOM kill or a crash in native code
+                status = 'killed'
+            exchanged = True
+        finally:
+            if not exchanged:
+                # Unpicklable job or reply (or an interrupt): the pipe is in an unknown
+                # state, so the worker is replaced before the error propagates
+                logger.warning(f"Execution {execution_id} aborted on worker {worker.pid}; replacing worker")
+                self._release(self._replace(worker, kill=True))
+        elapsed = time.perf_counter() - started
+
+        if status in ('timeout', 'killed'):
+            logger.warning(f"Execution {execution_id} {status} on worker {worker.pid}; replacing worker")
+            worker = self._replace(worker, kill=True)
+        else:
+            worker.jobs += 1
+            worker.peak_rss_mb = max(worker.peak_rss_mb, reply.get('worker_peak_rss_mb', 0.0))
+            over_memory = self.rss_high_water_mb is not None and worker.peak_rss_mb > self.rss_high_water_mb
+            if status == 'memory_limit' or over_memory or worker.jobs >= self.max_jobs_per_worker:
+                worker = self._replace(worker)
+        self._release(worker)
+
+        with self._lock:
+            self.stats['executions'] += 1
+            if status != 'completed':
+                self.stats['failures'] += 1
+            if status == 'timeout':
+                self.stats['timeouts'] += 1
+
+        result = {
+            'success': status == 'completed',
+            'executionId': execution_id,
+            'status': status,
+            'executionTime': f"{elapsed:.2f}s",
+            'outputs': reply.get('outputs', []) if reply else [],
+            'executedAt': datetime.now().isoformat(),
+            'metrics': {
+                'queueWaitMs': round(queue_wait_ms, 2),
+                'runMs': round(reply['run_ms'], 2) if reply else round(elapsed * 1000, 2),
+                'peakRssMb': round(reply['peak_rss_mb'], 1) if reply and reply['peak_rss_mb'] is not None else None,
+                'workerPeakRssMb': round(reply['worker_peak_rss_mb'], 1) if reply else None,
+                'workerPid': worker_pid
+            }
+        }
+        if status != 'completed':
+            result['error'] = (reply or {}).get('error') or {
+                'timeout': f"Execution exceeded {timeout}s",
+                'killed': "Worker terminated (resource limit exceeded or crash)"
+            }.get(status, 'Execution failed')
+        return result
+
+    def close(self):
+        """Stop the idle workers; workers busy with a job are stopped when it returns."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+    def __enter__(self) -> 'ExecutionPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Filter Plan
+===========
+
+Compiles the ``parameters`` accepted by the execute endpoint into a filter
+plan that is applied once, before any indicator output is computed:
+
+    {
+        "dateRange": "last_30_days",
+        "filters": {"antibiotic": ["CIP", "GEN"], "region": "north"}
+    }
+
+- ``query_params()`` renders the date range and equality/IN filters as query
+  string parameters so they can be pushed down into the submissions fetch.
+- ``apply()`` evaluates the same predicates locally as one combined boolean
+  mask (using categorical codes where columns are categorical), and turns the
+  date range into a binary-search slice when the frame is sorted by date.
+
+Applying the plan locally after a pushed-down fetch is idempotent, so it is
+always safe to do both.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+RELATIVE_DATE_RANGES = {
+    'today': 0,
+    'last_7_days': 7,
+    'last_30_days': 30,
+    'last_90_days': 90,
+    'last_365_days': 365,
+}
+
+# Filter values that mean "do not filter on this column"
+WILDCARD_VALUES = {'all', '*', None}
+
+
+def resolve_date_range(date_range: Any, now: Optional[datetime] = None):
+    """
+    Resolve a ``dateRange`` parameter into (start, end) bounds, either of which may be None.
+
+    Accepts the relative names in RELATIVE_DATE_RANGES, ``this_month``,
+    ``last_month``, ``this_year``, ``all`` or a ``{"start": ..., "end": ...}`` dict.
+    """
+    now = now or datetime.now()
+
+    if date_range in (None, '', 'all', 'all_time'):
+        return None, None
+    if isinstance(date_range, dict):
+        start, end = date_range.get('start'), date_range.get('end')
+        return (pd.Timestamp(start) if start else None), (pd.Timestamp(end) if end else None)
+    if date_range in RELATIVE_DATE_RANGES:
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        return pd.Timestamp(today - timedelta(days=RELATIVE_DATE_RANGES[date_range])), None
+    if date_range == 'this_month':
+        return pd.Timestamp(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)), None
+    if date_range == 'last_month':
+        this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return pd.Timestamp((this_month - timedelta(days=1)).replace(day=1)), pd.Timestamp(this_month)
+    if date_range == 'this_year':
+        return pd.Timestamp(now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)), None
+
+    raise ValueError(f"Unsupported dateRange: {date_range}")
+
+
+def _align_timezone(bound: Optional[pd.Timestamp], dates: pd.Series) -> Optional[pd.Timestamp]:
+    """Make a bound comparable with a (possibly timezone-aware) datetime column."""
+    if bound is None:
+        return None
+    tz = getattr(dates.dt, 'tz', None)
+    if tz is not None and bound.tz is None:
+        return bound.tz_localize(tz)
+    if tz is None and bound.tz is not None:
+        return bound.tz_convert(None)
+    return bound
+
+
+class FilterPlan:
+    """
+    Compiled date range and equality/IN filters for one execution.
+    """
+
+    def __init__(self, start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None,
+                 filters: Optional[Dict[str, List[Any]]] = None, date_column: str = 'date'):
+        """
+        Initialize the plan.
+
+        Args:
+            start: Inclusive lower date bound
+            end: Exclusive upper date bound
+            filters: Column -> allowed values
+            date_column: Name of the datetime column the range applies to
+        """
+        self.start = start
+        self.end = end
+        self.filters = filters or {}
+        self.date_column = date_column
+
+    @classmethod
+    def from_parameters(cls, parameters: Optional[Dict[str, Any]], date_column: str = 'date',
+                        now: Optional[datetime] = None) -> 'FilterPlan':
+        """Compile execute ``parameters`` into a plan."""
+        parameters = parameters or {}
+        start, end = resolve_date_range(parameters.get('dateRange'), now)
+
+        filters = {}
+        for column, values in (parameters.get('filters') or {}).items():
+            values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+            if any(value in WILDCARD_VALUES for value in values):
+                continue
+            filters[column] = values
+
+        return cls(start, end, filters, date_column)
+
+    @property
+    def has_date_range(self) -> bool:
+        return self.start is not None or self.end is not None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.has_date_range and not self.filters
+
+    def query_params(self) -> Dict[str, str]:
+        """Render the plan as query string parameters for the submissions endpoint."""
+        params = {}
+        if self.start is not None:
+            params['startDate'] = self.start.isoformat()
+        if self.end is not None:
+            params['endDate'] = self.end.isoformat()
+        for column, values in self.filters.items():
+            params[column] = ','.join(str(value) for value in values)
+        return params
+
+    def filter_mask(self, data: pd.DataFrame, ignore_missing: bool = False) -> np.ndarray:
+        """
+        Evaluate all equality/IN filters as one combined boolean mask.
+
+        Args:
+            data: DataFrame to filter
+            ignore_missing: Skip filters on columns the frame does not have instead of
+                selecting nothing (used when one plan is applied to several forms)
+
+        Returns:
+            Boolean mask of the rows that pass every filter
+        """
+        mask = np.ones(len(data), dtype=bool)
+
+        for column, values in self.filters.items():
+            if column not in data.columns:
+                if ignore_missing:
+                    continue
+                return np.zeros(len(data), dtype=bool)
+
+            series = data[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                wanted = series.cat.categories.get_indexer(values)
+                mask &= np.isin(series.cat.codes.to_numpy(), wanted[wanted >= 0])
+            else:
+                mask &= series.isin(values).to_numpy()
+
+        return mask
+
+    def date_mask(self, data: pd.DataFrame) -> np.ndarray:
+        """Evaluate the date range as a boolean mask."""
+        dates = pd.to_datetime(data[self.date_column])
+        mask = np.ones(len(data), dtype=bool)
+        start, end = _align_timezone(self.start, dates), _align_timezone(self.end, dates)
+        if start is not None:
+            mask &= (dates >= start).to_numpy()
+        if end is not None:
+            mask &= (dates < end).to_numpy()
+        return mask
+
+    def apply_filters(self, data: pd.DataFrame, ignore_missing: bool = False) -> pd.DataFrame:
+        """Apply the equality/IN filters."""
+        if not self.filters:
+            return data
+        return data[self.filter_mask(data, ignore_missing)]
+
+    def apply_date_range(self, data: pd.DataFrame, is_sorted: bool = False) -> pd.DataFrame:
+        """
+        Apply the date range.
+
+        Args:
+            data: DataFrame with the plan's date column
+            is_sorted: Whether the frame is sorted by that column (enables a searchsorted slice)
+
+        Returns:
+            The rows inside the date range
+        """
+        if not self.has_date_range or self.date_column not in data.columns:
+            return data
+
+        if is_sorted:
+            dates = data[self.date_column]
+            start, end = _align_timezone(self.start, dates), _align_timezone(self.end, dates)
+            lo = dates.searchsorted(start, side='left') if start is not None else 0
+            hi = dates.searchsorted(end, side='left') if end is not None else int(dates.notna().sum())
+            return data.iloc[lo:hi]
+
+        return data[self.date_mask(data)]
+
+    def apply(self, data: pd.DataFrame, is_sorted: bool = False, ignore_missing: bool = False) -> pd.DataFrame:
+        """Apply filters and date range; filters first so the date work only sees the filtered subset."""
+        if self.is_empty or data.empty:
+            return data
+        return self.apply_date_range(self.apply_filters(data, ignore_missing), is_sorted)
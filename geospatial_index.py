@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Geospatial Region Index
+=======================
+
+Assigns case coordinates to the Ghana admin-1 regions shipped in
+``public/geo/ghana_regions_admin1.json``.
+
+The boundaries are loaded once and indexed on a regular grid over their
+bounding box. Every grid cell remembers which region contains its centre and
+which polygon edges pass through it, so:
+
+- points in cells without edges take the region of the cell centre directly
+- points in boundary cells only test the handful of edges in their cell
+  (the segment from the point to the cell centre crosses the polygon
+  boundary an odd number of times exactly when the two lie on different sides)
+
+Both steps are vectorized over all points, so millions of coordinates can be
+assigned without a per-row Python loop.
+
+Usage:
+    from geospatial_index import assign_regions
+    data['region'] = assign_regions(data)
+"""
+
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BOUNDARIES_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'public', 'geo', 'ghana_regions_admin1.json'
+)
+
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    """Sign of the cross product (b - a) x (c - a)."""
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+class RegionIndex:
+    """
+    Grid-based spatial index over a set of region polygons.
+    """
+
+    def __init__(self, geojson: Dict[str, Any], name_property: str = 'region', resolution: int = 128):
+        """
+        Build the index from a GeoJSON FeatureCollection.
+
+        Args:
+            geojson: FeatureCollection with Polygon/MultiPolygon features
+            name_property: Feature property holding the region name
+            resolution: Number of grid cells along each axis
+        """
+        self.regions: List[str] = []
+        edges = []
+
+        for feature in geojson.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') == 'Polygon':
+                polygons = [geometry['coordinates']]
+            elif geometry.get('type') == 'MultiPolygon':
+                polygons = geometry['coordinates']
+            else:
+                continue
+
+            region_id = len(self.regions)
+            self.regions.append(feature.get('properties', {}).get(name_property, str(region_id)))
+
+            # Holes and multiple parts are handled by the even-odd rule, so all
+            # rings of a region are simply pooled into one edge list.
+            for polygon in polygons:
+                for ring in polygon:
+                    ring = np.asarray(ring, dtype=float)[:, :2]
+                    start, end = ring, np.roll(ring, -1, axis=0)
+                    ring_edges = np.column_stack([start, end, np.full(len(ring), region_id)])
+                    edges.append(ring_edges[np.any(start != end, axis=1)])
+
+        edges = np.vstack(edges) if edges else np.empty((0, 5))
+        self.edge_x1, self.edge_y1 = edges[:, 0], edges[:, 1]
+        self.edge_x2, self.edge_y2 = edges[:, 2], edges[:, 3]
+        self.edge_region = edges[:, 4].astype(np.int64)
+
+        self.resolution = resolution
+        if len(edges):
+            self.min_x = float(min(self.edge_x1.min(), self.edge_x2.min()))
+            self.min_y = float(min(self.edge_y1.min(), self.edge_y2.min()))
+            self.max_x = float(max(self.edge_x1.max(), self.edge_x2.max()))
+            self.max_y = float(max(self.edge_y1.max(), self.edge_y2.max()))
+        else:
+            self.min_x = self.min_y = 0.0
+            self.max_x = self.max_y = 1.0
+        self.cell_w = (self.max_x - self.min_x) / resolution or 1.0
+        self.cell_h = (self.max_y - self.min_y) / resolution or 1.0
+
+        self._build_cell_edges()
+        self._build_cell_regions()
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_BOUNDARIES_PATH, **kwargs) -> 'RegionIndex':
+        """Load the index from a GeoJSON file."""
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def _cell_range(self, lo, hi, origin, size):
+        """Clip coordinates to grid cell indices."""
+        first = np.clip(np.floor((lo - origin) / size).astype(np.int64), 0, self.resolution - 1)
+        last = np.clip(np.floor((hi - origin) / size).astype(np.int64), 0, self.resolution - 1)
+        return first, last
+
+    def _build_cell_edges(self):
+        """Build a CSR mapping from grid cell to the edges whose bounding box overlaps it."""
+        ix0, ix1 = self._cell_range(np.minimum(self.edge_x1, self.edge_x2),
+                                    np.maximum(self.edge_x1, self.edge_x2), self.min_x, self.cell_w)
+        iy0, iy1 = self._cell_range(np.minimum(self.edge_y1, self.edge_y2),
+                                    np.maximum(self.edge_y1, self.edge_y2), self.min_y, self.cell_h)
+
+        width = ix1 - ix0 + 1
+        counts = width * (iy1 - iy0 + 1)
+        edge_ids = np.repeat(np.arange(len(counts)), counts)
+        # Position of each (edge, cell) pair inside its edge's cell rectangle
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = ix0[edge_ids] + local % width[edge_ids]
+        cell_y = iy0[edge_ids] + local // width[edge_ids]
+        cells = cell_y * self.resolution + cell_x
+
+        order = np.argsort(cells, kind='stable')
+        self.cell_edge_ids = edge_ids[order]
+        self.cell_edge_offsets = np.concatenate([
+            [0], np.cumsum(np.bincount(cells, minlength=self.resolution ** 2))
+        ])
+
+    def _build_cell_regions(self):
+        """Resolve the region containing each cell centre by ray casting one grid row at a time."""
+        n_cells = self.resolution ** 2
+        cell_ids = np.arange(n_cells)
+        self.cell_center_x = self.min_x + (cell_ids % self.resolution + 0.5) * self.cell_w
+        self.cell_center_y = self.min_y + (cell_ids // self.resolution + 0.5) * self.cell_h
+        self.cell_region = np.full(n_cells, -1, dtype=np.int64)
+
+        for row in range(self.resolution):
+            row_cells = slice(row * self.resolution, (row + 1) * self.resolution)
+            y = self.min_y + (row + 0.5) * self.cell_h
+            # Only edges straddling the row's scanline can cross its rays
+            row_edges = (self.edge_y1 > y) != (self.edge_y2 > y)
+            for region_id in np.unique(self.edge_region[row_edges]):
+                mask = row_edges & (self.edge_region == region_id)
+                inside = self._ray_cast(self.cell_center_x[row_cells], self.cell_center_y[row_cells],
+                                        self.edge_x1[mask], self.edge_y1[mask],
+                                        self.edge_x2[mask], self.edge_y2[mask])
+                self.cell_region[row_cells][inside] = region_id
+
+    @staticmethod
+    def _ray_cast(px, py, x1, y1, x2, y2, chunk_size: int = 512) -> np.ndarray:
+        """Even-odd point-in-polygon test, vectorized over points and chunked over edges."""
+        inside = np.zeros(len(px), dtype=bool)
+        for start in range(0, len(x1), chunk_size):
+            ex1, ey1 = x1[start:start + chunk_size], y1[start:start + chunk_size]
+            ex2, ey2 = x2[start:start + chunk_size], y2[start:start + chunk_size]
+            straddles = (ey1[None, :] > py[:, None]) != (ey2[None, :] > py[:, None])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = ex1[None, :] + (py[:, None] - ey1[None, :]) * (ex2 - ex1)[None, :] / (ey2 - ey1)[None, :]
+            crossings = np.count_nonzero(straddles & (px[:, None] < x_cross), axis=1)
+            inside ^= (crossings % 2).astype(bool)
+        return inside
+
+    def assign_codes(self, latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+        """
+        Assign coordinates to regions.
+
+        Args:
+            latitude: Array of latitudes
+            longitude: Array of longitudes
+
+        Returns:
+            Integer array of region codes (index into ``self.regions``), -1 when outside every region
+        """
+        py = np.asarray(latitude, dtype=float)
+        px = np.asarray(longitude, dtype=float)
+        codes = np.full(len(px), -1, dtype=np.int64)
+
+        in_grid = (np.isfinite(px) & np.isfinite(py) &
+                   (px >= self.min_x) & (px <= self.max_x) & (py >= self.min_y) & (py <= self.max_y))
+        points = np.flatnonzero(in_grid)
+        if len(points) == 0:
+            return codes
+
+        ix = np.minimum(((px[points] - self.min_x) / self.cell_w).astype(np.int64), self.resolution - 1)
+        iy = np.minimum(((py[points] - self.min_y) / self.cell_h).astype(np.int64), self.resolution - 1)
+        cells = iy * self.resolution + ix
+        codes[points] = self.cell_region[cells]
+
+        # Points in cells crossed by a boundary: count crossings of the segment
+        # point -> cell centre against the edges of that cell only.
+        edge_counts = self.cell_edge_offsets[cells + 1] - self.cell_edge_offsets[cells]
+        boundary = edge_counts > 0
+        if not boundary.any():
+            return codes
+
+        b_points, b_cells, b_counts = points[boundary], cells[boundary], edge_counts[boundary]
+        pair_point = np.repeat(np.arange(len(b_points)), b_counts)
+        local = np.arange(b_counts.sum()) - np.repeat(np.cumsum(b_counts) - b_counts, b_counts)
+        pair_edge = self.cell_edge_ids[self.cell_edge_offsets[b_cells][pair_point] + local]
+
+        ax, ay = self.edge_x1[pair_edge], self.edge_y1[pair_edge]
+        bx, by = self.edge_x2[pair_edge], self.edge_y2[pair_edge]
+        qx, qy = px[b_points][pair_point], py[b_points][pair_point]
+        cx, cy = self.cell_center_x[b_cells][pair_point], self.cell_center_y[b_cells][pair_point]
+
+        crosses = ((_orientation(ax, ay, bx, by, qx, qy) * _orientation(ax, ay, bx, by, cx, cy) < 0) &
+                   (_orientation(qx, qy, cx, cy, ax, ay) * _orientation(qx, qy, cx, cy, bx, by) < 0))
+
+        n_regions = len(self.regions)
+        parity = np.bincount(pair_point[crosses] * n_regions + self.edge_region[pair_edge[crosses]],
+                             minlength=len(b_points) * n_regions).reshape(len(b_points), n_regions) % 2
+
+        membership = parity.astype(bool)
+        center_region = self.cell_region[b_cells]
+        has_center = center_region >= 0
+        membership[np.flatnonzero(has_center), center_region[has_center]] ^= True
+
+        codes[b_points] = np.where(membership.any(axis=1), membership.argmax(axis=1), -1)
+        return codes
+
+    def assign(self, latitude: np.ndarray, longitude: np.ndarray) -> pd.Categorical:
+        """Assign coordinates to regions and return region names as a Categorical (NaN when outside)."""
+        return pd.Categorical.from_codes(self.assign_codes(latitude, longitude), categories=self.regions)
+
+
+@lru_cache(maxsize=None)
+def load_region_index(path: str = DEFAULT_BOUNDARIES_PATH, resolution: int = 128) -> RegionIndex:
+    """Load and index the region boundaries once per process."""
+    return RegionIndex.from_file(path, resolution=resolution)
+
+
+def assign_regions(data: pd.DataFrame, index: Optional[RegionIndex] = None) -> pd.Series:
+    """
+    Bulk-assign the ``latitude``/``longitude`` rows of a DataFrame to regions.
+
+    Args:
+        data: DataFrame with latitude and longitude columns
+        index: Region index to use (defaults to the bundled Ghana admin-1 regions)
+
+    Returns:
+        Categorical Series of region names aligned with ``data``
+    """
+    index = index or load_region_index()
+    latitude = pd.to_numeric(data['latitude'], errors='coerce').to_numpy(dtype=float)
+    longitude = pd.to_numeric(data['longitude'], errors='coerce').to_numpy(dtype=float)
+    return pd.Series(index.assign(latitude, longitude), index=data.index, name='region')
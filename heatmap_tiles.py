@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Heatmap Tile Pyramid
+====================
+
+Precomputes case counts for the dashboard heatmap on a quadtree of Web
+Mercator tiles, so pans and zooms are served from stored aggregates instead
+of rescanning the case data.
+
+Every tile at zoom ``z`` is split into ``2 ** bin_bits`` x ``2 ** bin_bits``
+bins. Cases are projected once to the finest level; coarser levels are
+obtained by shifting the integer bin coordinates, so the whole pyramid is
+built in a single pass over the coordinates.
+
+Each zoom level is stored as ``zoom_<z>.npz`` (bin x, bin y, count) sorted by
+bin x, next to a ``pyramid.json`` with the pyramid settings and an
+``ingested.npy`` log of the cases already counted, so ``update(data,
+only_new=True)`` can be given the full dataset on every run.
+
+Usage:
+    pyramid = TilePyramid.build(data, min_zoom=5, max_zoom=14, only_new=True)
+    pyramid.save('/var/lib/gconnector/tiles/indicator_123')
+
+    pyramid = TilePyramid.load('/var/lib/gconnector/tiles/indicator_123')
+    pyramid.update(data, only_new=True)  # incremental
+    payload = pyramid.get_heatmap(bbox=[4.5, -3.3, 11.2, 1.2], zoom=8)
+"""
+
+import json
+import os
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from ingest_log import IngestLog, row_keys
+
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+
+def _project(latitude: np.ndarray, longitude: np.ndarray, level: int):
+    """Project coordinates to integer Web Mercator cell coordinates at ``level``."""
+    scale = 2 ** level
+    lat = np.radians(np.clip(latitude, -MAX_MERCATOR_LATITUDE, MAX_MERCATOR_LATITUDE))
+    x = (longitude + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * scale
+    return (np.clip(np.floor(x), 0, scale - 1).astype(np.int64),
+            np.clip(np.floor(y), 0, scale - 1).astype(np.int64))
+
+
+def _unproject(x: np.ndarray, y: np.ndarray, level: int):
+    """Convert (fractional) Web Mercator cell coordinates at ``level`` back to latitude/longitude."""
+    scale = 2 ** level
+    longitude = x / scale * 360.0 - 180.0
+    latitude = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * y / scale))))
+    return latitude, longitude
+
+
+def _aggregate(x: np.ndarray, y: np.ndarray, counts: np.ndarray, level: int) -> Dict[str, np.ndarray]:
+    """Sum counts per (x, y) cell and return the cells sorted by x, then y."""
+    keys = x * (2 ** level) + y
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return {
+        'x': unique_keys // (2 ** level),
+        'y': unique_keys % (2 ** level),
+        'count': np.bincount(inverse, weights=counts).astype(np.int64)
+    }
+
+
+class TilePyramid:
+    """
+    Multi-zoom heatmap aggregates stored as per-level sorted bin arrays.
+    """
+
+    def __init__(self, min_zoom: int = 3, max_zoom: int = 14, bin_bits: int = 5,
+                 levels: Optional[Dict[int, Dict[str, np.ndarray]]] = None,
+                 ingested: Optional[IngestLog] = None):
+        """
+        Initialize an empty (or preloaded) pyramid.
+
+        Args:
+            min_zoom: Coarsest zoom level kept
+            max_zoom: Finest zoom level kept
+            bin_bits: Each tile is split into 2**bin_bits bins per axis
+            levels: Optional preloaded per-zoom bin arrays
+            ingested: Cases already counted (see ``update(only_new=True)``)
+        """
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.bin_bits = bin_bits
+        empty = {'x': np.empty(0, np.int64), 'y': np.empty(0, np.int64), 'count': np.empty(0, np.int64)}
+        self.levels = levels or {zoom: dict(empty) for zoom in range(min_zoom, max_zoom + 1)}
+        self.ingested = ingested if ingested is not None else IngestLog()
+
+    @classmethod
+    def build(cls, data: pd.DataFrame, only_new: bool = False, **kwargs) -> 'TilePyramid':
+        """Build a pyramid from the ``latitude``/``longitude`` columns of a DataFrame."""
+        pyramid = cls(**kwargs)
+        pyramid.update(data, only_new)
+        return pyramid
+
+    def _level_aggregates(self, data: pd.DataFrame) -> Dict[int, Dict[str, np.ndarray]]:
+        """Aggregate new cases for every zoom level from a single projection."""
+        latitude = pd.to_numeric(data['latitude'], errors='coerce').to_numpy(dtype=float)
+        longitude = pd.to_numeric(data['longitude'], errors='coerce').to_numpy(dtype=float)
+        valid = np.isfinite(latitude) & np.isfinite(longitude)
+
+        finest = self.max_zoom + self.bin_bits
+        x, y = _project(latitude[valid], longitude[valid], finest)
+        cells = _aggregate(x, y, np.ones(len(x)), finest)
+
+        aggregates = {}
+        for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+            level = zoom + self.bin_bits
+            shift = finest - level
+            # Each level is derived from the (much smaller) finest aggregates
+            aggregates[zoom] = _aggregate(cells['x'] >> shift, cells['y'] >> shift, cells['count'], level)
+        return aggregates
+
+    def update(self, data: pd.DataFrame, only_new: bool = False) -> 'TilePyramid':
+        """
+        Add new cases to the pyramid without touching previously aggregated ones.
+
+        Args:
+            data: DataFrame of cases with latitude and longitude columns
+            only_new: Add only the cases (by submission ID) not added by an earlier
+                ``only_new`` update, and record them
+
+        Returns:
+            The pyramid itself
+        """
+        if only_new and len(data):
+            data = data[self.ingested.claim(row_keys(data, ignore=['_month']))]
+        for zoom, new_cells in self._level_aggregates(data).items():
+            current = self.levels[zoom]
+            self.levels[zoom] = _aggregate(
+                np.concatenate([current['x'], new_cells['x']]),
+                np.concatenate([current['y'], new_cells['y']]),
+                np.concatenate([current['count'], new_cells['count']]),
+                zoom + self.bin_bits
+            )
+        return self
+
+    def get_heatmap(self, bbox: Optional[List[float]] = None, zoom: int = 10) -> Dict[str, Any]:
+        """
+        Serve the heatmap payload for a bounding box and zoom level.
+
+        Args:
+            bbox: [south, west, north, east] in degrees; the whole pyramid when omitted
+            zoom: Requested map zoom, clamped to the pyramid's zoom range
+
+        Returns:
+            Dictionary with points, intensities, center and zoom (heatmap_chart data)
+        """
+        zoom = int(min(max(zoom, self.min_zoom), self.max_zoom))
+        level = zoom + self.bin_bits
+        cells = self.levels[zoom]
+        x, y, counts = cells['x'], cells['y'], cells['count']
+
+        if bbox:
+            south, west, north, east = bbox
+            x_min, y_min = _project(np.array([north]), np.array([west]), level)
+            x_max, y_max = _project(np.array([south]), np.array([east]), level)
+            # Levels are sorted by x, so the x-range is a contiguous slice
+            start, stop = np.searchsorted(x, [x_min[0], x_max[0] + 1])
+            in_rows = (y[start:stop] >= y_min[0]) & (y[start:stop] <= y_max[0])
+            x, y, counts = x[start:stop][in_rows], y[start:stop][in_rows], counts[start:stop][in_rows]
+
+        if len(counts) == 0:
+            return {"points": [], "intensities": [], "center": [0, 0], "zoom": zoom}
+
+        latitude, longitude = _unproject(x + 0.5, y + 0.5, level)
+        center = [float(np.average(latitude, weights=counts)), float(np.average(longitude, weights=counts))]
+
+        return {
+            "points": np.column_stack([latitude, longitude]).tolist(),
+            "intensities": counts.tolist(),
+            "center": center,
+            "zoom": zoom
+        }
+
+    def save(self, directory: str):
+        """Persist the pyramid, writing each level atomically."""
+        os.makedirs(directory, exist_ok=True)
+        for zoom, cells in self.levels.items():
+            path = os.path.join(directory, f"zoom_{zoom}.npz")
+            tmp_path = path + '.tmp.npz'
+            np.savez(tmp_path, **cells)
+            os.replace(tmp_path, path)
+
+        ingested_path = os.path.join(directory, 'ingested.npy')
+        np.save(ingested_path + '.tmp.npy', self.ingested.hashes)
+        os.replace(ingested_path + '.tmp.npy', ingested_path)
+
+        meta_path = os.path.join(directory, 'pyramid.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({
+                'min_zoom': self.min_zoom,
+                'max_zoom': self.max_zoom,
+                'bin_bits': self.bin_bits,
+                'total_cases': int(self.levels[self.min_zoom]['count'].sum())
+            }, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    @classmethod
+    def load(cls, directory: str) -> 'TilePyramid':
+        """Load a pyramid previously written with ``save``."""
+        with open(os.path.join(directory, 'pyramid.json')) as f:
+            meta = json.load(f)
+
+        levels = {}
+        for zoom in range(meta['min_zoom'], meta['max_zoom'] + 1):
+            with np.load(os.path.join(directory, f"zoom_{zoom}.npz")) as stored:
+                levels[zoom] = {key: stored[key] for key in ('x', 'y', 'count')}
+
+        ingested_path = os.path.join(directory, 'ingested.npy')
+        ingested = IngestLog(np.load(ingested_path)) if os.path.exists(ingested_path) else None
+        return cls(meta['min_zoom'], meta['max_zoom'], meta['bin_bits'], levels, ingested)
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        """Check whether a pyramid has been persisted in ``directory``."""
+        return os.path.exists(os.path.join(directory, 'pyramid.json'))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+HTTP Transport
+==============
+
+A tuned ``requests`` transport for the indicator processors:
+
+- keep-alive connection pools sized to the fetch concurrency
+- ``Accept-Encoding`` negotiation (gzip/deflate, plus br when brotli is installed)
+- connect/read timeouts on every request
+- bounded, jittered exponential retries for idempotent GETs on connection
+  errors, timeouts and transient statuses (429/5xx), honouring ``Retry-After``
+- per-request latency and byte counts (wire and decoded)
+
+The transport only depends on a base URL, so it can be pointed at a local stub
+server (``tests/test_http_transport.py`` uses ``http.server`` on 127.0.0.1) to
+exercise retries, timeouts, compression and connection reuse.
+
+Usage:
+    transport = HTTPTransport(headers={'Authorization': 'Bearer ...'}, pool_maxsize=8)
+    response = transport.get('http://localhost:3000/api/forms/abc/submissions')
+    transport.stats.summary()
+"""
+
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes br responses when brotli is importable)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TransportStats:
+    """
+    Per-request latency and byte accounting.
+    """
+
+    def __init__(self, max_records: int = 1000):
+        """
+        Args:
+            max_records: Number of most recent request records to keep
+        """
+        self.records = deque(maxlen=max_records)
+        self.requests = 0
+        self.attempts = 0
+        self.failures = 0
+        self.elapsed = 0.0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+
+    def record(self, url: str, status: Optional[int], attempts: int, elapsed: float,
+               wire_bytes: int, decoded_bytes: int, error: Optional[str] = None):
+        self.requests += 1
+        self.attempts += attempts
+        self.failures += 1 if error or status is None or status >= 400 else 0
+        self.elapsed += elapsed
+        self.wire_bytes += wire_bytes
+        self.decoded_bytes += decoded_bytes
+        self.records.append({
+            'url': url,
+            'status': status,
+            'attempts': attempts,
+            'elapsed_ms': round(elapsed * 1000, 2),
+            'wire_bytes': wire_bytes,
+            'decoded_bytes': decoded_bytes,
+            'error': error
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(record['elapsed_ms'] for record in self.records)
+        return {
+            'requests': self.requests,
+            'attempts': self.attempts,
+            'retries': self.attempts - self.requests,
+            'failures': self.failures,
+            'total_elapsed_ms': round(self.elapsed * 1000, 2),
+            'p50_latency_ms': latencies[len(latencies) // 2] if latencies else None,
+            'max_latency_ms': latencies[-1] if latencies else None,
+            'wire_bytes': self.wire_bytes,
+            'decoded_bytes': self.decoded_bytes,
+            'compression_ratio': round(self.decoded_bytes / self.wire_bytes, 2) if self.wire_bytes else None
+        }
+
+
+class HTTPTransport:
+    """
+    Pooled, compressed, timed and retrying GET transport on top of ``requests``.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, pool_connections: int = 4,
+                 pool_maxsize: int = 8, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, max_retries: int = 3,
+                 backoff_factor: float = 0.5, backoff_max: float = 30.0,
+                 retry_statuses: Sequence[int] = DEFAULT_RETRY_STATUSES,
+                 session: Optional[requests.Session] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            headers: Default headers sent with every request
+            pool_connections: Number of per-host pools to cache
+            pool_maxsize: Keep-alive connections per host (match the fetch concurrency)
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between bytes of the response
+            max_retries: Retries after the first attempt (0 disables retrying)
+            backoff_factor: Base of the exponential backoff in seconds
+            backoff_max: Upper bound of a single backoff sleep in seconds
+            retry_statuses: Response statuses that are retried
+            session: Existing session to configure (a new one by default)
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.stats = TransportStats()
+
+        self.session = session or requests.Session()
+        # Retries are handled here so every attempt is timed and logged
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept-Encoding': ACCEPT_ENCODING})
+        if headers:
+            self.session.headers.update(headers)
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Full-jitter exponential backoff, or the server's Retry-After when given in seconds."""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+    @staticmethod
+    def _wire_bytes(response: requests.Response) -> int:
+        """Bytes read from the socket (compressed size), falling back to the decoded size."""
+        try:
+            return int(response.raw.tell())
+        except (AttributeError, TypeError, ValueError, OSError):
+            return len(response.content)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        """
+        GET with timeouts and retries.
+
+        Args:
+            url: Request URL
+            params: Query parameters
+            **kwargs: Extra arguments for ``requests.Session.get``
+
+        Returns:
+            The final response (which may still carry an error status once retries run out)
+
+        Raises:
+            requests.exceptions.RequestException: When every attempt failed without a response
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        attempt = 0
+
+        while True:
+            attempt += 1
+            try:
+                response = self.session.get(url, params=params, **kwargs)
+                # Read the body inside the retry loop so truncated transfers are retried too
+                content_length = len(response.content)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                if attempt > self.max_retries:
+                    self.stats.record(url, None, attempt, time.perf_counter() - started, 0, 0, str(e))
+                    raise
+                delay = self._backoff(attempt - 1)
+                logger.warning(f"GET {url} failed ({e}); retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in self.retry_statuses and attempt <= self.max_retries:
+                delay = self._backoff(attempt - 1, response)
+                logger.warning(
+                    f"GET {url} returned {response.status_code}; retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                response.close()
+                time.sleep(delay)
+                continue
+
+            elapsed = time.perf_counter() - started
+            self.stats.record(url, response.status_code, attempt, elapsed,
+                              self._wire_bytes(response), content_length)
+            logger.debug(f"GET {url} -> {response.status_code} in {elapsed * 1000:.1f}ms ({attempt} attempt(s))")
+            return response
+
+    def close(self):
+        self.session.close()
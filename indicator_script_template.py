@@ -6,136 +6,675 @@ Supports all output types: Numerical, Chart-based, and Geospatial outputs
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
-from typing import List, Dict, Any, Optional
+import os
+from typing import List, Dict, Any, Optional, Iterable, Callable, Tuple
 
-def generate_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None) -> List[Dict]:
+# The helper modules below ship next to the template. A single-file ``scriptFile``
+# deploy computes the default outputs with plain pandas; parameters that need a
+# missing helper (stores, filters, approximate or warehouse mode, change
+# detection) fail with an error naming it.
+try:
+    import categorical_kernels as kernels
+except ImportError:
+    kernels = None
+
+try:
+    from ingest_log import locked, row_keys
+except ImportError:
+    locked = row_keys = None
+
+try:
+    from count_cube import CountCube
+except ImportError:
+    CountCube = None
+
+try:
+    from filter_plan import FilterPlan
+except ImportError:
+    FilterPlan = None
+
+try:
+    from output_diff import OutputHashStore, mark_changes
+except ImportError:
+    OutputHashStore = None
+    mark_changes = None
+
+try:
+    from approximate import DEFAULT_PER_STRATUM, Estimate, ExactRefresher, ReservoirSample, StratifiedReservoir
+except ImportError:
+    DEFAULT_PER_STRATUM = None
+    Estimate = ExactRefresher = ReservoirSample = StratifiedReservoir = None
+
+try:
+    from warehouse import SubmissionWarehouse
+except ImportError:
+    SubmissionWarehouse = None
+
+try:
+    from sliding_windows import SlidingWindows
+except ImportError:
+    SlidingWindows = None
+
+try:
+    from geospatial_index import assign_regions
+    from heatmap_tiles import TilePyramid
+except ImportError:  # script deployed without the geospatial helpers
+    assign_regions = None
+    TilePyramid = None
+
+# Geospatial defaults; all of them can be overridden through ``parameters``
+DEFAULT_MAP_ZOOM = 10
+DEFAULT_MAX_MAP_POINTS = 2000
+DEFAULT_MAX_HEATMAP_POINTS = 5000
+CLUSTER_RADIUS_PX = 60
+HEATMAP_RADIUS_PX = 20
+
+# Exact executions scheduled behind approximate ones (see ``approximate``)
+EXACT_RUNS = ExactRefresher() if ExactRefresher is not None else None
+APPROXIMATE_PARAMETERS = ('approximate', 'approximateKey', 'sampleStore', 'onExact')
+
+# Open SQL warehouses by path (see ``warehouse``)
+WAREHOUSES: Dict[str, 'SubmissionWarehouse'] = {}
+# Loaded tile pyramids by store directory, with the stamp of the files they were read from
+TILE_PYRAMIDS: Dict[str, Tuple[Any, 'TilePyramid']] = {}
+
+# Parameter -> (helper module it needs, whether that helper was importable)
+REQUIRED_HELPERS = {
+    'warehouse': ('warehouse', None not in (SubmissionWarehouse, CountCube, FilterPlan)),
+    'approximate': ('approximate', None not in (StratifiedReservoir, CountCube)),
+    'sampleStore': ('approximate', None not in (StratifiedReservoir, locked)),
+    'countCubeStore': ('count_cube', None not in (CountCube, locked)),
+    'slidingWindowStore': ('sliding_windows', None not in (SlidingWindows, locked)),
+    'heatmapTileStore': ('heatmap_tiles', None not in (TilePyramid, locked)),
+    'filters': ('filter_plan', FilterPlan is not None),
+    'dateRange': ('filter_plan', FilterPlan is not None),
+    'outputHashStore': ('output_diff', None not in (OutputHashStore, locked)),
+    'previousOutputs': ('output_diff', mark_changes is not None),
+}
+
+def check_helpers(parameters: Dict):
+    """
+    Raise when a parameter needs a helper module the script was deployed without.
+    
+    Raises:
+        RuntimeError: Naming the parameter and the missing module
+    """
+    for parameter, (module, available) in REQUIRED_HELPERS.items():
+        if parameters.get(parameter) and not available:
+            raise RuntimeError(f"Parameter '{parameter}' needs {module}.py (and its helpers) deployed next to the script")
+
+def generate_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None,
+                     output_ids: Optional[Iterable[str]] = None) -> List[Dict]:
     """
     Generate comprehensive indicator outputs including numerical, chart-based, and geospatial data.
     
     Args:
         data: Input DataFrame containing the data to analyze
         parameters: Optional parameters for customization
+        output_ids: Optional IDs of the outputs to generate (defaults to ``parameters['outputIds']``,
+            or every registered output). Only the aggregates those outputs need are computed.
     
-    Returns:
-        List of output dictionaries in the standardized format
-    """
-    outputs = []
+    Change detection parameters:
+        previousOutputs: The previous execution's stored outputs (or an ``{id: contentHash}`` map)
+        outputHashStore: Path of a JSON file holding the previous hashes; updated after the run
+            (read and written under ``locked``)
+        onlyChanged: Return only outputs whose content changed
+        Outputs of the previous execution that are no longer produced (among the requested
+        ``outputIds``, when given) are returned as ``{"id", "removed": true, "changed": true}``
+        tombstones.
     
-    # 🔢 1. NUMERICAL OUTPUTS
-    outputs.extend(generate_numerical_outputs(data, parameters))
+    Approximate mode parameters:
+        approximate: True (or ``{"perStratum": 200, "confidence": 0.95, "seed": ...}``) to build
+            the outputs from a stratified (month x category) reservoir sample; numeric outputs
+            then carry a ``confidenceInterval`` and every output is marked ``approximate``
+        sampleStore: Path of a persisted reservoir, updated with the submissions in ``data``
+            (by ID) it has not sampled yet
+        approximateKey: Identifies the dataset; once the exact outputs for this key have been
+            computed in the background, they are returned instead of approximate ones
+        onExact: Callable receiving the exact outputs when the background run completes
+        The exact build only runs in the background when ``approximateKey`` or ``onExact``
+        is given.
     
-    # 📊 2. CHART-BASED OUTPUTS
-    outputs.extend(generate_chart_outputs(data, parameters))
+    Incremental parameters:
+        countCubeStore: Path of the persisted count cube (see ``count_cube``); every count
+            output, the monthly trend included, then covers all stored submissions. ``data``
+            may hold just the new submissions or the full dataset: submissions already
+            counted are skipped by ID
+        slidingWindowStore: Path of persisted per-day ring buffers (see ``sliding_windows``);
+            the monthly trend and radar outputs are then answered from the buffers. Like the
+            cube store, submissions of ``data`` already added are skipped by ID.
+        heatmapTileStore: Directory of the persisted heatmap tile pyramid served by the
+            ``tiles`` heatmap mode, updated the same way (see ``generate_heatmap_data``)
     
-    # 🗺️ 3. GEOSPATIAL OUTPUTS
-    outputs.extend(generate_geospatial_outputs(data, parameters))
+    Warehouse mode parameters:
+        warehouse: ``{"path": "submissions.db", "formId": "..."}`` to compute the aggregates as
+            SQL queries over the stored submissions; ``data`` (new or updated submissions,
+            may be empty) is upserted by ``id`` first. Takes precedence over approximate mode.
     
+    Returns:
+        List of output dictionaries in the standardized format; with change detection each
+        output also carries ``contentHash`` and ``changed``, followed by the tombstones
+    """
+    parameters = parameters or {}
+    check_helpers(parameters)
+    if output_ids is None:
+        output_ids = parameters.get('outputIds')
+    
+    # 🔢 1. NUMERICAL, 📊 2. CHART-BASED and 🗺️ 3. GEOSPATIAL OUTPUTS in registry order
+    entries = select_outputs(output_ids)
+    if parameters.get('warehouse'):
+        outputs = build_warehouse_outputs(data, parameters, entries)
+    elif parameters.get('approximate'):
+        outputs = generate_approximate_outputs(data, parameters, entries)
+    else:
+        outputs = build_outputs(data, parameters, entries)
+    
+    previous = parameters.get('previousOutputs')
+    scope = [entry['id'] for entry in entries] if output_ids is not None else None
+    only_changed = bool(parameters.get('onlyChanged'))
+    if parameters.get('outputHashStore'):
+        store = OutputHashStore(parameters['outputHashStore'])
+        with locked(store.path):
+            marked = mark_changes(outputs, store.load() if previous is None else previous, scope=scope)
+            store.save(marked)
+        return [output for output in marked if output['changed']] if only_changed else marked
+    if previous is not None:
+        return mark_changes(outputs, previous, only_changed, scope)
     return outputs
 
 def generate_numerical_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None) -> List[Dict]:
     """Generate numerical outputs including single values, percentages, ratios, and trends."""
+    return build_outputs(data, parameters, select_outputs(group='numerical'))
+
+def generate_chart_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None) -> List[Dict]:
+    """Generate various chart-based outputs."""
+    return build_outputs(data, parameters, select_outputs(group='chart'))
+
+def generate_geospatial_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None) -> List[Dict]:
+    """Generate geospatial outputs including maps, heatmaps, and choropleth charts."""
+    return build_outputs(data, parameters, select_outputs(group='geospatial'))
+
+def select_outputs(output_ids: Optional[Iterable[str]] = None, group: Optional[str] = None) -> List[Dict]:
+    """Return the registry entries for the requested output IDs and/or group, in registry order."""
+    wanted = set(output_ids) if output_ids is not None else None
+    return [
+        entry for entry in OUTPUT_REGISTRY
+        if (wanted is None or entry['id'] in wanted) and (group is None or entry['group'] == group)
+    ]
+
+def generate_approximate_outputs(data: pd.DataFrame, parameters: Dict, entries: List[Dict]) -> List[Dict]:
+    """
+    Build the entries from a stratified reservoir sample and schedule the exact build
+    when its result can be used (``approximateKey`` or ``onExact`` given).
+    
+    Returns the exact outputs instead when a background run for ``approximateKey``
+    has already completed.
+    """
+    key = parameters.get('approximateKey')
+    if key is not None:
+        exact = EXACT_RUNS.result(key)
+        if exact is not None:
+            return exact
+    
+    options = parameters['approximate'] if isinstance(parameters['approximate'], dict) else {}
+    store = parameters.get('sampleStore')
+    if store:
+        with locked(store):
+            if os.path.exists(store):
+                reservoir = StratifiedReservoir.load(store)
+            else:
+                reservoir = StratifiedReservoir(options.get('perStratum', DEFAULT_PER_STRATUM), seed=options.get('seed'))
+            population = reservoir.population
+            reservoir.update(data, only_new=True)
+            if reservoir.population != population or not os.path.exists(store):
+                reservoir.save(store)
+    else:
+        reservoir = StratifiedReservoir(options.get('perStratum', DEFAULT_PER_STRATUM), seed=options.get('seed'))
+        reservoir.update(data)
+    sample = reservoir.sample(options.get('confidence', 0.95))
+    outputs = build_outputs(sample.frame, parameters, entries, sample)
+    
+    on_exact = parameters.get('onExact')
+    if key is not None or on_exact is not None:
+        exact_parameters = {name: value for name, value in parameters.items() if name not in APPROXIMATE_PARAMETERS}
+        EXACT_RUNS.submit(
+            key,
+            lambda: build_outputs(data, exact_parameters, entries),
+            on_exact
+        )
+    return outputs
+
+def build_outputs(data: pd.DataFrame, parameters: Optional[Dict], entries: List[Dict],
+                  sample: Optional['ReservoirSample'] = None) -> List[Dict]:
+    """
+    Build the given registry entries, computing each shared aggregate at most once.
+    
+    The ``dateRange``/``filters`` parameters are applied first: equality filters as one
+    combined mask, then dates are parsed for the remaining rows only and the date range
+    becomes a slice of the sorted frame.
+    
+    With ``sample`` (``data`` is then ``sample.frame``) counts are weighted estimates and
+    numeric outputs get the confidence interval of their registry ``estimate``.
+    """
+    plan = FilterPlan.from_parameters(parameters) if FilterPlan is not None else None
+    if plan is not None:
+        data = plan.apply_filters(data)
+    
+    # Parse and sort dates once when any requested output is time-based
+    if (plan is not None and plan.has_date_range) or any('date' in entry['requires'] for entry in entries):
+        data = prepare_data(data)
+        if plan is not None:
+            data = plan.apply_date_range(data, is_sorted=True)
+    
+    aggregates = OutputAggregates(data, parameters, plan, sample)
+    outputs = []
+    
+    for entry in entries:
+        if not entry['available'](data):
+            continue
+        output = entry['build'](aggregates)
+        if output is None:
+            continue
+        if sample is not None:
+            output['approximate'] = True
+            estimate = entry['estimate'](aggregates) if 'estimate' in entry else None
+            if estimate is not None:
+                precision = output['data'].get('precision')
+                output['data']['value'] = round(estimate.value, precision) if precision else int(round(estimate.value))
+                output['data']['confidenceInterval'] = estimate.to_dict(precision)
+        outputs.append(output)
+    
+    return outputs
+
+def open_warehouse(path: str) -> 'SubmissionWarehouse':
+    """Open (once per process) the warehouse at ``path`` with the template's column names."""
+    if path not in WAREHOUSES:
+        WAREHOUSES[path] = SubmissionWarehouse(path, date_column='date', id_column='id', ignore_missing=False)
+    return WAREHOUSES[path]
+
+def build_warehouse_outputs(data: pd.DataFrame, parameters: Dict, entries: List[Dict]) -> List[Dict]:
+    """
+    Build the given registry entries from SQL aggregates over a warehouse form.
+    
+    ``data`` is upserted into the form first. Filters and the date range become WHERE
+    clauses; only grouped counts (and the coordinates the map outputs plot) reach pandas.
+    """
+    options = parameters['warehouse']
+    warehouse = open_warehouse(options['path'])
+    form_id = options.get('formId', 'default')
+    if data is not None and len(data):
+        warehouse.load(form_id, data)
+    
+    schema = warehouse.schema_frame(form_id, 'date')
+    aggregates = OutputAggregates(schema, parameters, FilterPlan.from_parameters(parameters),
+                                  warehouse=warehouse, form_id=form_id)
     outputs = []
+    for entry in entries:
+        if not entry['available'](schema):
+            continue
+        output = entry['build'](aggregates)
+        if output is not None:
+            outputs.append(output)
+    return outputs
+
+class OutputAggregates:
+    """Lazily computed aggregates shared between output builders."""
+    
+    def __init__(self, data: pd.DataFrame, parameters: Optional[Dict] = None,
+                 plan: Optional['FilterPlan'] = None, sample: Optional['ReservoirSample'] = None,
+                 warehouse: Optional['SubmissionWarehouse'] = None, form_id: Optional[str] = None):
+        self.data = data
+        self.parameters = parameters or {}
+        # None only without filter_plan, where no filters or date range can be given
+        self.plan = plan or (FilterPlan() if FilterPlan is not None else None)
+        self.sample = sample
+        # In warehouse mode ``data`` is the form's empty schema frame
+        self.warehouse = warehouse
+        self.form_id = form_id
+        self._cache = {}
+    
+    @property
+    def cube_store(self) -> Optional[str]:
+        """Path of the persisted count cube, used only for unfiltered exact executions."""
+        store = self.parameters.get('countCubeStore')
+        return store if store and self.unfiltered and self.sample is None and self.warehouse is None else None
+    
+    @property
+    def window_store(self) -> Optional[str]:
+        """Path of the persisted sliding windows, used under the same conditions as the cube store."""
+        store = self.parameters.get('slidingWindowStore')
+        return store if store and self.unfiltered and self.sample is None and self.warehouse is None else None
+    
+    @property
+    def tile_store(self) -> Optional[str]:
+        """Directory of the persisted heatmap tile pyramid, used under the same conditions as the cube store."""
+        store = self.parameters.get('heatmapTileStore')
+        return store if store and self.unfiltered and self.sample is None and self.warehouse is None else None
+    
+    @property
+    def unfiltered(self) -> bool:
+        return self.plan is None or self.plan.is_empty
+    
+    @property
+    def rows(self) -> np.ndarray:
+        """Sample row positions of ``data`` (the estimation domain after filtering)."""
+        return self.data['_row'].to_numpy()
+    
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._cache:
+            aggregate = WAREHOUSE_AGGREGATES.get(name) if self.warehouse is not None else None
+            self._cache[name] = (aggregate or AGGREGATES[name])(self)
+        return self._cache[name]
+
+def _region_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """Return the data itself, or a region-only frame derived from coordinates when region is missing."""
+    if 'region' not in data.columns and _has_coordinates(data) and assign_regions is not None:
+        return pd.DataFrame({'region': assign_regions(data)})
+    return data
+
+def _has_columns(*columns: str) -> Callable[[pd.DataFrame], bool]:
+    return lambda data: all(column in data.columns for column in columns)
+
+def _has_coordinates(data: pd.DataFrame) -> bool:
+    return 'latitude' in data.columns and 'longitude' in data.columns
+
+def _count_cube(agg: 'OutputAggregates') -> Optional['CountCube']:
+    """
+    Build the count cube for this execution.
+    
+    With ``countCubeStore`` the stored cube is loaded, updated with the submissions of
+    ``data`` it has not counted yet (by ID, so full datasets and retried runs are not
+    counted twice) and saved back under the store's lock, so counts cover all submissions.
+    """
+    if CountCube is None:
+        return None
+    if agg.sample is not None:
+        return CountCube.build(agg.data, weights=agg.data['_weight'].to_numpy())
+    store = agg.cube_store
+    if store is None:
+        return CountCube.build(agg.data)
+    
+    with locked(store):
+        if os.path.exists(store):
+            cube = CountCube.load(store).update(agg.data, only_new=True)
+        else:
+            cube = CountCube.build(agg.data, only_new=True)
+        cube.save(store)
+    return cube
+
+def _sliding_windows(agg: 'OutputAggregates') -> 'SlidingWindows':
+    """
+    Load the stored ring buffers, add the submissions of ``data`` not added yet (by ID),
+    expire old days and save, under the store's lock.
+    """
+    store = agg.window_store
+    with locked(store):
+        windows = SlidingWindows.load(store) if os.path.exists(store) else SlidingWindows()
+        windows.update(agg.data, only_new=True).advance(datetime.now())
+        windows.save(store)
+    return windows
+
+def _total(agg: 'OutputAggregates') -> int:
+    if agg.sample is not None:
+        return int(round(agg['total_estimate'].value))
+    return agg['cube'].total() if agg.cube_store else len(agg.data)
+
+def _counts(agg: 'OutputAggregates', column: str) -> pd.Series:
+    """Per-value counts of ``column`` from the cube (``value_counts()`` without count_cube)."""
+    cube = agg['cube']
+    return cube.counts(column) if cube is not None else agg.data[column].value_counts()
+
+def _time_series(agg: 'OutputAggregates') -> Dict[str, Any]:
+    cube = agg['cube']
+    return _time_series_from_counts(cube.series('month')) if cube is not None else generate_time_series_data(agg.data)
+
+def _stacked(agg: 'OutputAggregates') -> Dict[str, Any]:
+    cube = agg['cube']
+    return _stacked_from_pivot(cube.crosstab('category', 'status')) if cube is not None else generate_stacked_data(agg.data)
+
+def _encoded(agg: 'OutputAggregates', column: str) -> Optional['kernels.EncodedColumn']:
+    return kernels.encode(agg.data[column]) if kernels is not None else None
+
+def _indicator(agg: 'OutputAggregates', column: str, value: Any) -> np.ndarray:
+    return (agg.data[column] == value).to_numpy(dtype=np.float64)
+
+def _scaled(estimate: Optional['Estimate'], factor: float) -> Optional['Estimate']:
+    return estimate.scaled(factor) if estimate is not None else None
+
+def _trend_estimate(agg: 'OutputAggregates') -> Dict[str, Optional['Estimate']]:
+    """Estimated counts of the current and previous month and the change between them (in %)."""
+    data = prepare_data(agg.data)
+    current_month = datetime.now().replace(day=1)
+    previous_month = (current_month - timedelta(days=1)).replace(day=1)
+    rows = data['_row'].to_numpy()
+    current = np.zeros(len(data))
+    current[_date_bounds(data, current_month)] = 1
+    previous = np.zeros(len(data))
+    previous[_date_bounds(data, previous_month, current_month)] = 1
+    change = agg.sample.ratio(current, previous, rows)
+    return {
+        'current': agg.sample.total(current, rows),
+        'previous': agg.sample.total(previous, rows),
+        'change': change.scaled(100, -100) if change is not None else None
+    }
+
+def _trend(agg: 'OutputAggregates') -> Dict[str, Any]:
+    if agg.window_store:
+        return trend_from_windows(agg['windows'])
+    if agg.cube_store:
+        return trend_from_cube(agg['cube'])
+    if agg.sample is None:
+        return calculate_trend(agg.data)
+    estimate = agg['trend_estimate']
+    current_count = int(round(estimate['current'].value))
+    previous_count = int(round(estimate['previous'].value))
+    if estimate['change'] is None:
+        change_percentage = 100 if current_count > 0 else 0
+    else:
+        change_percentage = estimate['change'].value
+    return {
+        "change_percentage": round(change_percentage, 1),
+        "direction": "up" if change_percentage > 0 else "down" if change_percentage < 0 else "neutral",
+        "previous_value": previous_count,
+        "current_value": current_count
+    }
+
+def _choropleth(agg: 'OutputAggregates') -> Dict[str, Any]:
+    if 'region' in agg.data.columns:
+        return _choropleth_from_counts(_counts(agg, 'region'))
+    return generate_choropleth_data(_region_frame(agg.data))
+
+# Aggregates are computed from the shared OutputAggregates. Every count-based
+# output (totals, distributions, stacked bars, choropleth, monthly series and
+# trend) is a projection of one count cube (category x status x gender x region
+# x month), so with a cube store they all cover every stored submission; the
+# map and heatmap plot the rows of ``data`` and the radar compares row-level
+# windows of it (or the stored sliding windows). The dictionary encodings
+# (``*_codes``) serve the row-level radar windows.
+# In approximate mode the cube holds weighted sample counts and ``*_estimate``
+# aggregates give the numeric outputs' stratified estimates.
+AGGREGATES: Dict[str, Callable[['OutputAggregates'], Any]] = {
+    'cube': _count_cube,
+    'total': _total,
+    'status_codes': lambda agg: _encoded(agg, 'status'),
+    'gender_codes': lambda agg: _encoded(agg, 'gender'),
+    'category_counts': lambda agg: _counts(agg, 'category'),
+    'status_counts': lambda agg: _counts(agg, 'status'),
+    'gender_counts': lambda agg: _counts(agg, 'gender'),
+    'trend': _trend,
+    'time_series': _time_series,
+    'stacked': _stacked,
+    'windows': _sliding_windows,
+    'radar': lambda agg: (
+        radar_from_windows(agg['windows']) if agg.window_store
+        else generate_radar_data(agg.data, agg['status_codes'], agg['gender_codes'])
+    ),
+    'map': lambda agg: generate_map_data(agg.data, agg.parameters),
+    'heatmap': lambda agg: generate_heatmap_data(agg.data, agg.parameters, agg.tile_store),
+    'choropleth': _choropleth,
+    'total_estimate': lambda agg: agg.sample.total(np.ones(len(agg.data)), agg.rows),
+    'positive_estimate': lambda agg: _scaled(
+        agg.sample.proportion(_indicator(agg, 'status', 'positive'), agg.rows), 100
+    ),
+    'gender_ratio_estimate': lambda agg: agg.sample.ratio(
+        _indicator(agg, 'gender', 'male'), _indicator(agg, 'gender', 'female'), agg.rows
+    ),
+    'trend_estimate': _trend_estimate,
+}
+
+def _warehouse_frame(agg: 'OutputAggregates', columns: Iterable[str]) -> pd.DataFrame:
+    """Rows of the stored columns among ``columns`` (map outputs plot individual points)."""
+    return agg.warehouse.frame(agg.form_id, [column for column in columns if column in agg.data.columns], agg.plan)
+
+def _warehouse_trend(agg: 'OutputAggregates') -> Dict[str, Any]:
+    current_month = datetime.now().replace(day=1)
+    previous_month = (current_month - timedelta(days=1)).replace(day=1)
+    return _trend_from_counts(
+        agg.warehouse.count(agg.form_id, agg.plan, start=current_month),
+        agg.warehouse.count(agg.form_id, agg.plan, start=previous_month, end=current_month)
+    )
+
+def _warehouse_radar(agg: 'OutputAggregates') -> Dict[str, Any]:
+    """``generate_radar_data`` from per-period counts, group-bys and means."""
+    warehouse, form_id, plan = agg.warehouse, agg.form_id, agg.plan
+    
+    def period_values(start: datetime, end: Optional[datetime], urban_ratio: float) -> List[float]:
+        total = warehouse.count(form_id, plan, start, end)
+        shares = []
+        for column, value in (('status', 'positive'), ('gender', 'male')):
+            counts = warehouse.group_counts(form_id, [column], plan, start, end)
+            count = int(counts.loc[counts[column] == value, 'count'].sum())
+            shares.append(count / total * 100 if total > 0 else 0)
+        age = warehouse.mean(form_id, 'age', plan, start, end) if 'age' in agg.data.columns else 0
+        return [total, shares[0], age, shares[1], urban_ratio]
     
+    current_date = datetime.now()
+    current_values = period_values(current_date - timedelta(days=30), None, 75)
+    previous_values = period_values(current_date - timedelta(days=60), current_date - timedelta(days=30), 70)
+    return _radar_from_values(current_values, previous_values)
+
+def _warehouse_choropleth(agg: 'OutputAggregates') -> Dict[str, Any]:
+    if 'region' in agg.data.columns:
+        return _choropleth_from_counts(agg['cube'].counts('region'))
+    return generate_choropleth_data(_region_frame(_warehouse_frame(agg, ('latitude', 'longitude'))))
+
+# Warehouse mode replaces the aggregates that read rows by SQL queries; the
+# count-based outputs keep projecting the cube, built from one GROUP BY.
+WAREHOUSE_AGGREGATES: Dict[str, Callable[['OutputAggregates'], Any]] = {
+    'cube': lambda agg: agg.warehouse.count_cube(agg.form_id, plan=agg.plan),
+    'total': lambda agg: agg.warehouse.count(agg.form_id, agg.plan),
+    'trend': _warehouse_trend,
+    'radar': _warehouse_radar,
+    'map': lambda agg: generate_map_data(
+        _warehouse_frame(agg, ('id', 'status', 'latitude', 'longitude')), agg.parameters
+    ),
+    'heatmap': lambda agg: generate_heatmap_data(_warehouse_frame(agg, ('latitude', 'longitude')), agg.parameters),
+    'choropleth': _warehouse_choropleth,
+}
+
+CATEGORY_COLORS = ["#0088FE", "#00C49F", "#FFBB28", "#FF8042", "#8884D8"]
+STATUS_COLORS = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFEAA7"]
+
+# Output builders
+
+def _build_total_cases(agg: OutputAggregates) -> Dict:
     # Single Value Output
-    total_cases = len(data)
-    outputs.append({
+    return {
         "id": "total_cases",
         "name": "Total Cases",
         "type": "numeric_value",
         "description": "Total number of cases analyzed",
         "data": {
-            "value": total_cases,
+            "value": agg['total'],
             "unit": "cases",
             "format": "number",
             "precision": 0
         }
-    })
-    
+    }
+
+def _build_positive_percentage(agg: OutputAggregates) -> Dict:
     # Percentage Output
-    if 'status' in data.columns:
-        positive_cases = len(data[data['status'] == 'positive'])
-        positive_percentage = (positive_cases / total_cases) * 100 if total_cases > 0 else 0
-        
-        outputs.append({
-            "id": "positive_percentage",
-            "name": "Positive Cases Percentage",
-            "type": "numeric_value",
-            "description": "Percentage of positive cases",
-            "data": {
-                "value": round(positive_percentage, 1),
-                "unit": "%",
-                "format": "percentage",
-                "precision": 1
-            }
-        })
+    total_cases = agg['total']
+    positive_cases = int(agg['status_counts'].get('positive', 0))
+    positive_percentage = (positive_cases / total_cases) * 100 if total_cases > 0 else 0
     
+    return {
+        "id": "positive_percentage",
+        "name": "Positive Cases Percentage",
+        "type": "numeric_value",
+        "description": "Percentage of positive cases",
+        "data": {
+            "value": round(positive_percentage, 1),
+            "unit": "%",
+            "format": "percentage",
+            "precision": 1
+        }
+    }
+
+def _build_gender_ratio(agg: OutputAggregates) -> Optional[Dict]:
     # Ratio Output
-    if 'gender' in data.columns:
-        male_count = len(data[data['gender'] == 'male'])
-        female_count = len(data[data['gender'] == 'female'])
-        
-        if female_count > 0:
-            ratio = male_count / female_count
-            outputs.append({
-                "id": "gender_ratio",
-                "name": "Male:Female Ratio",
-                "type": "numeric_value",
-                "description": "Ratio of male to female cases",
-                "data": {
-                    "value": round(ratio, 2),
-                    "unit": "",
-                    "format": "ratio",
-                    "precision": 2
-                }
-            })
+    male_count = int(agg['gender_counts'].get('male', 0))
+    female_count = int(agg['gender_counts'].get('female', 0))
     
-    # Trend Value Output
-    if 'date' in data.columns:
-        trend_data = calculate_trend(data)
-        outputs.append({
-            "id": "monthly_trend",
-            "name": "Monthly Trend",
-            "type": "numeric_value",
-            "description": "Change from last month",
-            "data": {
-                "value": trend_data['change_percentage'],
-                "unit": "%",
-                "format": "trend",
-                "precision": 1,
-                "trendDirection": trend_data['direction'],
-                "previousValue": trend_data['previous_value'],
-                "currentValue": trend_data['current_value']
-            }
-        })
+    if female_count == 0:
+        return None
     
-    return outputs
+    return {
+        "id": "gender_ratio",
+        "name": "Male:Female Ratio",
+        "type": "numeric_value",
+        "description": "Ratio of male to female cases",
+        "data": {
+            "value": round(male_count / female_count, 2),
+            "unit": "",
+            "format": "ratio",
+            "precision": 2
+        }
+    }
 
-def generate_chart_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None) -> List[Dict]:
-    """Generate various chart-based outputs."""
-    outputs = []
-    
+def _build_monthly_trend(agg: OutputAggregates) -> Dict:
+    # Trend Value Output
+    trend_data = agg['trend']
+    return {
+        "id": "monthly_trend",
+        "name": "Monthly Trend",
+        "type": "numeric_value",
+        "description": "Change from last month",
+        "data": {
+            "value": trend_data['change_percentage'],
+            "unit": "%",
+            "format": "trend",
+            "precision": 1,
+            "trendDirection": trend_data['direction'],
+            "previousValue": trend_data['previous_value'],
+            "currentValue": trend_data['current_value']
+        }
+    }
+
+def _build_category_bar_chart(agg: OutputAggregates) -> Dict:
     # Bar Chart - Vertical
-    if 'category' in data.columns:
-        category_counts = data['category'].value_counts()
-        outputs.append({
-            "id": "category_bar_chart",
-            "name": "Category Distribution",
-            "type": "bar_chart",
-            "description": "Distribution of cases by category",
-            "data": {
-                "categories": category_counts.index.tolist(),
-                "values": category_counts.values.tolist(),
-                "orientation": "vertical",
-                "colors": ["#0088FE", "#00C49F", "#FFBB28", "#FF8042", "#8884D8"],
-                "xAxisLabel": "Category",
-                "yAxisLabel": "Count"
-            }
-        })
-    
+    category_counts = agg['category_counts']
+    return {
+        "id": "category_bar_chart",
+        "name": "Category Distribution",
+        "type": "bar_chart",
+        "description": "Distribution of cases by category",
+        "data": {
+            "categories": category_counts.index.tolist(),
+            "values": category_counts.values.tolist(),
+            "orientation": "vertical",
+            "colors": CATEGORY_COLORS,
+            "xAxisLabel": "Category",
+            "yAxisLabel": "Count"
+        }
+    }
+
+def _build_category_horizontal_bar(agg: OutputAggregates) -> Dict:
     # Bar Chart - Horizontal
-    outputs.append({
+    category_counts = agg['category_counts']
+    return {
         "id": "category_horizontal_bar",
         "name": "Category Distribution (Horizontal)",
         "type": "bar_chart",
@@ -144,54 +683,56 @@ def generate_chart_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None
             "categories": category_counts.index.tolist(),
             "values": category_counts.values.tolist(),
             "orientation": "horizontal",
-            "colors": ["#0088FE", "#00C49F", "#FFBB28", "#FF8042", "#8884D8"],
+            "colors": CATEGORY_COLORS,
             "xAxisLabel": "Count",
             "yAxisLabel": "Category"
         }
-    })
-    
+    }
+
+def _build_trend_line_chart(agg: OutputAggregates) -> Dict:
     # Line Chart for Trends
-    if 'date' in data.columns:
-        time_series_data = generate_time_series_data(data)
-        outputs.append({
-            "id": "trend_line_chart",
-            "name": "Trend Over Time",
-            "type": "line_chart",
-            "description": "Case count trend over time",
-            "data": {
-                "labels": time_series_data['labels'],
-                "datasets": [
-                    {
-                        "label": "Cases",
-                        "data": time_series_data['values'],
-                        "borderColor": "#0088FE",
-                        "backgroundColor": "rgba(0, 136, 254, 0.1)",
-                        "fill": True
-                    }
-                ],
-                "xAxisLabel": "Date",
-                "yAxisLabel": "Count"
-            }
-        })
-    
+    time_series_data = agg['time_series']
+    return {
+        "id": "trend_line_chart",
+        "name": "Trend Over Time",
+        "type": "line_chart",
+        "description": "Case count trend over time",
+        "data": {
+            "labels": time_series_data['labels'],
+            "datasets": [
+                {
+                    "label": "Cases",
+                    "data": time_series_data['values'],
+                    "borderColor": "#0088FE",
+                    "backgroundColor": "rgba(0, 136, 254, 0.1)",
+                    "fill": True
+                }
+            ],
+            "xAxisLabel": "Date",
+            "yAxisLabel": "Count"
+        }
+    }
+
+def _build_status_pie_chart(agg: OutputAggregates) -> Dict:
     # Pie Chart
-    if 'status' in data.columns:
-        status_counts = data['status'].value_counts()
-        outputs.append({
-            "id": "status_pie_chart",
-            "name": "Status Distribution",
-            "type": "pie_chart",
-            "description": "Distribution of cases by status",
-            "data": {
-                "labels": status_counts.index.tolist(),
-                "values": status_counts.values.tolist(),
-                "colors": ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFEAA7"],
-                "showPercentage": True
-            }
-        })
-    
+    status_counts = agg['status_counts']
+    return {
+        "id": "status_pie_chart",
+        "name": "Status Distribution",
+        "type": "pie_chart",
+        "description": "Distribution of cases by status",
+        "data": {
+            "labels": status_counts.index.tolist(),
+            "values": status_counts.values.tolist(),
+            "colors": STATUS_COLORS,
+            "showPercentage": True
+        }
+    }
+
+def _build_status_donut_chart(agg: OutputAggregates) -> Dict:
     # Donut Chart
-    outputs.append({
+    status_counts = agg['status_counts']
+    return {
         "id": "status_donut_chart",
         "name": "Status Distribution (Donut)",
         "type": "donut_chart",
@@ -199,36 +740,39 @@ def generate_chart_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None
         "data": {
             "labels": status_counts.index.tolist(),
             "values": status_counts.values.tolist(),
-            "colors": ["#FF6B6B", "#4ECDC4", "#45B7D1", "#96CEB4", "#FFEAA7"],
+            "colors": STATUS_COLORS,
             "showPercentage": True,
             "innerRadius": 60
         }
-    })
-    
+    }
+
+def _build_area_chart(agg: OutputAggregates) -> Dict:
     # Area Chart
-    if 'date' in data.columns:
-        outputs.append({
-            "id": "area_chart",
-            "name": "Cases Over Time (Area)",
-            "type": "area_chart",
-            "description": "Area chart showing case volume over time",
-            "data": {
-                "labels": time_series_data['labels'],
-                "datasets": [
-                    {
-                        "label": "Cases",
-                        "data": time_series_data['values'],
-                        "backgroundColor": "rgba(0, 136, 254, 0.3)",
-                        "borderColor": "#0088FE"
-                    }
-                ],
-                "xAxisLabel": "Date",
-                "yAxisLabel": "Count"
-            }
-        })
-    
+    time_series_data = agg['time_series']
+    return {
+        "id": "area_chart",
+        "name": "Cases Over Time (Area)",
+        "type": "area_chart",
+        "description": "Area chart showing case volume over time",
+        "data": {
+            "labels": time_series_data['labels'],
+            "datasets": [
+                {
+                    "label": "Cases",
+                    "data": time_series_data['values'],
+                    "backgroundColor": "rgba(0, 136, 254, 0.3)",
+                    "borderColor": "#0088FE"
+                }
+            ],
+            "xAxisLabel": "Date",
+            "yAxisLabel": "Count"
+        }
+    }
+
+def _build_column_chart(agg: OutputAggregates) -> Dict:
     # Column Chart (Vertical Bar)
-    outputs.append({
+    category_counts = agg['category_counts']
+    return {
         "id": "column_chart",
         "name": "Category Distribution (Column)",
         "type": "column_chart",
@@ -236,127 +780,242 @@ def generate_chart_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None
         "data": {
             "categories": category_counts.index.tolist(),
             "values": category_counts.values.tolist(),
-            "colors": ["#0088FE", "#00C49F", "#FFBB28", "#FF8042", "#8884D8"],
+            "colors": CATEGORY_COLORS,
             "xAxisLabel": "Category",
             "yAxisLabel": "Count"
         }
-    })
-    
+    }
+
+def _build_stacked_bar_chart(agg: OutputAggregates) -> Dict:
     # Stacked Bar Chart
-    if 'category' in data.columns and 'status' in data.columns:
-        stacked_data = generate_stacked_data(data)
-        outputs.append({
-            "id": "stacked_bar_chart",
-            "name": "Category by Status (Stacked)",
-            "type": "stacked_bar_chart",
-            "description": "Stacked bar chart showing category distribution by status",
-            "data": {
-                "categories": stacked_data['categories'],
-                "datasets": stacked_data['datasets'],
-                "orientation": "vertical",
-                "xAxisLabel": "Category",
-                "yAxisLabel": "Count"
-            }
-        })
-    
+    stacked_data = agg['stacked']
+    return {
+        "id": "stacked_bar_chart",
+        "name": "Category by Status (Stacked)",
+        "type": "stacked_bar_chart",
+        "description": "Stacked bar chart showing category distribution by status",
+        "data": {
+            "categories": stacked_data['categories'],
+            "datasets": stacked_data['datasets'],
+            "orientation": "vertical",
+            "xAxisLabel": "Category",
+            "yAxisLabel": "Count"
+        }
+    }
+
+def _build_radar_chart(agg: OutputAggregates) -> Dict:
     # Radar/Spider Chart
-    if 'category' in data.columns:
-        radar_data = generate_radar_data(data)
-        outputs.append({
-            "id": "radar_chart",
-            "name": "Multi-dimensional Analysis",
-            "type": "radar_chart",
-            "description": "Radar chart showing multiple dimensions",
-            "data": {
-                "labels": radar_data['labels'],
-                "datasets": [
-                    {
-                        "label": "Current Period",
-                        "data": radar_data['current_values'],
-                        "borderColor": "#0088FE",
-                        "backgroundColor": "rgba(0, 136, 254, 0.2)"
-                    },
-                    {
-                        "label": "Previous Period",
-                        "data": radar_data['previous_values'],
-                        "borderColor": "#FF6B6B",
-                        "backgroundColor": "rgba(255, 107, 107, 0.2)"
-                    }
-                ]
-            }
-        })
-    
-    return outputs
+    radar_data = agg['radar']
+    return {
+        "id": "radar_chart",
+        "name": "Multi-dimensional Analysis",
+        "type": "radar_chart",
+        "description": "Radar chart showing multiple dimensions",
+        "data": {
+            "labels": radar_data['labels'],
+            "datasets": [
+                {
+                    "label": "Current Period",
+                    "data": radar_data['current_values'],
+                    "borderColor": "#0088FE",
+                    "backgroundColor": "rgba(0, 136, 254, 0.2)"
+                },
+                {
+                    "label": "Previous Period",
+                    "data": radar_data['previous_values'],
+                    "borderColor": "#FF6B6B",
+                    "backgroundColor": "rgba(255, 107, 107, 0.2)"
+                }
+            ]
+        }
+    }
 
-def generate_geospatial_outputs(data: pd.DataFrame, parameters: Optional[Dict] = None) -> List[Dict]:
-    """Generate geospatial outputs including maps, heatmaps, and choropleth charts."""
-    outputs = []
-    
+def _build_location_map(agg: OutputAggregates) -> Dict:
     # Map-based Visualization
-    if 'latitude' in data.columns and 'longitude' in data.columns:
-        map_data = generate_map_data(data)
-        outputs.append({
-            "id": "location_map",
-            "name": "Case Locations",
-            "type": "map_chart",
-            "description": "Map showing case locations",
-            "data": {
-                "points": map_data['points'],
-                "center": map_data['center'],
-                "zoom": 10,
-                "mapType": "point_map"
-            }
-        })
-    
+    map_data = agg['map']
+    return {
+        "id": "location_map",
+        "name": "Case Locations",
+        "type": "map_chart",
+        "description": "Map showing case locations",
+        "data": {
+            "points": map_data['points'],
+            "center": map_data['center'],
+            "zoom": map_data['zoom'],
+            "mapType": "point_map"
+        }
+    }
+
+def _build_case_heatmap(agg: OutputAggregates) -> Dict:
     # Heatmap
-    if 'latitude' in data.columns and 'longitude' in data.columns:
-        heatmap_data = generate_heatmap_data(data)
-        outputs.append({
-            "id": "case_heatmap",
-            "name": "Case Density Heatmap",
-            "type": "heatmap_chart",
-            "description": "Heatmap showing case density by location",
-            "data": {
-                "points": heatmap_data['points'],
-                "intensities": heatmap_data['intensities'],
-                "center": heatmap_data['center'],
-                "zoom": 10,
-                "radius": 20
-            }
-        })
+    heatmap_data = agg['heatmap']
+    return {
+        "id": "case_heatmap",
+        "name": "Case Density Heatmap",
+        "type": "heatmap_chart",
+        "description": "Heatmap showing case density by location",
+        "data": {
+            "points": heatmap_data['points'],
+            "intensities": heatmap_data['intensities'],
+            "center": heatmap_data['center'],
+            "zoom": heatmap_data['zoom'],
+            "radius": HEATMAP_RADIUS_PX
+        }
+    }
+
+def _build_regional_distribution(agg: OutputAggregates) -> Dict:
+    # Choropleth (region column, or regions derived from coordinates)
+    choropleth_data = agg['choropleth']
+    return {
+        "id": "regional_distribution",
+        "name": "Regional Distribution",
+        "type": "choropleth_chart",
+        "description": "Choropleth map showing regional case distribution",
+        "data": {
+            "regions": choropleth_data['regions'],
+            "values": choropleth_data['values'],
+            "colorScale": "Blues",
+            "minValue": choropleth_data['min_value'],
+            "maxValue": choropleth_data['max_value']
+        }
+    }
+
+# Output registry: every output declares its ID, type, group, the columns it
+# requires and the shared aggregates it is built from, in emission order.
+# Numeric outputs also name the ``estimate`` reported with approximate results.
+OUTPUT_REGISTRY: List[Dict[str, Any]] = [
+    {"id": "total_cases", "type": "numeric_value", "group": "numerical",
+     "requires": (), "aggregates": ('total',), "build": _build_total_cases,
+     "estimate": lambda agg: agg['total_estimate']},
+    {"id": "positive_percentage", "type": "numeric_value", "group": "numerical",
+     "requires": ('status',), "aggregates": ('total', 'status_counts'), "build": _build_positive_percentage,
+     "estimate": lambda agg: agg['positive_estimate']},
+    {"id": "gender_ratio", "type": "numeric_value", "group": "numerical",
+     "requires": ('gender',), "aggregates": ('gender_counts',), "build": _build_gender_ratio,
+     "estimate": lambda agg: agg['gender_ratio_estimate']},
+    {"id": "monthly_trend", "type": "numeric_value", "group": "numerical",
+     "requires": ('date',), "aggregates": ('trend',), "build": _build_monthly_trend,
+     "estimate": lambda agg: agg['trend_estimate']['change']},
+    {"id": "category_bar_chart", "type": "bar_chart", "group": "chart",
+     "requires": ('category',), "aggregates": ('category_counts',), "build": _build_category_bar_chart},
+    {"id": "category_horizontal_bar", "type": "bar_chart", "group": "chart",
+     "requires": ('category',), "aggregates": ('category_counts',), "build": _build_category_horizontal_bar},
+    {"id": "trend_line_chart", "type": "line_chart", "group": "chart",
+     "requires": ('date',), "aggregates": ('time_series',), "build": _build_trend_line_chart},
+    {"id": "status_pie_chart", "type": "pie_chart", "group": "chart",
+     "requires": ('status',), "aggregates": ('status_counts',), "build": _build_status_pie_chart},
+    {"id": "status_donut_chart", "type": "donut_chart", "group": "chart",
+     "requires": ('status',), "aggregates": ('status_counts',), "build": _build_status_donut_chart},
+    {"id": "area_chart", "type": "area_chart", "group": "chart",
+     "requires": ('date',), "aggregates": ('time_series',), "build": _build_area_chart},
+    {"id": "column_chart", "type": "column_chart", "group": "chart",
+     "requires": ('category',), "aggregates": ('category_counts',), "build": _build_column_chart},
+    {"id": "stacked_bar_chart", "type": "stacked_bar_chart", "group": "chart",
+     "requires": ('category', 'status'), "aggregates": ('stacked',), "build": _build_stacked_bar_chart},
+    {"id": "radar_chart", "type": "radar_chart", "group": "chart",
+     "requires": ('category', 'date', 'status', 'gender'), "aggregates": ('status_codes', 'gender_codes', 'radar'), "build": _build_radar_chart},
+    {"id": "location_map", "type": "map_chart", "group": "geospatial",
+     "requires": ('latitude', 'longitude'), "aggregates": ('map',), "build": _build_location_map},
+    {"id": "case_heatmap", "type": "heatmap_chart", "group": "geospatial",
+     "requires": ('latitude', 'longitude'), "aggregates": ('heatmap',), "build": _build_case_heatmap},
+    {"id": "regional_distribution", "type": "choropleth_chart", "group": "geospatial",
+     "requires": (), "aggregates": ('choropleth',), "build": _build_regional_distribution,
+     "available": lambda data: 'region' in data.columns or (_has_coordinates(data) and assign_regions is not None)},
+]
+
+for _entry in OUTPUT_REGISTRY:
+    _entry.setdefault('available', _has_columns(*_entry['requires']))
+
+# Helper functions
+def prepare_data(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prepare the input once for all generators without modifying the caller's frame.
     
-    # Choropleth (if region data is available)
-    if 'region' in data.columns:
-        choropleth_data = generate_choropleth_data(data)
-        outputs.append({
-            "id": "regional_distribution",
-            "name": "Regional Distribution",
-            "type": "choropleth_chart",
-            "description": "Choropleth map showing regional case distribution",
-            "data": {
-                "regions": choropleth_data['regions'],
-                "values": choropleth_data['values'],
-                "colorScale": "Blues",
-                "minValue": choropleth_data['min_value'],
-                "maxValue": choropleth_data['max_value']
-            }
-        })
+    Dates are parsed and sorted a single time and the period keys used by the
+    time-based charts are precomputed (``_day``, ``_week`` as ISO year*100+week,
+    ``_month``). Generators treat the result as read-only; passing an already
+    prepared frame (or a row subset of one) returns it unchanged.
+    """
+    if _is_prepared(data):
+        return data
     
-    return outputs
+    prepared = data.copy(deep=False)
+    if 'date' in prepared.columns:
+        dates = pd.to_datetime(prepared['date'])
+        order = np.argsort(dates.to_numpy(), kind='stable')
+        prepared = prepared.iloc[order].reset_index(drop=True)
+        dates = dates.iloc[order].reset_index(drop=True)
+        
+        iso = dates.dt.isocalendar()
+        prepared = prepared.assign(
+            date=dates,
+            _day=dates.dt.normalize(),
+            _week=(iso['year'] * 100 + iso['week']).astype('Int64'),
+            _month=dates.dt.to_period('M')
+        )
+    
+    return prepared
+
+def _is_prepared(data: pd.DataFrame) -> bool:
+    """
+    Whether a frame has the layout ``prepare_data`` produces: parsed dates sorted
+    ascending (missing dates last) and the period key columns.
+    
+    Checked on the data itself rather than a flag in ``attrs``, which pandas carries
+    over to frames built from a prepared one (concatenations, reorderings, edits).
+    """
+    if 'date' not in data.columns:
+        return True
+    dates = data['date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return False
+    if not {'_day', '_week', '_month'}.issubset(data.columns) or not isinstance(data['_month'].dtype, pd.PeriodDtype):
+        return False
+    present = dates.notna().to_numpy()
+    dated = int(present.sum())
+    return bool(present[:dated].all()) and dates.iloc[:dated].is_monotonic_increasing
+
+def _date_bounds(data: pd.DataFrame, start=None, end=None) -> slice:
+    """Row slice of a prepared frame with start <= date < end, found by binary search."""
+    dates = data['date']
+    lo = int(dates.searchsorted(pd.Timestamp(start), side='left')) if start is not None else 0
+    hi = int(dates.searchsorted(pd.Timestamp(end), side='left')) if end is not None else int(dates.notna().sum())
+    return slice(lo, hi)
 
-# Helper functions
 def calculate_trend(data: pd.DataFrame) -> Dict[str, Any]:
     """Calculate trend from previous month to current month."""
     if 'date' not in data.columns:
         return {"change_percentage": 0, "direction": "neutral", "previous_value": 0, "current_value": 0}
     
-    data['date'] = pd.to_datetime(data['date'])
+    data = prepare_data(data)
     current_month = datetime.now().replace(day=1)
     previous_month = (current_month - timedelta(days=1)).replace(day=1)
     
-    current_count = len(data[data['date'] >= current_month])
-    previous_count = len(data[(data['date'] >= previous_month) & (data['date'] < current_month)])
-    
+    current_rows = _date_bounds(data, current_month)
+    previous_rows = _date_bounds(data, previous_month, current_month)
+    return _trend_from_counts(current_rows.stop - current_rows.start, previous_rows.stop - previous_rows.start)
+
+def trend_from_windows(windows: 'SlidingWindows', form_id: str = 'default') -> Dict[str, Any]:
+    """``calculate_trend`` from the sliding windows (calendar months, day granularity)."""
+    current_month = datetime.now().date().replace(day=1)
+    previous_month = (current_month - timedelta(days=1)).replace(day=1)
+    return _trend_from_counts(
+        windows.count(form_id, start=current_month),
+        windows.count(form_id, start=previous_month, end=current_month)
+    )
+
+def trend_from_cube(cube: 'CountCube') -> Dict[str, Any]:
+    """``calculate_trend`` from the cube's monthly counts."""
+    if 'month' not in cube.dimensions:
+        return _trend_from_counts(0, 0)
+    current_month = datetime.now().replace(day=1)
+    previous_month = (current_month - timedelta(days=1)).replace(day=1)
+    return _trend_from_counts(
+        cube.count_of('month', current_month.strftime('%Y-%m')),
+        cube.count_of('month', previous_month.strftime('%Y-%m'))
+    )
+
+def _trend_from_counts(current_count: int, previous_count: int) -> Dict[str, Any]:
     if previous_count == 0:
         change_percentage = 100 if current_count > 0 else 0
     else:
@@ -374,22 +1033,28 @@ def generate_time_series_data(data: pd.DataFrame) -> Dict[str, Any]:
     if 'date' not in data.columns:
         return {"labels": [], "values": []}
     
-    data['date'] = pd.to_datetime(data['date'])
-    data['month'] = data['date'].dt.to_period('M')
-    monthly_counts = data.groupby('month').size()
-    
+    data = prepare_data(data)
+    return _time_series_from_counts(data.groupby('_month').size())
+
+def _time_series_from_counts(monthly_counts: pd.Series) -> Dict[str, Any]:
     return {
         "labels": [str(period) for period in monthly_counts.index],
         "values": monthly_counts.values.tolist()
     }
 
-def generate_stacked_data(data: pd.DataFrame) -> Dict[str, Any]:
-    """Generate stacked bar chart data."""
+def generate_stacked_data(data: pd.DataFrame, category: Optional['kernels.EncodedColumn'] = None,
+                          status: Optional['kernels.EncodedColumn'] = None) -> Dict[str, Any]:
+    """Generate stacked bar chart data (optionally from already encoded category/status columns)."""
     if 'category' not in data.columns or 'status' not in data.columns:
         return {"categories": [], "datasets": []}
     
-    pivot_table = pd.crosstab(data['category'], data['status'])
-    
+    if kernels is None:
+        return _stacked_from_pivot(pd.crosstab(data['category'], data['status']))
+    pivot_table = kernels.crosstab(category or kernels.encode(data['category']),
+                                   status or kernels.encode(data['status']))
+    return _stacked_from_pivot(pivot_table)
+
+def _stacked_from_pivot(pivot_table: pd.DataFrame) -> Dict[str, Any]:
     datasets = []
     colors = ["#0088FE", "#00C49F", "#FFBB28", "#FF8042", "#8884D8"]
     
@@ -405,100 +1070,261 @@ def generate_stacked_data(data: pd.DataFrame) -> Dict[str, Any]:
         "datasets": datasets
     }
 
-def generate_radar_data(data: pd.DataFrame) -> Dict[str, Any]:
-    """Generate radar chart data."""
-    # Example dimensions for radar chart
-    dimensions = ['total_cases', 'positive_rate', 'avg_age', 'male_ratio', 'urban_ratio']
+def generate_radar_data(data: pd.DataFrame, status: Optional['kernels.EncodedColumn'] = None,
+                        gender: Optional['kernels.EncodedColumn'] = None) -> Dict[str, Any]:
+    """Generate radar chart data (optionally from already encoded status/gender columns of the prepared frame)."""
+    if not _is_prepared(data):
+        data, status, gender = prepare_data(data), None, None
+    if kernels is not None:
+        status = status or kernels.encode(data['status'])
+        gender = gender or kernels.encode(data['gender'])
+    
+    def percentage(column: str, encoded: Optional['kernels.EncodedColumn'], value: Any, rows: slice) -> float:
+        if encoded is None:
+            values = data[column].iloc[rows]
+            return (values == value).sum() / len(values) * 100 if len(values) > 0 else 0
+        return kernels.percentage_of(kernels.EncodedColumn(encoded.codes[rows], encoded.categories), value)
+    
+    def period_values(rows: slice, urban_ratio: float) -> List[float]:
+        total = rows.stop - rows.start
+        return [
+            total,
+            percentage('status', status, 'positive', rows),
+            data['age'].iloc[rows].mean() if 'age' in data.columns else 0,
+            percentage('gender', gender, 'male', rows),
+            urban_ratio
+        ]
     
     # Calculate current period values (last 30 days)
     current_date = datetime.now()
-    current_data = data[pd.to_datetime(data['date']) >= current_date - timedelta(days=30)]
+    current_values = period_values(_date_bounds(data, current_date - timedelta(days=30)), 75)  # Example urban ratio
     
     # Calculate previous period values (30-60 days ago)
-    previous_data = data[
-        (pd.to_datetime(data['date']) >= current_date - timedelta(days=60)) &
-        (pd.to_datetime(data['date']) < current_date - timedelta(days=30))
-    ]
-    
-    current_values = [
-        len(current_data),
-        (len(current_data[current_data['status'] == 'positive']) / len(current_data) * 100) if len(current_data) > 0 else 0,
-        current_data['age'].mean() if 'age' in current_data.columns else 0,
-        (len(current_data[current_data['gender'] == 'male']) / len(current_data) * 100) if len(current_data) > 0 else 0,
-        75  # Example urban ratio
-    ]
-    
-    previous_values = [
-        len(previous_data),
-        (len(previous_data[previous_data['status'] == 'positive']) / len(previous_data) * 100) if len(previous_data) > 0 else 0,
-        previous_data['age'].mean() if 'age' in previous_data.columns else 0,
-        (len(previous_data[previous_data['gender'] == 'male']) / len(previous_data) * 100) if len(previous_data) > 0 else 0,
-        70  # Example urban ratio
-    ]
-    
+    previous_values = period_values(
+        _date_bounds(data, current_date - timedelta(days=60), current_date - timedelta(days=30)), 70
+    )
+    return _radar_from_values(current_values, previous_values)
+
+def _radar_from_values(current_values: List[float], previous_values: List[float]) -> Dict[str, Any]:
+    # Example dimensions for radar chart
+    dimensions = ['total_cases', 'positive_rate', 'avg_age', 'male_ratio', 'urban_ratio']
     return {
         "labels": dimensions,
         "current_values": [round(v, 1) for v in current_values],
         "previous_values": [round(v, 1) for v in previous_values]
     }
 
-def generate_map_data(data: pd.DataFrame) -> Dict[str, Any]:
-    """Generate map data for location-based visualizations."""
+def radar_from_windows(windows: 'SlidingWindows', form_id: str = 'default') -> Dict[str, Any]:
+    """
+    Radar chart data from the sliding windows: the last 30 days (today included) against
+    the 30 days before, at day granularity.
+    """
+    today = datetime.now().date()
+    
+    def period_values(start: date, end: Optional[date], urban_ratio: float) -> List[float]:
+        total = windows.count(form_id, start=start, end=end)
+        positive = windows.count(form_id, 'status', 'positive', start, end)
+        male = windows.count(form_id, 'gender', 'male', start, end)
+        age = windows.mean(form_id, 'age', start, end) if (form_id, 'age', None) in windows.keys else 0
+        return [
+            total,
+            positive / total * 100 if total > 0 else 0,
+            age,
+            male / total * 100 if total > 0 else 0,
+            urban_ratio
+        ]
+    
+    current_values = period_values(today - timedelta(days=29), None, 75)  # Example urban ratio
+    previous_values = period_values(today - timedelta(days=59), today - timedelta(days=29), 70)
+    return _radar_from_values(current_values, previous_values)
+
+def _coordinate_arrays(data: pd.DataFrame):
+    """Return finite latitude/longitude arrays and the mask of rows they were taken from."""
+    lat = pd.to_numeric(data['latitude'], errors='coerce').to_numpy(dtype=float)
+    lng = pd.to_numeric(data['longitude'], errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lng)
+    return lat[valid], lng[valid], valid
+
+def _bin_coordinates(lat: np.ndarray, lng: np.ndarray, lat_step: float, lng_step: float,
+                     origin: tuple = (0.0, 0.0)):
+    """Bin coordinates into a regular grid and return per-cell centroids and counts."""
+    lat_idx = np.floor((lat - origin[0]) / lat_step).astype(np.int64)
+    lng_idx = np.floor((lng - origin[1]) / lng_step).astype(np.int64)
+    lat_idx -= lat_idx.min()
+    lng_idx -= lng_idx.min()
+    cells = lat_idx * (int(lng_idx.max()) + 1) + lng_idx
+    _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    centroid_lat = np.bincount(inverse, weights=lat) / counts
+    centroid_lng = np.bincount(inverse, weights=lng) / counts
+    return centroid_lat, centroid_lng, counts
+
+def generate_map_data(data: pd.DataFrame, parameters: Optional[Dict] = None) -> Dict[str, Any]:
+    """Generate map data for location-based visualizations, clustering points when there are too many."""
+    parameters = parameters or {}
     if 'latitude' not in data.columns or 'longitude' not in data.columns:
-        return {"points": [], "center": [0, 0]}
-    
-    points = []
-    for _, row in data.iterrows():
-        if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-            points.append({
-                "lat": float(row['latitude']),
-                "lng": float(row['longitude']),
-                "title": f"Case ID: {row.get('id', 'N/A')}",
-                "description": f"Status: {row.get('status', 'N/A')}"
-            })
-    
-    # Calculate center point
-    if points:
-        center_lat = sum(p['lat'] for p in points) / len(points)
-        center_lng = sum(p['lng'] for p in points) / len(points)
-        center = [center_lat, center_lng]
-    else:
-        center = [0, 0]
+        return {"points": [], "center": [0, 0], "zoom": DEFAULT_MAP_ZOOM}
+    
+    zoom = int(parameters.get('mapZoom', DEFAULT_MAP_ZOOM))
+    max_points = int(parameters.get('maxMapPoints', DEFAULT_MAX_MAP_POINTS))
+    if max_points < 1:
+        raise ValueError(f"maxMapPoints must be at least 1, got {max_points}")
+    lat, lng, valid = _coordinate_arrays(data)
+    
+    if len(lat) == 0:
+        return {"points": [], "center": [0, 0], "zoom": zoom}
+    
+    center = [float(lat.mean()), float(lng.mean())]
+    
+    if len(lat) <= max_points:
+        ids = data['id'].to_numpy()[valid] if 'id' in data.columns else np.full(len(lat), 'N/A', dtype=object)
+        statuses = data['status'].to_numpy()[valid] if 'status' in data.columns else np.full(len(lat), 'N/A', dtype=object)
+        points = [
+            {
+                "lat": float(y),
+                "lng": float(x),
+                "title": f"Case ID: {case_id}",
+                "description": f"Status: {status}"
+            }
+            for y, x, case_id, status in zip(lat, lng, ids, statuses)
+        ]
+        return {"points": points, "center": center, "zoom": zoom}
     
-    return {"points": points, "center": center}
+    # Zoom-aware grid clustering: start from the cluster radius at the requested
+    # zoom and coarsen until the number of clusters fits the point budget. Cells
+    # of 360 degrees leave at most one cluster per quadrant, so stop there.
+    cell_size = CLUSTER_RADIUS_PX * 360.0 / (256 * 2 ** zoom)
+    while True:
+        cluster_lat, cluster_lng, counts = _bin_coordinates(lat, lng, cell_size, cell_size)
+        if len(counts) <= max_points or cell_size >= 360.0:
+            break
+        cell_size *= 2
+    
+    points = [
+        {
+            "lat": float(y),
+            "lng": float(x),
+            "title": f"{int(count)} cases",
+            "description": f"Cluster of {int(count)} cases",
+            "count": int(count)
+        }
+        for y, x, count in zip(cluster_lat, cluster_lng, counts)
+    ]
+    
+    return {"points": points, "center": center, "zoom": zoom}
+
+def _tile_store_stamp(tile_store: str) -> Optional[Tuple[int, int]]:
+    """Identity of the stored pyramid (``pyramid.json`` is replaced last on every save)."""
+    try:
+        stat = os.stat(os.path.join(tile_store, 'pyramid.json'))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def open_tile_pyramid(tile_store: str, data: pd.DataFrame) -> 'TilePyramid':
+    """
+    The pyramid stored in ``tile_store`` with the cases of ``data`` it has not counted yet.
+    
+    The loaded pyramid is kept per process while the store is unchanged, so panning and
+    zooming only hash ``data`` against it; the store is locked, updated and rewritten
+    only when ``data`` holds new cases.
+    """
+    keys = row_keys(data, ignore=['_month'])
+    cached = TILE_PYRAMIDS.get(tile_store)
+    if cached is not None and cached[0] == _tile_store_stamp(tile_store) and cached[1].ingested.seen(keys).all():
+        return cached[1]
+    
+    with locked(tile_store):
+        stamp = _tile_store_stamp(tile_store)
+        cached = TILE_PYRAMIDS.get(tile_store)
+        if cached is not None and cached[0] == stamp:
+            pyramid = cached[1]
+        else:
+            pyramid = TilePyramid.load(tile_store) if stamp is not None else TilePyramid()
+        new = ~pyramid.ingested.seen(keys)
+        if new.any():
+            # Updated in place: forget it unless the store is rewritten with it
+            TILE_PYRAMIDS.pop(tile_store, None)
+            pyramid.update(data[new], only_new=True).save(tile_store)
+            stamp = _tile_store_stamp(tile_store)
+        TILE_PYRAMIDS[tile_store] = (stamp, pyramid)
+    return pyramid
 
-def generate_heatmap_data(data: pd.DataFrame) -> Dict[str, Any]:
-    """Generate heatmap data."""
+def generate_heatmap_data(data: pd.DataFrame, parameters: Optional[Dict] = None,
+                          tile_store: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate heatmap data.
+    
+    Supported ``heatmapMode`` values:
+        exact   - one bucket per distinct (latitude, longitude) pair
+        grid    - square cells of ``heatmapCellSize`` degrees (derived from the zoom if omitted)
+        geohash - cells aligned to geohash boxes of ``geohashPrecision`` characters
+        auto    - exact while the number of buckets fits ``maxHeatmapPoints``, grid otherwise
+        tiles   - served for ``bbox`` from a tile pyramid (see heatmap_tiles.py): the one in
+                  ``tile_store`` (see ``open_tile_pyramid``), or one built from ``data``
+    
+    Args:
+        data: Case data (already filtered)
+        parameters: Heatmap parameters
+        tile_store: Directory of the persisted pyramid; the output aggregates pass
+            ``heatmapTileStore`` only for unfiltered exact executions, since the
+            stored pyramid covers every submission
+    """
+    parameters = parameters or {}
+    zoom = int(parameters.get('mapZoom', DEFAULT_MAP_ZOOM))
+    mode = parameters.get('heatmapMode', 'auto')
+    
     if 'latitude' not in data.columns or 'longitude' not in data.columns:
-        return {"points": [], "intensities": [], "center": [0, 0]}
+        return {"points": [], "intensities": [], "center": [0, 0], "zoom": zoom}
     
-    # Group by location and count cases
-    location_counts = data.groupby(['latitude', 'longitude']).size().reset_index(name='count')
+    if mode == 'tiles' and TilePyramid is not None:
+        if tile_store is None:
+            pyramid = TilePyramid.build(data)
+        else:
+            pyramid = open_tile_pyramid(tile_store, data)
+        return pyramid.get_heatmap(parameters.get('bbox'), zoom)
+    elif mode == 'tiles':
+        mode = 'auto'
     
-    points = []
-    intensities = []
+    max_points = int(parameters.get('maxHeatmapPoints', DEFAULT_MAX_HEATMAP_POINTS))
+    lat, lng, _ = _coordinate_arrays(data)
     
-    for _, row in location_counts.iterrows():
-        if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-            points.append([float(row['latitude']), float(row['longitude'])])
-            intensities.append(int(row['count']))
+    if len(lat) == 0:
+        return {"points": [], "intensities": [], "center": [0, 0], "zoom": zoom}
     
-    # Calculate center
-    if points:
-        center_lat = sum(p[0] for p in points) / len(points)
-        center_lng = sum(p[1] for p in points) / len(points)
-        center = [center_lat, center_lng]
-    else:
-        center = [0, 0]
+    if mode in ('exact', 'auto'):
+        unique_coords, counts = np.unique(lat + 1j * lng, return_counts=True)
+        bucket_lat, bucket_lng = unique_coords.real, unique_coords.imag
+        if mode == 'auto' and len(counts) > max_points:
+            mode = 'grid'
+    
+    if mode == 'grid':
+        cell_size = parameters.get('heatmapCellSize')
+        cell_size = float(cell_size) if cell_size else HEATMAP_RADIUS_PX * 360.0 / (256 * 2 ** zoom)
+        bucket_lat, bucket_lng, counts = _bin_coordinates(lat, lng, cell_size, cell_size)
+    elif mode == 'geohash':
+        precision = int(parameters.get('geohashPrecision', 5))
+        lng_bits = (5 * precision + 1) // 2
+        lat_bits = (5 * precision) // 2
+        bucket_lat, bucket_lng, counts = _bin_coordinates(
+            lat, lng, 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits, origin=(-90.0, -180.0)
+        )
+    elif mode not in ('exact', 'auto'):
+        raise ValueError(f"Unknown heatmap mode: {mode}")
     
-    return {"points": points, "intensities": intensities, "center": center}
+    points = np.column_stack([bucket_lat, bucket_lng]).tolist()
+    center = [float(bucket_lat.mean()), float(bucket_lng.mean())]
+    
+    return {"points": points, "intensities": counts.astype(int).tolist(), "center": center, "zoom": zoom}
 
 def generate_choropleth_data(data: pd.DataFrame) -> Dict[str, Any]:
     """Generate choropleth data for regional visualization."""
     if 'region' not in data.columns:
         return {"regions": [], "values": [], "min_value": 0, "max_value": 0}
     
-    region_counts = data['region'].value_counts()
+    return _choropleth_from_counts(data['region'].value_counts())
+
+def _choropleth_from_counts(region_counts: pd.Series) -> Dict[str, Any]:
+    region_counts = region_counts[region_counts > 0]
     
     return {
         "regions": region_counts.index.tolist(),
@@ -520,7 +1346,7 @@ def main():
     # For demonstration, create sample data
     sample_data = pd.DataFrame({
         'id': range(1, 101),
-        'date': pd.date_range(start='2024-01-01', periods=100, freq='D'),
+        'date': pd.date_range(end=datetime.now(), periods=100, freq='D'),
         'category': np.random.choice(['A', 'B', 'C', 'D'], 100),
         'status': np.random.choice(['positive', 'negative', 'pending'], 100),
         'gender': np.random.choice(['male', 'female'], 100),
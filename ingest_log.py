@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Ingest Log
+==========
+
+Remembers which submissions an incremental store (count cube, sliding windows,
+categorical sketches, heatmap tiles) has already folded in. Executions normally
+pass the whole dataset, and runs are retried, so stores only add the rows whose
+ID they have not seen; late-synced submissions with old dates are still added.
+
+Submission IDs (``_id``/``id``) are kept as a sorted array of 64-bit hashes, so
+checking a batch is one ``searchsorted``. Frames without an ID column are keyed
+by content: the k-th row with the same answers gets its own key, so identical
+submissions are all counted and passing the same frame again adds nothing.
+
+``locked(path)`` serialises the load-update-save cycle of a store file between
+threads and processes.
+
+Usage:
+    new_rows = log.claim(row_keys(data))
+    cube.update(data[new_rows])
+"""
+
+import base64
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from dedup import data_columns, row_hashes
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; threads are still serialised
+    fcntl = None
+
+ID_COLUMNS = ('_id', 'id')
+
+_THREAD_LOCKS = {}
+_THREAD_LOCKS_GUARD = threading.Lock()
+
+
+def row_keys(data: pd.DataFrame, id_column: Optional[str] = None, ignore: Iterable[str] = ()) -> np.ndarray:
+    """
+    64-bit identity hash per row.
+
+    Args:
+        data: Submissions
+        id_column: ID column (defaults to the first of ID_COLUMNS present)
+        ignore: Columns left out of the content hash used when there is no ID column
+            (metadata and dates are already left out, see ``dedup.data_columns``)
+
+    Returns:
+        uint64 array, one hash per row
+    """
+    if id_column is None:
+        id_column = next((column for column in ID_COLUMNS if column in data.columns), None)
+    if id_column is not None and id_column in data.columns:
+        return pd.util.hash_pandas_object(data[id_column].astype(str), index=False).to_numpy()
+    content = row_hashes(data, data_columns(data, ignore))
+    # Number repeated contents so identical submissions keep distinct keys
+    occurrence = pd.Series(content).groupby(content).cumcount().to_numpy(dtype=np.uint64)
+    return pd.util.hash_array(content ^ (occurrence * np.uint64(0x9E3779B97F4A7C15)))
+
+
+class IngestLog:
+    """
+    Sorted hashes of the submissions a store has already ingested.
+    """
+
+    def __init__(self, hashes: Optional[np.ndarray] = None):
+        self.hashes = np.sort(np.asarray(hashes, dtype=np.uint64)) if hashes is not None \
+            else np.empty(0, dtype=np.uint64)
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def seen(self, keys: np.ndarray) -> np.ndarray:
+        """Whether each key has been ingested."""
+        if not len(self.hashes):
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.hashes, keys), len(self.hashes) - 1)
+        return self.hashes[positions] == keys
+
+    def claim(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Record a batch and return the mask of its rows not ingested before.
+
+        Only the first row of keys repeated inside the batch is claimed.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        new = ~self.seen(keys) & ~pd.Series(keys).duplicated().to_numpy()
+        if new.any():
+            self.hashes = np.union1d(self.hashes, keys[new])
+        return new
+
+    def encode(self) -> str:
+        """Compact text form for JSON stores."""
+        return base64.b64encode(self.hashes.astype('<u8').tobytes()).decode('ascii')
+
+    @classmethod
+    def decode(cls, text: str) -> 'IngestLog':
+        return cls(np.frombuffer(base64.b64decode(text), dtype='<u8'))
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on ``path + '.lock'`` (threads and processes) for the block."""
+    with _THREAD_LOCKS_GUARD:
+        thread_lock = _THREAD_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
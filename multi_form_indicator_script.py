@@ -27,6 +27,23 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import sys
 import os
+import multiprocessing
+import socket
+import threading
+
+from filter_plan import FilterPlan
+from http_transport import HTTPTransport
+from single_flight import SingleFlight
+from skip_logic import SkipLogicProgram
+from validation_rules import ValidationProgram, ValidationResult
+from record_linkage import RecordLinker, summarize_links
+from dedup import deduplicate
+from sketches import SketchStore
+from correlation_kernels import DEFAULT_MAX_MEMORY, correlation_matrix, screen_correlations
+from approximate import DEFAULT_PER_STRATUM, Estimate, ExactRefresher, ReservoirSample, StratifiedReservoir
+from sharded_execution import (DEFAULT_RUN_TIMEOUT, RECENT_DAYS, JobQueue, finish_run, reduce_run, run_worker,
+                               submit_run, temporal_summary)
+from warehouse import SubmissionWarehouse
 
 # Configure logging
 logging.basicConfig(
@@ -39,40 +56,377 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Correlation matrices are only reported in full up to this many variables
+CORRELATION_MATRIX_LIMIT = 200
+# Response-time medians are taken over at most this many (uniformly sampled) pairs
+RESPONSE_TIME_MEDIAN_SAMPLE = 200_000
+# Keep-alive connections of the default transport
+DEFAULT_FETCH_CONCURRENCY = 4
+
+class FormTimeIndex:
+    """
+    Time index over one form's submissions, built once and shared by all time-based indicators.
+    
+    The frame is sorted by ``submission_date`` and indexed by a monotonic DatetimeIndex,
+    with offsets marking where each calendar month starts, so window queries are
+    ``searchsorted`` slices instead of full boolean scans.
+    """
+    
+    def __init__(self, df: pd.DataFrame, date_column: str = 'submission_date'):
+        """
+        Build the index.
+        
+        Args:
+            df: Normalized form DataFrame (left unmodified)
+            date_column: Column holding the submission timestamp
+        """
+        self.source = df
+        dates = pd.to_datetime(df[date_column])
+        valid = dates.notna().to_numpy()
+        order = np.argsort(dates.to_numpy()[valid], kind='stable')
+        
+        self.frame = df.iloc[np.flatnonzero(valid)[order]]
+        # Nanosecond resolution, so ``dates.asi8`` offsets are always in ns
+        self.frame.index = pd.DatetimeIndex(dates[valid].iloc[order].to_numpy(), name=date_column).as_unit('ns')
+        self.dates = self.frame.index
+        
+        # Month partitions: months[i] spans rows month_offsets[i]:month_offsets[i + 1]
+        month_starts = (self.dates.tz_localize(None) if self.dates.tz is not None else self.dates).to_period('M')
+        if len(month_starts):
+            boundaries = np.flatnonzero(month_starts[1:] != month_starts[:-1]) + 1
+            self.month_offsets = np.concatenate([[0], boundaries, [len(self.dates)]])
+            self.months = month_starts[self.month_offsets[:-1]]
+        else:
+            self.month_offsets = np.array([0])
+            self.months = pd.PeriodIndex([], freq='M')
+    
+    def __len__(self) -> int:
+        return len(self.frame)
+    
+    def _timestamp(self, value) -> pd.Timestamp:
+        """Convert a bound to a Timestamp comparable with the index."""
+        value = pd.Timestamp(value)
+        if self.dates.tz is not None and value.tz is None:
+            return value.tz_localize(self.dates.tz)
+        if self.dates.tz is None and value.tz is not None:
+            return value.tz_convert(None)
+        return value
+    
+    def now(self) -> pd.Timestamp:
+        return pd.Timestamp.now(tz=self.dates.tz)
+    
+    def between(self, start=None, end=None) -> pd.DataFrame:
+        """Rows with start <= submission_date < end."""
+        lo = self.dates.searchsorted(self._timestamp(start), side='left') if start is not None else 0
+        hi = self.dates.searchsorted(self._timestamp(end), side='left') if end is not None else len(self.dates)
+        return self.frame.iloc[lo:hi]
+    
+    def last_days(self, days: int, now=None) -> pd.DataFrame:
+        """Rows submitted within the last ``days`` days."""
+        now = self._timestamp(now) if now is not None else self.now()
+        return self.between(now - pd.Timedelta(days=days))
+    
+    def month(self, period) -> pd.DataFrame:
+        """Rows of one calendar month (a Period, 'YYYY-MM' string or position, negative from the end)."""
+        if isinstance(period, (int, np.integer)):
+            position = int(period) + (len(self.months) if period < 0 else 0)
+            if not 0 <= position < len(self.months):
+                return self.frame.iloc[0:0]
+        else:
+            matches = np.flatnonzero(self.months == pd.Period(period, freq='M'))
+            if len(matches) == 0:
+                return self.frame.iloc[0:0]
+            position = int(matches[0])
+        return self.frame.iloc[self.month_offsets[position]:self.month_offsets[position + 1]]
+    
+    def month_counts(self) -> Dict[Tuple[int, int], int]:
+        """Submission counts per (year, month), straight from the partition offsets."""
+        return {
+            (period.year, period.month): int(count)
+            for period, count in zip(self.months, np.diff(self.month_offsets))
+        }
+
+def _metadata_label(value: Any) -> str:
+    """String form of a form's ``_id``/``name`` (unwrapping Mongo ``{'$oid': ...}``; '' when missing)."""
+    if isinstance(value, dict) and '$oid' in value:
+        value = value['$oid']
+    return '' if value is None else str(value)
+
+def _window_pair_stats(dates1: np.ndarray, dates2: np.ndarray, window: int,
+                       weights1: Optional[np.ndarray] = None, weights2: Optional[np.ndarray] = None,
+                       median_sample: int = RESPONSE_TIME_MEDIAN_SAMPLE) -> Optional[Dict[str, float]]:
+    """
+    Statistics of ``|date2 - date1|`` (in hours) over all pairs at most ``window`` apart.
+    
+    Both date arrays are sorted int64 nanoseconds, so each date1 matches the contiguous
+    slice ``dates2[lo:hi]``, split at ``mid`` into earlier and later dates. Counts, sums,
+    minima and maxima then come from the slice bounds and prefix sums over ``dates2``
+    without materialising the pairs; the median is exact up to ``median_sample`` pairs
+    and taken over a uniform sample of them beyond that.
+    
+    Args:
+        dates1: Sorted dates of the first form
+        dates2: Sorted dates of the second form
+        window: Maximum distance in nanoseconds
+        weights1: Optional sampling weights of ``dates1`` (a pair weighs weight1 x weight2)
+        weights2: Optional sampling weights of ``dates2``
+        median_sample: Pairs the median is computed from
+    
+    Returns:
+        Dict with ``count`` (weighted when weights are given), ``mean``, ``median``, ``min``
+        and ``max``, or None when no pair is within the window
+    """
+    lo = np.searchsorted(dates2, dates1 - window, side='left')
+    mid = np.searchsorted(dates2, dates1, side='left')
+    hi = np.searchsorted(dates2, dates1 + window, side='right')
+    pair_counts = hi - lo
+    matched = pair_counts > 0
+    total_pairs = int(pair_counts.sum())
+    if total_pairs == 0:
+        return None
+    
+    # Hours relative to the earliest date keep the prefix sums small enough for float64
+    base = min(dates1[0], dates2[0])
+    hours1 = (dates1 - base) / (3600 * 10 ** 9)
+    hours2 = (dates2 - base) / (3600 * 10 ** 9)
+    w1 = np.ones(len(dates1)) if weights1 is None else np.asarray(weights1, dtype=np.float64)
+    w2 = np.ones(len(dates2)) if weights2 is None else np.asarray(weights2, dtype=np.float64)
+    prefix_weight = np.concatenate([[0.0], np.cumsum(w2)])
+    prefix_hours = np.concatenate([[0.0], np.cumsum(w2 * hours2)])
+    
+    # sum |h2 - h1| = h1 * W[lo:mid] - S[lo:mid] + S[mid:hi] - h1 * W[mid:hi], per date1
+    below_weight = prefix_weight[mid] - prefix_weight[lo]
+    above_weight = prefix_weight[hi] - prefix_weight[mid]
+    below_hours = prefix_hours[mid] - prefix_hours[lo]
+    above_hours = prefix_hours[hi] - prefix_hours[mid]
+    distance = hours1 * below_weight - below_hours + above_hours - hours1 * above_weight
+    weight = w1 * (below_weight + above_weight)
+    
+    # Nearest and farthest partner of each matched date1
+    m_lo, m_mid, m_hi, m_hours = lo[matched], mid[matched], hi[matched], hours1[matched]
+    before = np.where(m_mid > m_lo, m_hours - hours2[np.maximum(m_mid - 1, 0)], np.inf)
+    after = np.where(m_mid < m_hi, hours2[np.minimum(m_mid, len(dates2) - 1)] - m_hours, np.inf)
+    farthest = np.maximum(m_hours - hours2[m_lo], hours2[m_hi - 1] - m_hours)
+    
+    # Pair k belongs to the date1 whose cumulative pair count first exceeds it
+    if total_pairs <= median_sample:
+        pairs = np.arange(total_pairs)
+    else:
+        pairs = np.random.default_rng(0).integers(0, total_pairs, median_sample)
+    ends = np.cumsum(pair_counts)
+    first = np.searchsorted(ends, pairs, side='right')
+    second = lo[first] + (pairs - (ends[first] - pair_counts[first]))
+    sampled = np.abs(hours2[second] - hours1[first])
+    
+    total_weight = float(weight.sum())
+    return {
+        'count': total_weight,
+        'mean': float((w1 * distance).sum() / total_weight),
+        'median': float(np.median(sampled)),
+        'min': float(np.minimum(before, after).min()),
+        'max': float(farthest.max())
+    }
+
 class MultiFormIndicatorProcessor:
     """
     A class to process indicators that require data from multiple forms.
     """
     
-    def __init__(self, api_base_url: str, auth_token: str):
+    def __init__(self, api_base_url: str, auth_token: str, fetch_concurrency: Optional[int] = None,
+                 transport: Optional[HTTPTransport] = None, freshness_window: float = 5.0,
+                 sketch_store: Optional[SketchStore] = None, warehouse: Optional[SubmissionWarehouse] = None):
         """
         Initialize the processor with API configuration.
         
         Args:
             api_base_url: Base URL for the API
             auth_token: Authentication token
+            fetch_concurrency: Number of concurrent fetches; sizes the keep-alive pool of the
+                default transport (defaults to DEFAULT_FETCH_CONCURRENCY)
+            transport: Preconfigured HTTP transport (timeouts, retries, pool size); its own
+                ``pool_maxsize`` applies, so it cannot be combined with ``fetch_concurrency``
+            freshness_window: Seconds a fetched form result is shared with later callers
+            sketch_store: Persisted categorical sketches per (form, variable, month); kept
+                up to date with the analysed submissions and merged for categorical summaries
+            warehouse: SQL store of normalized submissions; ``calculate_warehouse_indicators``
+                computes the indicators as SQL aggregates over it
         """
         self.api_base_url = api_base_url.rstrip('/')
         self.auth_token = auth_token
-        self.session = requests.Session()
-        self.session.headers.update({
+        if transport is not None and fetch_concurrency is not None:
+            raise ValueError("fetch_concurrency only sizes the default transport; "
+                             "set pool_maxsize on the HTTPTransport passed instead")
+        self.transport = transport or HTTPTransport(pool_maxsize=fetch_concurrency or DEFAULT_FETCH_CONCURRENCY)
+        self.transport.session.headers.update({
             'Authorization': f'Bearer {auth_token}',
             'Content-Type': 'application/json'
         })
+        self.session = self.transport.session
+        self._time_indexes: Dict[str, FormTimeIndex] = {}
+        self._skip_logic: Dict[str, SkipLogicProgram] = {}
+        self._applicability: Dict[str, Tuple[pd.DataFrame, Dict[str, np.ndarray]]] = {}
+        self._validation: Dict[str, ValidationProgram] = {}
+        self._validation_results: Dict[str, Tuple[pd.DataFrame, ValidationResult]] = {}
+        self._dedup_reports: Dict[str, Dict[str, Any]] = {}
+        # Approximate mode: per-form reservoirs and the exact runs that replace approximate results
+        self._reservoirs: Dict[str, StratifiedReservoir] = {}
+        self._samples: Dict[str, Tuple[pd.DataFrame, ReservoirSample]] = {}
+        self._exact_runs = ExactRefresher()
+        self.sketch_store = sketch_store
+        self._sketch_lock = threading.Lock()
+        self.warehouse = warehouse
+        # Concurrent identical fetches share one request and one result
+        self._flight = SingleFlight(ttl=freshness_window)
+        
+    def get_time_index(self, form_id: str, df: pd.DataFrame) -> FormTimeIndex:
+        """
+        Return the time index for a form, building it only when the form's frame changed.
+        
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame
+            
+        Returns:
+            FormTimeIndex over the frame
+        """
+        time_index = self._time_indexes.get(form_id)
+        if time_index is None or time_index.source is not df:
+            time_index = FormTimeIndex(df)
+            self._time_indexes[form_id] = time_index
+        return time_index
+    
+    def register_form_structure(self, form_id: str, form_structure: Dict[str, Any]) -> SkipLogicProgram:
+        """
+        Compile and remember the skip-logic and validation rules of a form.
+        
+        Args:
+            form_id: The form ID
+            form_structure: Form structure with field definitions
+            
+        Returns:
+            The compiled skip-logic program
+        
+        ``fetch_form_structure`` registers every structure it fetches, so frames built with
+        ``normalize_data`` from it get applicability masks and validity scores; call this
+        for structures obtained elsewhere.
+        """
+        program = SkipLogicProgram.compile(form_structure)
+        self._skip_logic[form_id] = program
+        self._applicability.pop(form_id, None)
+        self._validation[form_id] = ValidationProgram.compile(form_structure)
+        self._validation_results.pop(form_id, None)
+        return program
+    
+    def get_applicability(self, form_id: str, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Return per-field masks of the rows where a question applies, evaluated once per frame.
+        
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame
+            
+        Returns:
+            Dict of field -> boolean mask; fields without skip logic are always applicable
+        """
+        program = self._skip_logic.get(form_id)
+        if not program:
+            return {}
+        cached = self._applicability.get(form_id)
+        if cached is None or cached[0] is not df:
+            cached = (df, program.applicability(df))
+            self._applicability[form_id] = cached
+        return cached[1]
+    
+    def get_validation(self, form_id: str, df: pd.DataFrame) -> Optional[ValidationResult]:
+        """
+        Return the field validation result for a form, evaluated once per frame.
         
-    def fetch_form_data(self, form_id: str) -> List[Dict[str, Any]]:
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame
+            
+        Returns:
+            ValidationResult, or None when the form structure was never registered
+        """
+        program = self._validation.get(form_id)
+        if program is None:
+            return None
+        cached = self._validation_results.get(form_id)
+        if cached is None or cached[0] is not df:
+            cached = (df, program.evaluate(df, applicability=self.get_applicability(form_id, df)))
+            self._validation_results[form_id] = cached
+        return cached[1]
+    
+    def get_sample(self, form_id: str, df: pd.DataFrame,
+                   options: Optional[Dict[str, Any]] = None) -> ReservoirSample:
+        """
+        Return the stratified reservoir sample of a form, folding in new submissions first.
+        
+        The reservoir follows the form's submission stream: rows of ``df`` (by ID) not
+        sampled yet are added, so repeated calls with the growing frame only process the
+        new submissions, late-synced ones included.
+        
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame
+            options: perStratum (rows kept per month x stratum, default 200), strata
+                (stratification columns, default ``['category']``), confidence, seed
+            
+        Returns:
+            ReservoirSample whose frame carries ``_weight`` and ``_row``
+        """
+        options = options or {}
+        cached = self._samples.get(form_id)
+        if cached is not None and cached[0] is df:
+            return cached[1]
+        per_stratum = options.get('perStratum', DEFAULT_PER_STRATUM)
+        strata = list(options.get('strata', ['category']))
+        reservoir = self._reservoirs.get(form_id)
+        if reservoir is None or reservoir.per_stratum != per_stratum or reservoir.strata != strata:
+            reservoir = StratifiedReservoir(per_stratum, 'submission_date', strata, options.get('seed'))
+            self._reservoirs[form_id] = reservoir
+        reservoir.update(df, only_new=True)
+        sample = reservoir.sample(options.get('confidence', 0.95))
+        self._samples[form_id] = (df, sample)
+        return sample
+    
+    def _sample_estimate(self, form_id: str, df: pd.DataFrame, numerator: np.ndarray,
+                         denominator: Optional[np.ndarray] = None) -> Optional[Estimate]:
+        """Stratified ratio estimate over ``df`` when it is (a subset of) a form's sample frame."""
+        if '_weight' not in df.columns or form_id not in self._samples:
+            return None
+        denominator = np.ones(len(df)) if denominator is None else denominator
+        return self._samples[form_id][1].ratio(numerator, denominator, df['_row'].to_numpy())
+    
+    @staticmethod
+    def _count(df: pd.DataFrame, mask: Optional[np.ndarray] = None) -> int:
+        """Row count (of ``mask``), or the estimated population count for sample frames."""
+        if '_weight' not in df.columns:
+            return int(len(df)) if mask is None else int(np.count_nonzero(mask))
+        weights = df['_weight'].to_numpy()
+        return int(round(weights.sum() if mask is None else weights[mask].sum()))
+    
+    def fetch_form_data(self, form_id: str, parameters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Fetch submission data from a specific form.
         
         Args:
             form_id: The ID of the form to fetch data from
+            parameters: Optional execute parameters (dateRange, filters); they are pushed
+                down into the request as query parameters
             
         Returns:
-            List of form submissions
+            List of form submissions (shared between concurrent callers; do not mutate)
         """
+        query = FilterPlan.from_parameters(parameters).query_params()
+        key = ('submissions', form_id, tuple(sorted(query.items())))
+        return self._flight.do(key, lambda: self._request_form_data(form_id, query))
+    
+    def _request_form_data(self, form_id: str, query: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Perform the submissions request for ``fetch_form_data``."""
         try:
             url = f"{self.api_base_url}/forms/{form_id}/submissions"
-            response = self.session.get(url)
+            response = self.transport.get(url, params=query or None)
             response.raise_for_status()
             
             data = response.json()
@@ -94,16 +448,24 @@ class MultiFormIndicatorProcessor:
             form_id: The ID of the form
             
         Returns:
-            Form structure with fields and metadata
+            Form structure with fields and metadata (shared between concurrent callers; do not mutate);
+            its skip-logic and validation rules are registered for ``form_id``
         """
+        return self._flight.do(('structure', form_id), lambda: self._request_form_structure(form_id))
+    
+    def _request_form_structure(self, form_id: str) -> Dict[str, Any]:
+        """Perform the form request for ``fetch_form_structure``."""
         try:
             url = f"{self.api_base_url}/forms/{form_id}"
-            response = self.session.get(url)
+            response = self.transport.get(url)
             response.raise_for_status()
             
             data = response.json()
             if data.get('success'):
-                return data.get('data', {})
+                form_structure = data.get('data', {})
+                if form_structure:
+                    self.register_form_structure(form_id, form_structure)
+                return form_structure
             else:
                 logger.error(f"API returned error: {data.get('message', 'Unknown error')}")
                 return {}
@@ -112,13 +474,103 @@ class MultiFormIndicatorProcessor:
             logger.error(f"Failed to fetch form structure for {form_id}: {e}")
             return {}
     
-    def normalize_data(self, form_data: List[Dict[str, Any]], form_structure: Dict[str, Any]) -> pd.DataFrame:
+    def load_form_dataframe(self, form_id: str, parameters: Optional[Dict[str, Any]] = None,
+                            variables: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Fetch and normalize a form, sharing the normalized frame between concurrent callers.
+        
+        Args:
+            form_id: The ID of the form
+            parameters: Optional execute parameters (dateRange, filters, linkage, dedup)
+            variables: Optional variables the indicators use; when given, only these
+                fields (and any filtered fields) are materialised
+            
+        Returns:
+            Normalized DataFrame (shared; copy before modifying), empty when the form
+            structure or data could not be fetched
+        """
+        parameters = parameters or {}
+        plan = FilterPlan.from_parameters(parameters)
+        query = plan.query_params()
+        dedup = parameters.get('dedup')
+        dedup = {} if dedup is True else (dedup or None)
+        columns = None
+        if variables is not None:
+            linkage = parameters.get('linkage')
+            linkage_fields = RecordLinker.from_parameters(linkage).fields if linkage else []
+            columns = list(dict.fromkeys(list(variables) + list(plan.filters) + linkage_fields))
+            if dedup is not None:
+                # Duplicate detection compares whole submissions unless identity fields are given
+                columns = columns + list(dedup['fields']) if dedup.get('fields') else None
+        key = (
+            'frame', form_id, tuple(sorted(query.items())),
+            tuple(columns) if columns is not None else None,
+            json.dumps(dedup, sort_keys=True) if dedup is not None else None
+        )
+        
+        def load() -> pd.DataFrame:
+            form_structure = self.fetch_form_structure(form_id)
+            if not form_structure:
+                logger.warning(f"Could not fetch structure for form {form_id}")
+                return pd.DataFrame()
+            program = self._skip_logic.get(form_id)
+            if program is None:
+                program = self.register_form_structure(form_id, form_structure)
+            projection = columns
+            if projection is not None:
+                # Skip-logic conditions need their source columns as well
+                projection = list(dict.fromkeys(projection + program.dependencies(projection)))
+            form_data = self.fetch_form_data(form_id, parameters)
+            if not form_data:
+                logger.warning(f"No data found for form {form_id}")
+                return pd.DataFrame()
+            df = self.normalize_data(form_data, form_structure, projection)
+            if dedup is not None:
+                df = self.deduplicate(form_id, df, dedup)
+            return df
+        
+        return self._flight.do(key, load)
+    
+    def deduplicate(self, form_id: str, df: pd.DataFrame, options: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """
+        Remove duplicate submissions from a normalized form and remember what was removed.
+        
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame
+            options: Dedup options: exact (default True), near (default False), threshold
+                (near-duplicate Jaccard similarity, default 0.9) and fields (identity columns;
+                defaults to every data field)
+            
+        Returns:
+            DataFrame without the duplicates
+        """
+        options = options or {}
+        deduplicated, report = deduplicate(
+            df,
+            columns=options.get('fields'),
+            exact=options.get('exact', True),
+            near=options.get('near', False),
+            threshold=options.get('threshold', 0.9)
+        )
+        self._dedup_reports[form_id] = report
+        if report['exact_duplicates'] or report['near_duplicates']:
+            logger.info(
+                f"Form {form_id}: removed {report['exact_duplicates']} exact and "
+                f"{report['near_duplicates']} near-duplicate submissions"
+            )
+        return deduplicated
+    
+    def normalize_data(self, form_data: List[Dict[str, Any]], form_structure: Dict[str, Any],
+                       columns: Optional[List[str]] = None) -> pd.DataFrame:
         """
         Normalize form data into a pandas DataFrame.
         
         Args:
             form_data: Raw form submission data
             form_structure: Form structure with field definitions
+            columns: Optional projection; only these fields (plus the submission ID,
+                date and form metadata) are materialised
             
         Returns:
             Normalized DataFrame
@@ -138,48 +590,98 @@ class MultiFormIndicatorProcessor:
             for sub_field in sub_fields:
                 field_names.append(f"{repeatable_name}_{sub_field.get('name', '')}")
         
-        # Create DataFrame
-        df = pd.DataFrame(form_data)
-        
-        # Ensure all expected columns exist
-        for field_name in field_names:
-            if field_name not in df.columns:
-                df[field_name] = None
+        if columns is not None:
+            # Projection: build only the requested columns that the form defines or
+            # the submissions carry, straight from the records
+            known_fields = set(field_names)
+            projected = [
+                column for column in dict.fromkeys(list(columns) + ['_id', 'createdAt'])
+                if column in known_fields or any(column in record for record in form_data)
+            ]
+            df = pd.DataFrame(
+                {column: [record.get(column) for record in form_data] for column in projected},
+                index=pd.RangeIndex(len(form_data))
+            )
+        else:
+            # Create DataFrame
+            df = pd.DataFrame(form_data)
+            
+            # Ensure all expected columns exist
+            for field_name in field_names:
+                if field_name not in df.columns:
+                    df[field_name] = None
         
-        # Add metadata columns
-        df['form_id'] = form_structure.get('_id', '')
-        df['form_name'] = form_structure.get('name', '')
-        df['submission_date'] = pd.to_datetime(df.get('createdAt', datetime.now()))
+        # Add metadata columns (constant per form, stored as single-category categoricals)
+        constant_codes = np.zeros(len(df), dtype=np.int8)
+        df['form_id'] = pd.Categorical.from_codes(constant_codes, [_metadata_label(form_structure.get('_id'))])
+        df['form_name'] = pd.Categorical.from_codes(constant_codes, [_metadata_label(form_structure.get('name'))])
+        if 'createdAt' in df.columns:
+            df['submission_date'] = pd.to_datetime(df['createdAt'])
+        else:
+            df['submission_date'] = pd.Timestamp(datetime.now())
         
         return df
     
     def calculate_cross_form_indicators(self, form_dataframes: Dict[str, pd.DataFrame], 
-                                      variables: List[str]) -> Dict[str, Any]:
+                                      variables: List[str],
+                                      parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Calculate indicators using data from multiple forms.
         
         Args:
             form_dataframes: Dictionary of form_id -> DataFrame mappings
             variables: List of variables to use in calculations
+            parameters: Optional execute parameters (dateRange, filters) applied to every
+                form before any indicator is computed. ``linkage`` (keys, fuzzyFields,
+                blocking, ...) links records across forms; correlations and response
+                times are then also computed over the linked records. ``correlation``
+                (threshold, topK, maxMemory) configures the correlation screen. ``approximate``
+                (True or sample options, see ``get_sample``) computes the indicators on
+                stratified samples and schedules the exact computation in the background.
             
         Returns:
             Dictionary containing calculated indicators
         """
+        if (parameters or {}).get('approximate'):
+            return self._calculate_approximate_indicators(form_dataframes, variables, parameters)
+        
+        plan = FilterPlan.from_parameters(parameters, date_column='submission_date')
+        sketches = self.update_sketches(form_dataframes, variables) if plan.is_empty else None
+        if not plan.is_empty:
+            form_dataframes = {
+                form_id: plan.apply(df, ignore_missing=True)
+                for form_id, df in form_dataframes.items()
+            }
+        
         results = {
             'timestamp': datetime.now().isoformat(),
             'indicators': {},
             'metadata': {
                 'forms_processed': list(form_dataframes.keys()),
                 'variables_used': variables,
-                'total_records': sum(len(df) for df in form_dataframes.values())
+                'total_records': sum(self._count(df) for df in form_dataframes.values())
             }
         }
         
+        deduplication = {
+            form_id: {key: value for key, value in report.items() if key != 'removed_index'}
+            for form_id, report in self._dedup_reports.items() if form_id in form_dataframes
+        }
+        if deduplication:
+            results['metadata']['deduplication'] = deduplication
+        
         try:
+            # Link records that refer to the same entity across forms
+            links = None
+            linkage = (parameters or {}).get('linkage')
+            if linkage and len(form_dataframes) >= 2:
+                links = self.link_records(form_dataframes, linkage)
+                results['indicators']['record_linkage'] = summarize_links(links)
+            
             # Example 1: Cross-form correlation analysis
             if len(form_dataframes) >= 2:
                 results['indicators']['cross_form_correlation'] = self._calculate_cross_form_correlation(
-                    form_dataframes, variables
+                    form_dataframes, variables, links, (parameters or {}).get('correlation')
                 )
             
             # Example 2: Data completeness across forms
@@ -194,12 +696,12 @@ class MultiFormIndicatorProcessor:
             
             # Example 4: Statistical summaries
             results['indicators']['statistical_summaries'] = self._calculate_statistical_summaries(
-                form_dataframes, variables
+                form_dataframes, variables, sketches
             )
             
             # Example 5: Custom business logic indicators
             results['indicators']['business_indicators'] = self._calculate_business_indicators(
-                form_dataframes, variables
+                form_dataframes, variables, links
             )
             
         except Exception as e:
@@ -208,9 +710,322 @@ class MultiFormIndicatorProcessor:
         
         return results
     
+    def _calculate_approximate_indicators(self, form_dataframes: Dict[str, pd.DataFrame],
+                                          variables: List[str], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calculate the indicators on stratified samples, or return the exact results once available.
+        
+        Counts become estimated population counts; completeness rates and numeric means
+        carry a ``confidence_interval``. The exact computation is scheduled in the
+        background under ``approximateKey`` (default: the forms' sizes and latest
+        submissions, the variables and the other parameters); once it has completed,
+        calls with the same key return the exact results.
+        """
+        options = parameters['approximate'] if isinstance(parameters['approximate'], dict) else {}
+        exact_parameters = {
+            name: value for name, value in parameters.items() if name not in ('approximate', 'approximateKey')
+        }
+        key = parameters.get('approximateKey')
+        if key is None:
+            key = json.dumps({
+                'forms': {
+                    form_id: [len(df), str(df['submission_date'].max()) if 'submission_date' in df.columns else None]
+                    for form_id, df in form_dataframes.items()
+                },
+                'variables': variables,
+                'parameters': exact_parameters
+            }, sort_keys=True, default=str)
+        
+        exact = self._exact_runs.result(key)
+        if exact is not None:
+            return exact
+        scheduled = self._exact_runs.submit(
+            key, lambda: self.calculate_cross_form_indicators(form_dataframes, variables, exact_parameters)
+        )
+        
+        samples = {form_id: self.get_sample(form_id, df, options) for form_id, df in form_dataframes.items()}
+        results = self.calculate_cross_form_indicators(
+            {form_id: sample.frame for form_id, sample in samples.items()}, variables, exact_parameters
+        )
+        results['metadata']['approximate'] = {
+            'confidence_level': options.get('confidence', 0.95),
+            'exact_pending': scheduled is not None,
+            'forms': {
+                form_id: {
+                    'population': sample.population,
+                    'sample_size': len(sample),
+                    'strata': len(sample.strata)
+                }
+                for form_id, sample in samples.items()
+            }
+        }
+        return results
+    
+    def update_sketches(self, form_dataframes: Dict[str, pd.DataFrame],
+                        variables: List[str]) -> Optional[SketchStore]:
+        """
+        Fold the forms' new submissions into the persisted categorical sketches.
+        
+        Args:
+            form_dataframes: Dictionary of form_id -> DataFrame mappings (whole forms, not filtered)
+            variables: Variables of the analysis; the non-numeric ones are sketched
+            
+        Returns:
+            The updated store, or None without a store (or for sample frames)
+        """
+        if self.sketch_store is None or any('_weight' in df.columns for df in form_dataframes.values()):
+            return None
+        with self._sketch_lock:
+            for form_id, df in form_dataframes.items():
+                self.sketch_store.update(form_id, df, self._categorical_variables(df, variables))
+            if self.sketch_store.path:
+                self.sketch_store.save()
+        return self.sketch_store
+    
+    def categorical_summary(self, form_ids: List[str], variable: str,
+                            periods: Optional[List[str]] = None, top: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        Categorical summary of a variable over several forms and months, merged from the sketch store.
+        
+        Args:
+            form_ids: Forms to combine
+            variable: The variable
+            periods: 'YYYY-MM' months to combine (defaults to every stored month)
+            top: Number of most common values
+            
+        Returns:
+            Summary with unique_values, most_common and missing_count, or None when nothing is stored
+        """
+        if self.sketch_store is None:
+            return None
+        merged = self.sketch_store.merged(form_ids, variable, periods)
+        return merged.summary(top) if merged is not None else None
+    
+    @staticmethod
+    def _categorical_variables(df: pd.DataFrame, variables: List[str]) -> List[str]:
+        return [var for var in variables if var in df.columns and not pd.api.types.is_numeric_dtype(df[var])]
+    
+    def run_shard_worker(self, queue: JobQueue, run_id: Optional[str] = None, worker_id: Optional[str] = None,
+                         idle_timeout: float = 0.0) -> int:
+        """
+        Process work units of sharded runs, loading each unit's form window through this processor.
+        
+        Args:
+            queue: The shared job queue
+            run_id: Only process units of this run
+            worker_id: Worker name recorded on the units (default: host and PID)
+            idle_timeout: Seconds to keep polling once the queue is empty
+            
+        Returns:
+            Number of units completed
+        """
+        return run_worker(
+            queue,
+            lambda form_id, parameters, variables: self.load_form_dataframe(form_id, parameters, variables),
+            self.get_applicability,
+            worker_id=worker_id,
+            run_id=run_id,
+            idle_timeout=idle_timeout
+        )
+    
+    def calculate_sharded_indicators(self, form_ids: List[str], variables: List[str], queue_path: str,
+                                     parameters: Optional[Dict[str, Any]] = None, workers: int = 2,
+                                     shard_days: Optional[int] = None,
+                                     timeout: Optional[float] = DEFAULT_RUN_TIMEOUT) -> Dict[str, Any]:
+        """
+        Calculate the indicators as sharded work units processed by local worker processes.
+        
+        The run is placed on the SQLite queue at ``queue_path``; ``workers`` forked
+        processes and this process work on it (workers on other hosts may join with
+        ``sharded_execution.py worker``), and the partial aggregates are reduced into
+        the usual results dict. Only completeness, temporal analysis and statistical
+        summaries are computed, see ``sharded_execution``.
+        
+        This process keeps claiming until every unit is done or failed: units of a
+        local worker that died are claimed again at once, units of remote workers
+        once their lease expires.
+        
+        Args:
+            form_ids: Forms to analyse
+            variables: Variables to analyse
+            queue_path: SQLite job queue file
+            parameters: Execute parameters (dateRange, filters, dedup)
+            workers: Local worker processes besides this one
+            shard_days: Split each form into windows of this many days (needs a dateRange with a start)
+            timeout: Seconds before the run is abandoned (None waits as long as units remain)
+            
+        Returns:
+            Dictionary containing calculated indicators, with ``metadata.sharding``
+            
+        Raises:
+            TimeoutError: When the run does not finish within ``timeout`` seconds
+        """
+        with JobQueue(queue_path) as queue:
+            run_id = submit_run(queue, form_ids, variables, parameters, shard_days)
+            context = multiprocessing.get_context('fork')
+            processes = [
+                context.Process(target=_shard_worker_main, args=(type(self), self.api_base_url, self.auth_token,
+                                                                 queue_path, run_id), daemon=True)
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            # Local workers use run_worker's default ID (host and PID)
+            host = socket.gethostname()
+            try:
+                finish_run(
+                    queue, run_id,
+                    lambda: self.run_shard_worker(queue, run_id),
+                    lambda: [f"{host}:{process.pid}" for process in processes if process.exitcode not in (None, 0)],
+                    timeout=timeout
+                )
+            finally:
+                for process in processes:
+                    process.join(timeout=5)
+                    if process.is_alive():
+                        process.terminate()
+            return reduce_run(queue, run_id)
+    
+    def store_in_warehouse(self, form_id: str, df: pd.DataFrame, replace: bool = True) -> int:
+        """
+        Store a form's normalized submissions (and their skip-logic applicability) in the warehouse.
+        
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame (unfiltered)
+            replace: Replace the form's stored submissions; otherwise append/upsert by ``_id``
+            
+        Returns:
+            Number of rows stored
+        """
+        if self.warehouse is None:
+            raise ValueError("No warehouse configured")
+        return self.warehouse.load(form_id, df, self.get_applicability(form_id, df), replace=replace)
+    
+    def calculate_warehouse_indicators(self, form_ids: List[str], variables: List[str],
+                                       parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calculate the indicators as SQL aggregates over the warehouse, without loading rows.
+        
+        Completeness, temporal analysis and statistical summaries are computed (counts,
+        date windows and group-bys run in SQLite; quartiles are exact). Correlations,
+        linkage and the business indicators need row-level data and are not computed.
+        
+        Args:
+            form_ids: Stored forms to analyse
+            variables: Variables to analyse
+            parameters: Optional execute parameters (dateRange, filters) pushed down as WHERE clauses
+            
+        Returns:
+            Dictionary containing calculated indicators
+        """
+        if self.warehouse is None:
+            raise ValueError("No warehouse configured")
+        warehouse = self.warehouse
+        plan = FilterPlan.from_parameters(parameters, date_column='submission_date')
+        counts = {form_id: warehouse.count(form_id, plan) for form_id in form_ids}
+        form_ids = [form_id for form_id in form_ids if counts[form_id] > 0]
+        
+        results = {
+            'timestamp': datetime.now().isoformat(),
+            'indicators': {},
+            'metadata': {
+                'forms_processed': form_ids,
+                'variables_used': variables,
+                'total_records': sum(counts[form_id] for form_id in form_ids),
+                'warehouse': warehouse.path
+            }
+        }
+        
+        try:
+            completeness = {}
+            for form_id, form_counts in ((form_id, warehouse.completeness(form_id, variables, plan)) for form_id in form_ids):
+                completeness[form_id] = {
+                    var: {
+                        'completeness_rate': round((non_null_count / applicable_count) * 100 if applicable_count > 0 else 0, 2),
+                        'non_null_count': non_null_count,
+                        'total_count': total_count,
+                        'applicable_count': applicable_count,
+                        'skipped_count': total_count - applicable_count,
+                        'missing_count': applicable_count - non_null_count
+                    }
+                    for var, (total_count, applicable_count, non_null_count) in form_counts.items()
+                }
+            completeness['overall'] = self._overall_completeness(completeness, variables)
+            results['indicators']['data_completeness'] = completeness
+            
+            temporal = {}
+            for form_id in form_ids:
+                daily_counts = warehouse.date_counts(form_id, 'day', plan)
+                if daily_counts.empty:
+                    continue
+                now = warehouse.now(form_id)
+                first, last = warehouse.date_range(form_id, plan)
+                recent = {days: warehouse.count(form_id, plan, start=now - pd.Timedelta(days=days)) for days in RECENT_DAYS}
+                temporal[form_id] = temporal_summary(daily_counts, recent, first.isoformat(), last.isoformat())
+            results['indicators']['temporal_analysis'] = temporal
+            
+            summaries = {}
+            categorical = {}
+            for form_id in form_ids:
+                kinds = warehouse.columns(form_id)
+                form_summaries = {}
+                for var in variables:
+                    if kinds.get(var) == 'numeric':
+                        stats = warehouse.numeric_summary(form_id, var, plan)
+                        form_summaries[var] = {
+                            key: (round(value, 3 if key in ('skewness', 'kurtosis') else 2) if key != 'count' else value)
+                            for key, value in stats.items()
+                        }
+                    elif var in kinds:
+                        form_summaries[var] = warehouse.categorical_summary(form_id, var, plan)
+                        categorical.setdefault(var, []).append(form_id)
+                summaries[form_id] = form_summaries
+            overall = {
+                var: warehouse.categorical_summary(var_forms, var, plan)
+                for var, var_forms in categorical.items() if len(var_forms) >= 2
+            }
+            if overall:
+                summaries['overall'] = overall
+            results['indicators']['statistical_summaries'] = summaries
+        
+        except Exception as e:
+            logger.error(f"Error calculating warehouse indicators: {e}")
+            results['error'] = str(e)
+        
+        return results
+    
+    def link_records(self, form_dataframes: Dict[str, pd.DataFrame], linkage: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Link records that refer to the same entity across forms.
+        
+        Args:
+            form_dataframes: Dictionary of form_id -> DataFrame mappings
+            linkage: Linkage configuration (keys, fuzzyFields, blocking, blockingFields,
+                threshold, window, maxBlockSize, oneToOne)
+            
+        Returns:
+            Link table with left_form, left_index, right_form, right_index, match_type, score
+        """
+        return RecordLinker.from_parameters(linkage).link(form_dataframes)
+    
     def _calculate_cross_form_correlation(self, form_dataframes: Dict[str, pd.DataFrame], 
-                                        variables: List[str]) -> Dict[str, Any]:
-        """Calculate correlations between variables across different forms."""
+                                        variables: List[str],
+                                        links: Optional[pd.DataFrame] = None,
+                                        options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calculate correlations between numeric variables across different forms.
+        
+        Pairs are screened tile by tile with the blocked float32 kernel (see
+        ``correlation_kernels``), so wide variable sets never build the full matrix;
+        the matrix itself is reported only up to CORRELATION_MATRIX_LIMIT variables.
+        
+        Args:
+            form_dataframes: Dictionary of form_id -> DataFrame mappings
+            variables: Variables to correlate
+            links: Optional record links; correlations are then also computed over linked records
+            options: Optional ``threshold`` (default 0.7), ``topK`` and ``maxMemory`` (bytes)
+        """
         correlations = {}
         
         try:
@@ -219,23 +1034,18 @@ class MultiFormIndicatorProcessor:
             
             for form_id, df in form_dataframes.items():
                 for var in variables:
-                    if var in df.columns:
+                    if var in df.columns and pd.api.types.is_numeric_dtype(df[var]):
                         col_name = f"{form_id}_{var}"
                         combined_data[col_name] = df[var].dropna()
             
             if len(combined_data) >= 2:
-                combined_df = pd.DataFrame(combined_data)
-                correlation_matrix = combined_df.corr()
-                
-                correlations = {
-                    'correlation_matrix': correlation_matrix.to_dict(),
-                    'high_correlations': self._find_high_correlations(correlation_matrix, threshold=0.7),
-                    'summary': {
-                        'total_variables': len(combined_data),
-                        'mean_correlation': correlation_matrix.values[np.triu_indices_from(correlation_matrix.values, k=1)].mean(),
-                        'max_correlation': correlation_matrix.values[np.triu_indices_from(correlation_matrix.values, k=1)].max()
-                    }
-                }
+                correlations = self._correlate(pd.DataFrame(combined_data), options)
+                correlations['summary'] = {'total_variables': len(combined_data), **correlations['summary']}
+            
+            if links is not None and len(links):
+                correlations['linked_correlations'] = self._calculate_linked_correlations(
+                    form_dataframes, variables, links, options
+                )
         
         except Exception as e:
             logger.error(f"Error in cross-form correlation: {e}")
@@ -243,6 +1053,44 @@ class MultiFormIndicatorProcessor:
         
         return correlations
     
+    def _calculate_linked_correlations(self, form_dataframes: Dict[str, pd.DataFrame], variables: List[str],
+                                       links: pd.DataFrame, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Correlate variables across forms over linked record pairs (one row per linked entity)."""
+        linked = {}
+        for (form1_id, form2_id), pairs in links.groupby(['left_form', 'right_form'], sort=True):
+            df1 = form_dataframes[form1_id]
+            df2 = form_dataframes[form2_id]
+            aligned = {}
+            for var in variables:
+                if var in df1.columns and pd.api.types.is_numeric_dtype(df1[var]):
+                    aligned[f"{form1_id}_{var}"] = df1[var].loc[pairs['left_index']].to_numpy()
+                if var in df2.columns and pd.api.types.is_numeric_dtype(df2[var]):
+                    aligned[f"{form2_id}_{var}"] = df2[var].loc[pairs['right_index']].to_numpy()
+            if len(aligned) < 2:
+                continue
+            correlation = self._correlate(pd.DataFrame(aligned), options)
+            linked[f"{form1_id}_to_{form2_id}"] = {
+                'linked_pairs': int(len(pairs)),
+                **{key: value for key, value in correlation.items() if key != 'summary'}
+            }
+        return linked
+    
+    def _correlate(self, frame: pd.DataFrame, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Correlation screen (and, for small variable sets, matrix) of the numeric columns of ``frame``."""
+        options = options or {}
+        threshold = float(options.get('threshold', 0.7))
+        max_memory = int(options.get('maxMemory', DEFAULT_MAX_MEMORY))
+        screen = screen_correlations(frame, threshold=threshold, top_k=options.get('topK'), max_memory=max_memory)
+        correlations = {}
+        if frame.shape[1] <= CORRELATION_MATRIX_LIMIT:
+            correlations['correlation_matrix'] = correlation_matrix(frame, max_memory=max_memory).to_dict()
+        correlations['high_correlations'] = self._find_high_correlations(screen['pairs'])
+        correlations['summary'] = {
+            'mean_correlation': screen['mean_correlation'],
+            'max_correlation': screen['max_correlation']
+        }
+        return correlations
+    
     def _calculate_data_completeness(self, form_dataframes: Dict[str, pd.DataFrame], 
                                    variables: List[str]) -> Dict[str, Any]:
         """Calculate data completeness metrics across forms."""
@@ -251,38 +1099,38 @@ class MultiFormIndicatorProcessor:
         try:
             for form_id, df in form_dataframes.items():
                 form_completeness = {}
+                applicability = self.get_applicability(form_id, df)
                 for var in variables:
                     if var in df.columns:
-                        non_null_count = df[var].notna().sum()
-                        total_count = len(df)
-                        completeness_rate = (non_null_count / total_count) * 100 if total_count > 0 else 0
+                        # Rows where skip logic hid the question are not counted as missing
+                        present = df[var].notna().to_numpy()
+                        applicable = applicability.get(var)
+                        if applicable is None:
+                            applicable = np.ones(len(df), dtype=bool)
+                        total_count = self._count(df)
+                        applicable_count = self._count(df, applicable)
+                        non_null_count = self._count(df, present & applicable)
+                        completeness_rate = (non_null_count / applicable_count) * 100 if applicable_count > 0 else 0
+                        
+                        # On sample frames: stratified estimate and interval of the rate
+                        estimate = self._sample_estimate(form_id, df, present & applicable, applicable)
+                        if estimate is not None:
+                            completeness_rate = estimate.value * 100
                         
                         form_completeness[var] = {
                             'completeness_rate': round(completeness_rate, 2),
                             'non_null_count': int(non_null_count),
                             'total_count': int(total_count),
-                            'missing_count': int(total_count - non_null_count)
+                            'applicable_count': int(applicable_count),
+                            'skipped_count': int(total_count - applicable_count),
+                            'missing_count': int(applicable_count - non_null_count)
                         }
+                        if estimate is not None:
+                            form_completeness[var]['confidence_interval'] = estimate.scaled(100).to_dict(2)
                 
                 completeness[form_id] = form_completeness
             
-            # Overall completeness
-            overall_completeness = {}
-            for var in variables:
-                var_completeness = []
-                for form_id, form_data in completeness.items():
-                    if var in form_data:
-                        var_completeness.append(form_data[var]['completeness_rate'])
-                
-                if var_completeness:
-                    overall_completeness[var] = {
-                        'mean_completeness': round(np.mean(var_completeness), 2),
-                        'min_completeness': round(min(var_completeness), 2),
-                        'max_completeness': round(max(var_completeness), 2),
-                        'std_completeness': round(np.std(var_completeness), 2)
-                    }
-            
-            completeness['overall'] = overall_completeness
+            completeness['overall'] = self._overall_completeness(completeness, variables)
             
         except Exception as e:
             logger.error(f"Error in data completeness calculation: {e}")
@@ -290,6 +1138,25 @@ class MultiFormIndicatorProcessor:
         
         return completeness
     
+    @staticmethod
+    def _overall_completeness(completeness: Dict[str, Dict[str, Any]], variables: List[str]) -> Dict[str, Any]:
+        """Spread of each variable's completeness rate across forms."""
+        overall_completeness = {}
+        for var in variables:
+            var_completeness = []
+            for form_id, form_data in completeness.items():
+                if var in form_data:
+                    var_completeness.append(form_data[var]['completeness_rate'])
+            
+            if var_completeness:
+                overall_completeness[var] = {
+                    'mean_completeness': round(np.mean(var_completeness), 2),
+                    'min_completeness': round(min(var_completeness), 2),
+                    'max_completeness': round(max(var_completeness), 2),
+                    'std_completeness': round(np.std(var_completeness), 2)
+                }
+        return overall_completeness
+    
     def _calculate_temporal_analysis(self, form_dataframes: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
         """Perform temporal analysis on form data."""
         temporal = {}
@@ -297,28 +1164,43 @@ class MultiFormIndicatorProcessor:
         try:
             for form_id, df in form_dataframes.items():
                 if 'submission_date' in df.columns:
-                    df['submission_date'] = pd.to_datetime(df['submission_date'])
+                    time_index = self.get_time_index(form_id, df)
+                    if len(time_index) == 0:
+                        continue
+                    dates = time_index.dates
                     
-                    # Daily submission counts
-                    daily_counts = df.groupby(df['submission_date'].dt.date).size()
+                    # Each row counts once, or as its design weight on sample frames
+                    weighted = '_weight' in df.columns
+                    rows = pd.Series(time_index.frame['_weight'].to_numpy() if weighted else 1, index=dates)
+                    
+                    # Daily submission counts (dates are sorted, so groupby keys come out in order)
+                    daily_counts = rows.groupby(dates.date).sum().round().astype(int)
                     
                     # Weekly trends
-                    df['week'] = df['submission_date'].dt.isocalendar().week
-                    weekly_counts = df.groupby(['submission_date'].dt.year, 'week').size()
+                    iso = dates.isocalendar()
+                    weekly_counts = rows.groupby([iso['year'].to_numpy(), iso['week'].to_numpy()]).sum().round().astype(int)
                     
                     # Monthly trends
-                    df['month'] = df['submission_date'].dt.month
-                    monthly_counts = df.groupby(['submission_date'].dt.year, 'month').size()
+                    if weighted:
+                        monthly_counts = {
+                            key: int(value)
+                            for key, value in rows.groupby([dates.year, dates.month]).sum().round().items()
+                        }
+                    else:
+                        monthly_counts = time_index.month_counts()
                     
                     temporal[form_id] = {
                         'daily_submissions': daily_counts.to_dict(),
                         'weekly_trends': weekly_counts.to_dict(),
-                        'monthly_trends': monthly_counts.to_dict(),
+                        'monthly_trends': monthly_counts,
+                        'recent_activity': {
+                            f'last_{days}_days': self._count(time_index.last_days(days)) for days in (7, 30, 90)
+                        },
                         'submission_stats': {
-                            'total_submissions': len(df),
+                            'total_submissions': self._count(df),
                             'date_range': {
-                                'start': df['submission_date'].min().isoformat(),
-                                'end': df['submission_date'].max().isoformat()
+                                'start': dates[0].isoformat(),
+                                'end': dates[-1].isoformat()
                             },
                             'avg_daily_submissions': round(daily_counts.mean(), 2),
                             'peak_day': daily_counts.idxmax().isoformat() if not daily_counts.empty else None
@@ -332,11 +1214,24 @@ class MultiFormIndicatorProcessor:
         return temporal
     
     def _calculate_statistical_summaries(self, form_dataframes: Dict[str, pd.DataFrame], 
-                                       variables: List[str]) -> Dict[str, Any]:
-        """Calculate statistical summaries for numeric variables."""
+                                       variables: List[str],
+                                       sketches: Optional[SketchStore] = None) -> Dict[str, Any]:
+        """
+        Calculate statistical summaries for numeric and categorical variables.
+        
+        Categorical summaries are merges of per-month sketches (distinct count and top
+        values): from ``sketches`` when given, otherwise sketched from the frames. The
+        ``overall`` entry merges each categorical variable across forms.
+        """
         summaries = {}
         
         try:
+            if sketches is None:
+                sketches = SketchStore()
+                for form_id, df in form_dataframes.items():
+                    weights = df['_weight'].to_numpy() if '_weight' in df.columns else None
+                    sketches.update(form_id, df, self._categorical_variables(df, variables), weights)
+            
             for form_id, df in form_dataframes.items():
                 form_summaries = {}
                 
@@ -345,9 +1240,12 @@ class MultiFormIndicatorProcessor:
                         # Check if variable is numeric
                         if pd.api.types.is_numeric_dtype(df[var]):
                             stats = df[var].describe()
+                            values = df[var].to_numpy(dtype=float, na_value=np.nan)
+                            present = ~np.isnan(values)
+                            estimate = self._sample_estimate(form_id, df, np.where(present, values, 0.0), present)
                             form_summaries[var] = {
-                                'count': int(stats['count']),
-                                'mean': round(stats['mean'], 2),
+                                'count': self._count(df, present),
+                                'mean': round(estimate.value if estimate is not None else stats['mean'], 2),
                                 'std': round(stats['std'], 2),
                                 'min': round(stats['min'], 2),
                                 '25%': round(stats['25%'], 2),
@@ -357,17 +1255,26 @@ class MultiFormIndicatorProcessor:
                                 'skewness': round(df[var].skew(), 3),
                                 'kurtosis': round(df[var].kurtosis(), 3)
                             }
+                            if estimate is not None:
+                                form_summaries[var]['mean_confidence_interval'] = estimate.to_dict(2)
                         else:
                             # For non-numeric variables, provide frequency analysis
-                            value_counts = df[var].value_counts()
-                            form_summaries[var] = {
-                                'type': 'categorical',
-                                'unique_values': int(value_counts.count()),
-                                'most_common': value_counts.head(5).to_dict(),
-                                'missing_count': int(df[var].isna().sum())
-                            }
+                            sketch = sketches.merged([form_id], var)
+                            if sketch is not None:
+                                form_summaries[var] = sketch.summary()
                 
                 summaries[form_id] = form_summaries
+            
+            # Cross-form categorical summaries, merged from the per-form sketches
+            overall = {}
+            for var in variables:
+                form_ids = [form_id for form_id, df in form_dataframes.items()
+                            if var in self._categorical_variables(df, [var])]
+                sketch = sketches.merged(form_ids, var) if len(form_ids) >= 2 else None
+                if sketch is not None:
+                    overall[var] = sketch.summary()
+            if overall:
+                summaries['overall'] = overall
         
         except Exception as e:
             logger.error(f"Error in statistical summaries: {e}")
@@ -376,14 +1283,15 @@ class MultiFormIndicatorProcessor:
         return summaries
     
     def _calculate_business_indicators(self, form_dataframes: Dict[str, pd.DataFrame], 
-                                     variables: List[str]) -> Dict[str, Any]:
+                                     variables: List[str],
+                                     links: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Calculate custom business logic indicators."""
         business_indicators = {}
         
         try:
             # Example: Calculate response time between forms
             if len(form_dataframes) >= 2:
-                business_indicators['response_time_analysis'] = self._calculate_response_times(form_dataframes)
+                business_indicators['response_time_analysis'] = self._calculate_response_times(form_dataframes, links)
             
             # Example: Calculate data quality scores
             business_indicators['data_quality_scores'] = self._calculate_data_quality_scores(form_dataframes, variables)
@@ -400,25 +1308,23 @@ class MultiFormIndicatorProcessor:
         
         return business_indicators
     
-    def _find_high_correlations(self, correlation_matrix: pd.DataFrame, threshold: float = 0.7) -> List[Dict[str, Any]]:
-        """Find variables with high correlations."""
+    def _find_high_correlations(self, pairs: List[Tuple[str, str, float]]) -> List[Dict[str, Any]]:
+        """Format screened (variable1, variable2, correlation) pairs, strongest first."""
         high_correlations = []
         
-        for i in range(len(correlation_matrix.columns)):
-            for j in range(i+1, len(correlation_matrix.columns)):
-                corr_value = correlation_matrix.iloc[i, j]
-                if abs(corr_value) >= threshold:
-                    high_correlations.append({
-                        'variable1': correlation_matrix.columns[i],
-                        'variable2': correlation_matrix.columns[j],
-                        'correlation': round(corr_value, 3),
-                        'strength': 'strong' if abs(corr_value) >= 0.8 else 'moderate'
-                    })
+        for variable1, variable2, corr_value in pairs:
+            high_correlations.append({
+                'variable1': variable1,
+                'variable2': variable2,
+                'correlation': round(corr_value, 3),
+                'strength': 'strong' if abs(corr_value) >= 0.8 else 'moderate'
+            })
         
         return sorted(high_correlations, key=lambda x: abs(x['correlation']), reverse=True)
     
-    def _calculate_response_times(self, form_dataframes: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
-        """Calculate response times between form submissions."""
+    def _calculate_response_times(self, form_dataframes: Dict[str, pd.DataFrame],
+                                  links: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """Calculate response times between form submissions (and between linked records)."""
         response_times = {}
         
         try:
@@ -430,25 +1336,49 @@ class MultiFormIndicatorProcessor:
                         df2 = form_dataframes[form2_id]
                         
                         if 'submission_date' in df1.columns and 'submission_date' in df2.columns:
-                            df1['submission_date'] = pd.to_datetime(df1['submission_date'])
-                            df2['submission_date'] = pd.to_datetime(df2['submission_date'])
+                            index1 = self.get_time_index(form1_id, df1)
+                            index2 = self.get_time_index(form2_id, df2)
+                            dates1 = index1.dates.asi8
+                            dates2 = index2.dates.asi8
                             
-                            # Calculate time differences
-                            time_diffs = []
-                            for date1 in df1['submission_date']:
-                                for date2 in df2['submission_date']:
-                                    diff = abs((date2 - date1).total_seconds() / 3600)  # hours
-                                    if diff <= 24:  # Within 24 hours
-                                        time_diffs.append(diff)
+                            # Time differences of all pairs within 24 hours, from slice bounds
+                            # and prefix sums (the pairs themselves can number in the billions);
+                            # on sample frames each pair stands for weight1 x weight2 pairs
+                            weighted = '_weight' in df1.columns and '_weight' in df2.columns
+                            stats = _window_pair_stats(
+                                dates1, dates2, 24 * 3600 * 10 ** 9,
+                                index1.frame['_weight'].to_numpy() if weighted else None,
+                                index2.frame['_weight'].to_numpy() if weighted else None
+                            ) if len(dates1) and len(dates2) else None
                             
-                            if time_diffs:
+                            if stats is not None:
                                 response_times[f"{form1_id}_to_{form2_id}"] = {
-                                    'mean_response_time_hours': round(np.mean(time_diffs), 2),
-                                    'median_response_time_hours': round(np.median(time_diffs), 2),
-                                    'min_response_time_hours': round(min(time_diffs), 2),
-                                    'max_response_time_hours': round(max(time_diffs), 2),
-                                    'total_pairs_within_24h': len(time_diffs)
+                                    'mean_response_time_hours': round(stats['mean'], 2),
+                                    'median_response_time_hours': round(stats['median'], 2),
+                                    'min_response_time_hours': round(stats['min'], 2),
+                                    'max_response_time_hours': round(stats['max'], 2),
+                                    'total_pairs_within_24h': int(round(stats['count']))
                                 }
+            
+            # Response times between submissions of the same linked entity
+            if links is not None and len(links):
+                for (form1_id, form2_id), pairs in links.groupby(['left_form', 'right_form'], sort=True):
+                    df1 = form_dataframes[form1_id]
+                    df2 = form_dataframes[form2_id]
+                    if 'submission_date' not in df1.columns or 'submission_date' not in df2.columns:
+                        continue
+                    first = df1['submission_date'].loc[pairs['left_index']].to_numpy()
+                    second = df2['submission_date'].loc[pairs['right_index']].to_numpy()
+                    hours = (second - first) / np.timedelta64(1, 'h')
+                    hours = hours[~np.isnan(hours)]
+                    if len(hours):
+                        response_times[f"{form1_id}_to_{form2_id}_linked"] = {
+                            'mean_response_time_hours': round(float(np.mean(hours)), 2),
+                            'median_response_time_hours': round(float(np.median(hours)), 2),
+                            'min_response_time_hours': round(float(hours.min()), 2),
+                            'max_response_time_hours': round(float(hours.max()), 2),
+                            'linked_pairs': int(len(hours))
+                        }
         
         except Exception as e:
             logger.error(f"Error calculating response times: {e}")
@@ -465,14 +1395,22 @@ class MultiFormIndicatorProcessor:
             for form_id, df in form_dataframes.items():
                 form_score = 0
                 total_checks = 0
+                applicability = self.get_applicability(form_id, df)
+                validation = self.get_validation(form_id, df)
                 
                 for var in variables:
                     if var in df.columns:
                         total_checks += 1
                         var_score = 0
                         
-                        # Completeness check
-                        completeness = df[var].notna().sum() / len(df)
+                        # Completeness check (over the rows where the question applies)
+                        applicable = applicability.get(var)
+                        if applicable is None:
+                            completeness = df[var].notna().sum() / len(df)
+                        else:
+                            applicable_count = applicable.sum()
+                            present = df[var].notna().to_numpy() & applicable
+                            completeness = present.sum() / applicable_count if applicable_count > 0 else 1.0
                         var_score += completeness * 0.4
                         
                         # Consistency check (for numeric variables)
@@ -485,11 +1423,13 @@ class MultiFormIndicatorProcessor:
                             consistency = 1 - (outliers / len(df))
                             var_score += consistency * 0.3
                         
-                        # Validity check (basic range checks)
-                        if pd.api.types.is_numeric_dtype(df[var]):
-                            # Check if values are within reasonable bounds
-                            if df[var].min() >= 0 and df[var].max() < 1e6:  # Example bounds
-                                var_score += 0.3
+                        # Validity check (share of rows passing the field's validation rules);
+                        # without a registered structure validity is unknown and left out
+                        if validation is not None:
+                            validity = validation.validity(var)
+                            var_score += (1.0 if validity is None else validity) * 0.3
+                        else:
+                            var_score /= 0.7
                         
                         form_score += var_score
                 
@@ -501,8 +1441,14 @@ class MultiFormIndicatorProcessor:
                             'completeness_weight': 0.4,
                             'consistency_weight': 0.3,
                             'validity_weight': 0.3
+                        } if validation is not None else {
+                            'completeness_weight': round(0.4 / 0.7, 3),
+                            'consistency_weight': round(0.3 / 0.7, 3),
+                            'validity_weight': None
                         }
                     }
+                    if validation is not None:
+                        quality_scores[form_id]['validation'] = validation.summary()
         
         except Exception as e:
             logger.error(f"Error calculating data quality scores: {e}")
@@ -518,18 +1464,13 @@ class MultiFormIndicatorProcessor:
         try:
             for form_id, df in form_dataframes.items():
                 if 'submission_date' in df.columns:
-                    df['submission_date'] = pd.to_datetime(df['submission_date'])
-                    df = df.sort_values('submission_date')
+                    sorted_df = self.get_time_index(form_id, df).frame
                     
                     form_trends = {}
                     for var in variables:
                         if var in df.columns and pd.api.types.is_numeric_dtype(df[var]):
-                            # Calculate moving averages
-                            df[f'{var}_ma7'] = df[var].rolling(window=7, min_periods=1).mean()
-                            df[f'{var}_ma30'] = df[var].rolling(window=30, min_periods=1).mean()
-                            
                             # Calculate trend direction
-                            recent_values = df[var].tail(10)
+                            recent_values = sorted_df[var].tail(10)
                             if len(recent_values) >= 2:
                                 trend_slope = np.polyfit(range(len(recent_values)), recent_values, 1)[0]
                                 
@@ -653,7 +1594,7 @@ class MultiFormIndicatorProcessor:
             report.append("-" * 40)
             summaries = indicators['statistical_summaries']
             for form_id, form_data in summaries.items():
-                report.append(f"\nForm: {form_id}")
+                report.append(f"\nForm: {form_id}" if form_id != 'overall' else "\nAll forms:")
                 for var, stats in form_data.items():
                     if 'mean' in stats:  # Numeric variable
                         report.append(f"  {var}: mean={stats['mean']}, std={stats['std']}, range=[{stats['min']}, {stats['max']}]")
@@ -702,6 +1643,12 @@ class MultiFormIndicatorProcessor:
         
         return report_text
 
+def _shard_worker_main(processor_class, api_base_url: str, auth_token: str, queue_path: str, run_id: str):
+    """Local shard worker: its own processor (and HTTP session) and queue connection."""
+    processor = processor_class(api_base_url, auth_token)
+    with JobQueue(queue_path) as queue:
+        processor.run_shard_worker(queue, run_id)
+
 def main():
     """Main function to run the multi-form indicator script."""
     parser = argparse.ArgumentParser(description='Multi-Form Indicator Script')
@@ -710,52 +1657,96 @@ def main():
     parser.add_argument('--api-url', required=True, help='Base URL for the API')
     parser.add_argument('--auth-token', required=True, help='Authentication token')
     parser.add_argument('--output', help='Output file for the report')
+    parser.add_argument('--parameters', help='JSON execute parameters, e.g. \'{"dateRange": "last_30_days"}\'')
+    parser.add_argument('--connect-timeout', type=float, default=5.0, help='Connect timeout in seconds')
+    parser.add_argument('--read-timeout', type=float, default=60.0, help='Read timeout in seconds')
+    parser.add_argument('--max-retries', type=int, default=3, help='Retries for failed GET requests')
+    parser.add_argument('--dedup', choices=['exact', 'near'], help='Remove duplicate submissions before analysis')
+    parser.add_argument('--sketch-store', help='JSON file of categorical sketches, updated with each run')
+    parser.add_argument('--shard-queue', help='Run sharded: SQLite job queue file for the work units')
+    parser.add_argument('--workers', type=int, default=2, help='Local worker processes in sharded mode')
+    parser.add_argument('--shard-days', type=int, help='Split forms into windows of this many days in sharded mode')
+    parser.add_argument('--warehouse', help='SQLite warehouse file; fetched forms are stored and aggregated in SQL')
+    parser.add_argument('--warehouse-cached', action='store_true',
+                        help='Aggregate the forms already stored in --warehouse without fetching them')
     
     args = parser.parse_args()
     
     # Parse arguments
     form_ids = [fid.strip() for fid in args.form_ids.split(',')]
     variables = [var.strip() for var in args.variables.split(',')]
+    parameters = json.loads(args.parameters) if args.parameters else None
+    if args.dedup:
+        parameters = {**(parameters or {}), 'dedup': {'near': args.dedup == 'near'}}
     
     logger.info(f"Starting multi-form indicator analysis")
     logger.info(f"Forms: {form_ids}")
     logger.info(f"Variables: {variables}")
     
     # Initialize processor
-    processor = MultiFormIndicatorProcessor(args.api_url, args.auth_token)
+    transport = HTTPTransport(
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        max_retries=args.max_retries
+    )
+    sketch_store = SketchStore.load(args.sketch_store) if args.sketch_store else None
+    warehouse = SubmissionWarehouse(args.warehouse) if args.warehouse else None
+    processor = MultiFormIndicatorProcessor(args.api_url, args.auth_token, transport=transport,
+                                            sketch_store=sketch_store, warehouse=warehouse)
     
+    if args.shard_queue:
+        logger.info(f"Calculating cross-form indicators on {args.workers + 1} local shard workers")
+        results = processor.calculate_sharded_indicators(
+            form_ids, variables, args.shard_queue, parameters, workers=args.workers, shard_days=args.shard_days
+        )
+        report = processor.generate_report(results, args.output)
+        print(f"Run {results['metadata']['sharding']['run_id']}: "
+              f"{results['metadata']['sharding']['completed_units']} units, "
+              f"{results['metadata'].get('total_records', 0):,} records")
+        if not args.output:
+            print(report)
+        return 1 if results.get('error') else 0
+
+    if args.warehouse:
+        if not args.warehouse_cached:
+            for form_id in form_ids:
+                logger.info(f"Storing form {form_id} in warehouse {args.warehouse}")
+                df = processor.load_form_dataframe(form_id, parameters)
+                if not df.empty:
+                    processor.store_in_warehouse(form_id, df)
+            logger.info(f"HTTP transport: {transport.stats.summary()}")
+        logger.info("Calculating cross-form indicators in the warehouse")
+        results = processor.calculate_warehouse_indicators(form_ids, variables, parameters)
+        warehouse.close()
+        report = processor.generate_report(results, args.output)
+        print(f"Forms processed: {len(results['metadata']['forms_processed'])}, "
+              f"{results['metadata']['total_records']:,} records")
+        if not args.output:
+            print(report)
+        return 1 if results.get('error') else 0
+
     # Fetch and process data from all forms
     form_dataframes = {}
     for form_id in form_ids:
         logger.info(f"Fetching data from form {form_id}")
         
-        # Fetch form structure
-        form_structure = processor.fetch_form_structure(form_id)
-        if not form_structure:
-            logger.warning(f"Could not fetch structure for form {form_id}")
-            continue
-        
-        # Fetch form data
-        form_data = processor.fetch_form_data(form_id)
-        if not form_data:
-            logger.warning(f"No data found for form {form_id}")
-            continue
-        
-        # Normalize data
-        df = processor.normalize_data(form_data, form_structure)
+        # Fetch structure and data, then normalize
+        df = processor.load_form_dataframe(form_id, parameters, variables)
         if not df.empty:
             form_dataframes[form_id] = df
             logger.info(f"Processed {len(df)} records from form {form_id}")
         else:
             logger.warning(f"No valid data processed for form {form_id}")
     
+    logger.info(f"HTTP transport: {transport.stats.summary()}")
+    
     if not form_dataframes:
         logger.error("No data could be processed from any forms")
         return 1
     
     # Calculate indicators
     logger.info("Calculating cross-form indicators")
-    results = processor.calculate_cross_form_indicators(form_dataframes, variables)
+    results = processor.calculate_cross_form_indicators(form_dataframes, variables, parameters)
     
     # Generate report
     logger.info("Generating report")
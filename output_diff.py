@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Output Change Detection
+=======================
+
+Stable content hashes for indicator outputs and a diff against the previous
+execution, so storage and dashboard clients only re-process outputs whose
+content actually changed.
+
+The hash covers the whole output (id, type, names, data) serialized as
+canonical JSON (sorted keys, no whitespace, numpy/pandas scalars converted),
+so the same content always hashes the same regardless of dict order or
+numeric container types. The ``contentHash``/``changed`` markers themselves
+are excluded.
+
+Outputs of the previous execution that are no longer produced are reported as
+tombstones, ``{"id": ..., "removed": true, "changed": true, "contentHash": null}``,
+so clients can drop them; saving marked outputs forgets their hashes.
+
+Usage:
+    diff = diff_outputs(outputs, previous_outputs)      # or previous {id: hash}
+    diff['changed'], diff['unchanged'], diff['removed']
+
+    store = OutputHashStore('/var/lib/gconnector/output_hashes/indicator_123.json')
+    with locked(store.path):
+        outputs = mark_changes(outputs, store.load(), only_changed=True)
+        store.save(outputs)
+"""
+
+import hashlib
+import json
+import os
+from datetime import date, datetime
+from typing import Dict, List, Any, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+MARKER_KEYS = ('contentHash', 'changed')
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (pd.Series, pd.Index)):
+        return value.tolist()
+    if value is pd.NaT or value is None:
+        return None
+    return str(value)
+
+
+def output_hash(output: Dict[str, Any]) -> str:
+    """Stable content hash of one output (markers excluded)."""
+    content = {key: value for key, value in output.items() if key not in MARKER_KEYS}
+    canonical = json.dumps(content, sort_keys=True, separators=(',', ':'), default=_json_default)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _previous_hashes(previous: Union[Dict[str, str], List[Dict[str, Any]], None]) -> Dict[str, str]:
+    """Accept either stored outputs or an ``{output id: hash}`` mapping."""
+    if not previous:
+        return {}
+    if isinstance(previous, dict):
+        return dict(previous)
+    return {
+        output['id']: output.get('contentHash') or output_hash(output)
+        for output in previous if 'id' in output and not output.get('removed')
+    }
+
+
+def diff_outputs(outputs: List[Dict[str, Any]],
+                 previous: Union[Dict[str, str], List[Dict[str, Any]], None],
+                 scope: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Compare outputs with the previous execution.
+
+    Args:
+        outputs: Outputs of the current execution
+        previous: Previous outputs (stored output dicts) or their ``{id: hash}`` mapping
+        scope: IDs the current execution could have produced (e.g. the requested output
+            IDs); previous outputs outside it are not reported as removed
+
+    Returns:
+        Dict with ``hashes`` (id -> hash), ``changed``, ``unchanged`` and ``removed`` id lists
+    """
+    old = _previous_hashes(previous)
+    hashes = {output['id']: output_hash(output) for output in outputs if not output.get('removed')}
+    scope = set(scope) if scope is not None else None
+    return {
+        'hashes': hashes,
+        'changed': [output_id for output_id, content_hash in hashes.items() if old.get(output_id) != content_hash],
+        'unchanged': [output_id for output_id, content_hash in hashes.items() if old.get(output_id) == content_hash],
+        'removed': [
+            output_id for output_id in old
+            if output_id not in hashes and (scope is None or output_id in scope)
+        ]
+    }
+
+
+def mark_changes(outputs: List[Dict[str, Any]],
+                 previous: Union[Dict[str, str], List[Dict[str, Any]], None],
+                 only_changed: bool = False, scope: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Add ``contentHash`` and ``changed`` markers to each output and append a tombstone
+    per removed output.
+
+    Args:
+        outputs: Outputs of the current execution
+        previous: Previous outputs or their ``{id: hash}`` mapping
+        only_changed: Return only the outputs whose content changed (and the tombstones)
+        scope: IDs the current execution could have produced (see ``diff_outputs``)
+
+    Returns:
+        The marked outputs (new dicts; the inputs are not modified)
+    """
+    diff = diff_outputs(outputs, previous, scope)
+    unchanged = set(diff['unchanged'])
+    marked = []
+    for output in outputs:
+        changed = output['id'] not in unchanged
+        if only_changed and not changed:
+            continue
+        marked.append({**output, 'contentHash': diff['hashes'][output['id']], 'changed': changed})
+    marked.extend(
+        {'id': output_id, 'removed': True, 'changed': True, 'contentHash': None} for output_id in diff['removed']
+    )
+    return marked
+
+
+class OutputHashStore:
+    """
+    The previous execution's output hashes persisted as a small JSON file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, outputs: List[Dict[str, Any]], merge: bool = True):
+        """
+        Store the hashes of ``outputs`` (written atomically; hold ``locked(self.path)``
+        around the load and save when executions may run concurrently).
+
+        Args:
+            outputs: Outputs of the current execution (marked or not); the hashes of
+                removed-output tombstones are dropped
+            merge: Keep stored hashes of outputs not in ``outputs`` (e.g. when only
+                changed outputs or a subset of output IDs were generated)
+        """
+        hashes = self.load() if merge else {}
+        for output in outputs:
+            if output.get('removed'):
+                hashes.pop(output['id'], None)
+            else:
+                hashes[output['id']] = output.get('contentHash') or output_hash(output)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(hashes, f, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Cross-Form Record Linkage
+=========================
+
+Links records from different forms that refer to the same entity and returns
+a link table the cross-form indicators can consume.
+
+- Exact links: hash joins on normalized key columns (e.g. email, username).
+- Fuzzy links: candidate pairs come from blocking indexes instead of all pairs,
+  then are scored field by field:
+
+  - ``token``: records sharing a normalized token of a blocking field
+  - ``phonetic``: records sharing the Soundex code of a token
+  - ``sorted_neighbourhood``: records within ``window`` positions of each other
+    after sorting both forms together on the blocking key
+
+  Oversized blocks (very common tokens) are skipped, so the number of
+  comparisons stays near-linear in the number of records.
+
+Text is normalized once per distinct value (HTML entities unescaped, accents
+stripped, lowercased, punctuation removed).
+
+Link table columns: ``left_form``, ``left_index``, ``right_form``,
+``right_index``, ``match_type`` (exact/fuzzy), ``score``.
+
+Usage:
+    linker = RecordLinker(keys=['email'], fuzzy_fields=['name', 'company'], blocking='token')
+    links = linker.link(form_dataframes)
+"""
+
+import html
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, List, Any, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+LINK_COLUMNS = ['left_form', 'left_index', 'right_form', 'right_index', 'match_type', 'score']
+BLOCKING_METHODS = ('token', 'phonetic', 'sorted_neighbourhood')
+
+_NON_WORD = re.compile(r'[^\w\s@.]+|_')
+_SPACES = re.compile(r'\s+')
+_SOUNDEX_CODES = str.maketrans('bfpvcgjkqsxzdtlmnr', '111122222222334556')
+
+
+def _normalize_value(value: Any) -> str:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ''
+    text = unicodedata.normalize('NFKD', html.unescape(str(value)))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return _SPACES.sub(' ', _NON_WORD.sub(' ', text)).strip()
+
+
+def normalize_text(values: pd.Series) -> pd.Series:
+    """Normalized text for a column, computed once per distinct value."""
+    codes, uniques = pd.factorize(values.astype(object), use_na_sentinel=True)
+    normalized = np.array([_normalize_value(value) for value in uniques] + [''], dtype=object)
+    return pd.Series(normalized[codes], index=values.index)
+
+
+def soundex(token: str) -> str:
+    """American Soundex code of a token ('' for tokens without letters)."""
+    letters = [char for char in token.lower() if 'a' <= char <= 'z']
+    if not letters:
+        return ''
+    first = letters[0]
+    digits = ''.join(letters).translate(_SOUNDEX_CODES)
+    code, previous = first.upper(), digits[0] if digits[0].isdigit() else ''
+    for letter, digit in zip(letters[1:], digits[1:]):
+        if digit.isdigit() and digit != previous:
+            code += digit
+        if letter not in 'hw':
+            previous = digit if digit.isdigit() else ''
+    return (code + '000')[:4]
+
+
+def _empty_links() -> pd.DataFrame:
+    return pd.DataFrame({column: pd.Series(dtype=object) for column in LINK_COLUMNS})
+
+
+class RecordLinker:
+    """
+    Exact and blocked fuzzy linkage between pairs of forms.
+    """
+
+    def __init__(self, keys: Optional[Sequence[str]] = None, fuzzy_fields: Optional[Sequence[str]] = None,
+                 blocking: str = 'token', blocking_fields: Optional[Sequence[str]] = None,
+                 threshold: float = 0.85, window: int = 5, max_block_size: int = 1000,
+                 one_to_one: bool = True):
+        """
+        Configure the linker.
+
+        Args:
+            keys: Columns joined exactly (after normalization); all must match
+            fuzzy_fields: Columns compared for fuzzy matches (mean similarity is the score)
+            blocking: 'token', 'phonetic' or 'sorted_neighbourhood'
+            blocking_fields: Columns used to build blocks (defaults to ``fuzzy_fields``)
+            threshold: Minimum fuzzy score (0..1) for a link
+            window: Window size for sorted-neighbourhood blocking
+            max_block_size: Skip blocks larger than this (e.g. very common tokens)
+            one_to_one: Keep only the best link per record on either side
+        """
+        if blocking not in BLOCKING_METHODS:
+            raise ValueError(f"Unsupported blocking method: {blocking}")
+        self.keys = list(keys or [])
+        self.fuzzy_fields = list(fuzzy_fields or [])
+        self.blocking = blocking
+        self.blocking_fields = list(blocking_fields or self.fuzzy_fields)
+        self.threshold = threshold
+        self.window = window
+        self.max_block_size = max_block_size
+        self.one_to_one = one_to_one
+
+    @classmethod
+    def from_parameters(cls, linkage: Dict[str, Any]) -> 'RecordLinker':
+        """Build a linker from the ``linkage`` execute parameter (camelCase keys)."""
+        return cls(
+            keys=linkage.get('keys'),
+            fuzzy_fields=linkage.get('fuzzyFields'),
+            blocking=linkage.get('blocking', 'token'),
+            blocking_fields=linkage.get('blockingFields'),
+            threshold=linkage.get('threshold', 0.85),
+            window=linkage.get('window', 5),
+            max_block_size=linkage.get('maxBlockSize', 1000),
+            one_to_one=linkage.get('oneToOne', True)
+        )
+
+    @property
+    def fields(self) -> List[str]:
+        """Every column the linker reads."""
+        return list(dict.fromkeys(self.keys + self.fuzzy_fields + self.blocking_fields))
+
+    def exact_pairs(self, left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+        """Positional pairs whose normalized key columns are all equal (hash join)."""
+        if not self.keys or any(key not in left.columns or key not in right.columns for key in self.keys):
+            return pd.DataFrame({'left': pd.Series(dtype=np.int64), 'right': pd.Series(dtype=np.int64)})
+
+        left_keys = pd.DataFrame({key: normalize_text(left[key]).to_numpy() for key in self.keys})
+        right_keys = pd.DataFrame({key: normalize_text(right[key]).to_numpy() for key in self.keys})
+        left_keys['left'] = np.arange(len(left))
+        right_keys['right'] = np.arange(len(right))
+        # Blank keys never match
+        left_keys = left_keys[(left_keys[self.keys] != '').all(axis=1)]
+        right_keys = right_keys[(right_keys[self.keys] != '').all(axis=1)]
+        return left_keys.merge(right_keys, on=self.keys, how='inner')[['left', 'right']]
+
+    def _blocking_tokens(self, df: pd.DataFrame) -> pd.DataFrame:
+        """(row, token) pairs for token or phonetic blocking."""
+        frames = []
+        for field in self.blocking_fields:
+            if field not in df.columns:
+                continue
+            tokens = normalize_text(df[field]).reset_index(drop=True).str.split(' ').explode()
+            tokens = tokens[tokens.str.len() > 1]
+            if self.blocking == 'phonetic':
+                codes, uniques = pd.factorize(tokens)
+                tokens = pd.Series(np.array([soundex(token) for token in uniques], dtype=object)[codes],
+                                   index=tokens.index)
+                tokens = tokens[tokens != '']
+            frames.append(pd.DataFrame({'row': tokens.index.to_numpy(), 'token': f"{field}:" + tokens.to_numpy()}))
+        if not frames:
+            return pd.DataFrame({'row': pd.Series(dtype=np.int64), 'token': pd.Series(dtype=object)})
+        return pd.concat(frames, ignore_index=True).drop_duplicates()
+
+    def candidate_pairs(self, left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+        """Positional candidate pairs produced by the blocking index."""
+        if self.blocking == 'sorted_neighbourhood':
+            return self._sorted_neighbourhood(left, right)
+
+        left_tokens = self._blocking_tokens(left)
+        right_tokens = self._blocking_tokens(right)
+        # Drop oversized blocks before joining so common tokens don't explode the pair count
+        sizes = pd.concat([left_tokens['token'], right_tokens['token']]).value_counts()
+        keep = set(sizes.index[sizes <= self.max_block_size])
+        left_tokens = left_tokens[left_tokens['token'].isin(keep)]
+        right_tokens = right_tokens[right_tokens['token'].isin(keep)]
+        pairs = left_tokens.merge(right_tokens, on='token', suffixes=('_left', '_right'))
+        return pairs.rename(columns={'row_left': 'left', 'row_right': 'right'})[['left', 'right']].drop_duplicates()
+
+    def _sorted_neighbourhood(self, left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+        fields = [field for field in self.blocking_fields if field in left.columns and field in right.columns]
+        if not fields:
+            return pd.DataFrame({'left': pd.Series(dtype=np.int64), 'right': pd.Series(dtype=np.int64)})
+
+        def sort_key(df):
+            key = normalize_text(df[fields[0]]).to_numpy()
+            for field in fields[1:]:
+                key = key + ' ' + normalize_text(df[field]).to_numpy()
+            return key
+
+        keys = np.concatenate([sort_key(left), sort_key(right)])
+        side = np.concatenate([np.zeros(len(left), dtype=np.int8), np.ones(len(right), dtype=np.int8)])
+        row = np.concatenate([np.arange(len(left)), np.arange(len(right))])
+        order = np.argsort(keys, kind='stable')
+        side, row = side[order], row[order]
+
+        pairs = []
+        for offset in range(1, self.window):
+            a, b = slice(0, len(order) - offset), slice(offset, len(order))
+            cross = side[a] != side[b]
+            first, second = row[a][cross], row[b][cross]
+            first_is_left = side[a][cross] == 0
+            pairs.append(pd.DataFrame({
+                'left': np.where(first_is_left, first, second),
+                'right': np.where(first_is_left, second, first)
+            }))
+        return pd.concat(pairs, ignore_index=True).drop_duplicates()
+
+    def score_pairs(self, left: pd.DataFrame, right: pd.DataFrame, pairs: pd.DataFrame) -> np.ndarray:
+        """Mean per-field similarity (0..1) of candidate pairs, using each distinct value pair once."""
+        fields = [field for field in self.fuzzy_fields if field in left.columns and field in right.columns]
+        if not fields or pairs.empty:
+            return np.zeros(len(pairs))
+
+        total = np.zeros(len(pairs))
+        for field in fields:
+            left_values = normalize_text(left[field]).to_numpy()[pairs['left'].to_numpy()]
+            right_values = normalize_text(right[field]).to_numpy()[pairs['right'].to_numpy()]
+            value_pairs = pd.DataFrame({'a': left_values, 'b': right_values})
+            codes, uniques = pd.factorize(pd.MultiIndex.from_frame(value_pairs))
+            similarities = np.array([
+                SequenceMatcher(None, a, b).ratio() if a and b else 0.0 for a, b in uniques
+            ])
+            total += similarities[codes]
+        return total / len(fields)
+
+    def link_pair(self, left_form: str, left: pd.DataFrame, right_form: str, right: pd.DataFrame) -> pd.DataFrame:
+        """
+        Link two forms.
+
+        Args:
+            left_form: ID of the left form
+            left: Left form's DataFrame
+            right_form: ID of the right form
+            right: Right form's DataFrame
+
+        Returns:
+            Link table (indexes are the frames' index labels)
+        """
+        tables = []
+
+        exact = self.exact_pairs(left, right)
+        if len(exact):
+            tables.append(exact.assign(match_type='exact', score=1.0))
+
+        if self.fuzzy_fields:
+            candidates = self.candidate_pairs(left, right)
+            if len(exact) and len(candidates):
+                # Pairs already linked exactly need no fuzzy comparison
+                linked = exact.assign(_linked=True)
+                candidates = candidates.merge(linked, on=['left', 'right'], how='left')
+                candidates = candidates[candidates['_linked'].isna()][['left', 'right']]
+            scores = self.score_pairs(left, right, candidates)
+            fuzzy = candidates.assign(match_type='fuzzy', score=scores)
+            tables.append(fuzzy[fuzzy['score'] >= self.threshold])
+
+        if not tables:
+            return _empty_links()
+        links = pd.concat(tables, ignore_index=True)
+        if links.empty:
+            return _empty_links()
+
+        if self.one_to_one:
+            # Greedy best-first: exact links, then higher scores win
+            links = links.sort_values(['score', 'match_type'], ascending=[False, True], kind='stable')
+            links = links.drop_duplicates('left').drop_duplicates('right')
+
+        return pd.DataFrame({
+            'left_form': left_form,
+            'left_index': left.index.to_numpy()[links['left'].to_numpy()],
+            'right_form': right_form,
+            'right_index': right.index.to_numpy()[links['right'].to_numpy()],
+            'match_type': links['match_type'].to_numpy(),
+            'score': links['score'].to_numpy().round(4)
+        })
+
+    def link(self, form_dataframes: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Link every pair of forms and return one link table."""
+        tables = [
+            self.link_pair(left_form, form_dataframes[left_form], right_form, form_dataframes[right_form])
+            for left_form, right_form in combinations(form_dataframes, 2)
+        ]
+        tables = [table for table in tables if len(table)]
+        return pd.concat(tables, ignore_index=True) if tables else _empty_links()
+
+
+def summarize_links(links: pd.DataFrame) -> Dict[str, Any]:
+    """Link counts per form pair and match type."""
+    summary = {}
+    for (left_form, right_form), group in links.groupby(['left_form', 'right_form'], sort=True):
+        summary[f"{left_form}_to_{right_form}"] = {
+            'total_links': int(len(group)),
+            'exact_links': int((group['match_type'] == 'exact').sum()),
+            'fuzzy_links': int((group['match_type'] == 'fuzzy').sum()),
+            'mean_score': round(float(group['score'].mean()), 4)
+        }
+    return {'total_links': int(len(links)), 'form_pairs': summary}
@@ -0,0 +1,807 @@
+#!/usr/bin/env python3
+"""
+Sharded Execution
+=================
+
+Runs the multi-form indicators as independent work units on a durable
+SQLite job queue, so a large analysis can use any number of worker
+processes, on this host or on other hosts sharing the queue file.
+
+- The planner splits a run into one unit per form or, with ``shard_days``
+  and a bounded date range, one unit per form and ``[start, end)`` window.
+- Workers claim units atomically (``BEGIN IMMEDIATE``) under a lease; units
+  whose worker died are reclaimed once the lease expires and are retried up
+  to ``max_attempts`` times.
+- Each unit loads only its form and window and writes back partial
+  aggregates: row and completeness counts, moment and quantile sketches of
+  numeric variables, categorical sketches, and daily/weekly/monthly counts.
+- The reducer merges the partials into the standard results dict of
+  ``MultiFormIndicatorProcessor.calculate_cross_form_indicators``
+  (metadata, data_completeness, temporal_analysis, statistical_summaries).
+
+Indicators that need the rows of several units at once (cross-form
+correlation, record linkage, response times, quality scores, trends and
+anomalies) are not computed in sharded mode.
+
+The queue uses WAL journaling by default. Workers on other hosts need a
+shared filesystem with working POSIX locks; WAL does not work over network
+filesystems, so open such queues with ``wal=False``.
+
+Usage:
+    python sharded_execution.py submit --queue run.db --form-ids f1,f2 --variables age,sex --shard-days 30
+    python sharded_execution.py worker --queue run.db --api-url URL --auth-token TOKEN   # on each worker
+    python sharded_execution.py reduce --queue run.db --run-id RUN_ID --output report.txt
+"""
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from datetime import datetime, date
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from filter_plan import FilterPlan, resolve_date_range
+from sketches import CategoricalSketch, MomentSketch, QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE = 600.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RUN_TIMEOUT = 3600.0
+RECENT_DAYS = (7, 30, 90)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    spec TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    run_id TEXT NOT NULL,
+    unit_id INTEGER NOT NULL,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    leased_until REAL,
+    result TEXT,
+    error TEXT,
+    PRIMARY KEY (run_id, unit_id)
+);
+CREATE INDEX IF NOT EXISTS units_status ON units (status, leased_until);
+"""
+
+
+class JobQueue:
+    """
+    Durable queue of work units in one SQLite file.
+    """
+
+    def __init__(self, path: str, lease: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 wal: bool = True):
+        """
+        Open (and create) the queue.
+
+        Args:
+            path: SQLite file shared by the submitter, the workers and the reducer
+            lease: Seconds a claimed unit stays with its worker before it may be reclaimed
+            max_attempts: Claims per unit before it is marked failed
+            wal: Use WAL journaling (disable for queues on network filesystems)
+        """
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self._connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        if wal:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self) -> 'JobQueue':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, statements: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run ``statements`` in one immediate (write-locked) transaction."""
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            result = statements(connection)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    def create_run(self, spec: Dict[str, Any], units: List[Dict[str, Any]], run_id: Optional[str] = None) -> str:
+        """
+        Enqueue a run.
+
+        Args:
+            spec: Run specification shared by all units (variables, parameters, now)
+            units: Unit specifications (form_id, optional start/end)
+            run_id: Run ID (a new one by default)
+
+        Returns:
+            The run ID
+        """
+        run_id = run_id or uuid.uuid4().hex[:12]
+
+        def insert(connection):
+            connection.execute('INSERT INTO runs VALUES (?, ?, ?)', (run_id, json.dumps(spec), time.time()))
+            connection.executemany(
+                'INSERT INTO units (run_id, unit_id, spec) VALUES (?, ?, ?)',
+                [(run_id, unit_id, json.dumps(unit)) for unit_id, unit in enumerate(units)]
+            )
+
+        self._write(insert)
+        return run_id
+
+    def run_spec(self, run_id: str) -> Dict[str, Any]:
+        row = self._connection.execute('SELECT spec FROM runs WHERE run_id = ?', (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        return json.loads(row[0])
+
+    def claim(self, worker_id: str, run_id: Optional[str] = None) -> Optional[Tuple[str, int, Dict[str, Any]]]:
+        """
+        Claim the next pending unit (or one whose lease expired).
+
+        Args:
+            worker_id: Identifies the claiming worker
+            run_id: Only claim units of this run
+
+        Returns:
+            (run ID, unit ID, unit spec), or None when nothing is claimable
+        """
+        def claim(connection):
+            now = time.time()
+            # Units that keep losing their worker are given up on
+            connection.execute(
+                "UPDATE units SET status = 'failed', error = 'lease expired' "
+                "WHERE status = 'running' AND leased_until < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            query = (
+                "SELECT units.run_id, units.unit_id, units.spec FROM units JOIN runs USING (run_id) "
+                "WHERE (units.status = 'pending' OR (units.status = 'running' AND units.leased_until < ?))"
+            )
+            arguments: List[Any] = [now]
+            if run_id is not None:
+                query += ' AND units.run_id = ?'
+                arguments.append(run_id)
+            row = connection.execute(query + ' ORDER BY runs.created_at, units.unit_id LIMIT 1', arguments).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE units SET status = 'running', worker = ?, attempts = attempts + 1, leased_until = ? "
+                "WHERE run_id = ? AND unit_id = ?",
+                (worker_id, now + self.lease, row[0], row[1])
+            )
+            return row[0], row[1], json.loads(row[2])
+
+        return self._write(claim)
+
+    def complete(self, run_id: str, unit_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Store a unit's partial aggregates; False when the unit was reclaimed by another worker."""
+        payload = json.dumps(result)
+
+        def complete(connection):
+            return connection.execute(
+                "UPDATE units SET status = 'done', result = ?, error = NULL, leased_until = NULL "
+                "WHERE run_id = ? AND unit_id = ? AND status = 'running' AND worker = ?",
+                (payload, run_id, unit_id, worker_id)
+            ).rowcount == 1
+
+        return self._write(complete)
+
+    def fail(self, run_id: str, unit_id: int, worker_id: str, error: str):
+        """Record a failed attempt; the unit goes back to pending until it runs out of attempts."""
+        def fail(connection):
+            connection.execute(
+                "UPDATE units SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, leased_until = NULL "
+                "WHERE run_id = ? AND unit_id = ? AND status = 'running' AND worker = ?",
+                (self.max_attempts, error, run_id, unit_id, worker_id)
+            )
+
+        self._write(fail)
+
+    def expire_leases(self, run_id: str, worker_id: str) -> int:
+        """
+        Expire the leases of a worker known to be dead, so its running units are claimed again now.
+
+        Returns:
+            Number of units released
+        """
+        def expire(connection):
+            return connection.execute(
+                "UPDATE units SET leased_until = 0 WHERE run_id = ? AND worker = ? AND status = 'running'",
+                (run_id, worker_id)
+            ).rowcount
+
+        return self._write(expire)
+
+    def progress(self, run_id: str) -> Dict[str, int]:
+        """Unit counts per status."""
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        rows = self._connection.execute(
+            'SELECT status, COUNT(*) FROM units WHERE run_id = ? GROUP BY status', (run_id,)
+        )
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+    def units(self, run_id: str) -> List[Dict[str, Any]]:
+        """Every unit of a run with its status, worker, attempts and error (results excluded)."""
+        rows = self._connection.execute(
+            'SELECT unit_id, spec, status, worker, attempts, error FROM units WHERE run_id = ? ORDER BY unit_id',
+            (run_id,)
+        )
+        return [
+            {'unit_id': unit_id, **json.loads(spec), 'status': status, 'worker': worker,
+             'attempts': attempts, 'error': error}
+            for unit_id, spec, status, worker, attempts, error in rows
+        ]
+
+    def results(self, run_id: str) -> List[Dict[str, Any]]:
+        """Partial aggregates of the completed units."""
+        rows = self._connection.execute(
+            "SELECT result FROM units WHERE run_id = ? AND status = 'done' ORDER BY unit_id", (run_id,)
+        )
+        return [json.loads(result) for (result,) in rows]
+
+    def wait(self, run_id: str, timeout: Optional[float] = None, poll: float = 0.5) -> Dict[str, int]:
+        """
+        Block until no unit of the run is pending or running.
+
+        Returns:
+            The final progress counts
+
+        Raises:
+            TimeoutError: When ``timeout`` seconds pass first
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            progress = self.progress(run_id)
+            if progress['pending'] == 0 and progress['running'] == 0:
+                return progress
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Run {run_id} not finished after {timeout}s: {progress}")
+            time.sleep(poll)
+
+
+def _local_now(spec: Dict[str, Any]) -> datetime:
+    return datetime.fromtimestamp(spec['now'])
+
+
+def plan_units(form_ids: List[str], parameters: Optional[Dict[str, Any]] = None,
+               shard_days: Optional[int] = None, now: Optional[float] = None,
+               form_bounds: Optional[Dict[str, Tuple[Any, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Split a run into work units.
+
+    Args:
+        form_ids: Forms of the run
+        parameters: Execute parameters; a ``dateRange`` with a start bounds the windows
+        shard_days: Window length in days (None: one unit per form)
+        now: Run time (epoch seconds) relative date ranges resolve against
+        form_bounds: Per-form (start, end) of the submissions, for forms large enough to
+            split without a bounded ``dateRange``
+
+    Returns:
+        Unit specs with ``form_id`` and, for windows, ISO ``start``/``end`` (end exclusive;
+        the last window of an open range has no end)
+    """
+    now = now if now is not None else time.time()
+    start, end = resolve_date_range((parameters or {}).get('dateRange'), datetime.fromtimestamp(now))
+    units = []
+    for form_id in form_ids:
+        form_start, form_end = start, end
+        if form_bounds and form_id in form_bounds:
+            bounds = [pd.Timestamp(bound) if bound is not None else None for bound in form_bounds[form_id]]
+            form_start = max(filter(None, [form_start, bounds[0]]), default=None)
+            # The explicit bound is inclusive; windows end exclusively, so step past it
+            bound_end = bounds[1] + pd.Timedelta(microseconds=1) if bounds[1] is not None else None
+            form_end = min(filter(None, [form_end, bound_end]), default=None)
+        if not shard_days or form_start is None:
+            units.append({'form_id': form_id})
+            continue
+        limit = form_end if form_end is not None else pd.Timestamp(datetime.fromtimestamp(now))
+        window = pd.Timedelta(days=shard_days)
+        bound = form_start
+        while True:
+            upper = bound + window
+            last = upper >= limit
+            units.append({
+                'form_id': form_id,
+                'start': bound.isoformat(),
+                # An open-ended range keeps its last window open, so late submissions are not lost
+                'end': (form_end.isoformat() if form_end is not None else None) if last else upper.isoformat()
+            })
+            if last:
+                break
+            bound = upper
+    return units
+
+
+def unit_parameters(spec: Dict[str, Any], unit: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute parameters of one unit: the run's parameters with the unit's window as ``dateRange``."""
+    parameters = dict(spec.get('parameters') or {})
+    if 'start' in unit:
+        parameters['dateRange'] = {'start': unit['start'], 'end': unit.get('end')}
+    elif parameters.get('dateRange') is not None:
+        # Relative ranges resolve against the run time, not the worker's clock
+        start, end = resolve_date_range(parameters['dateRange'], _local_now(spec))
+        parameters['dateRange'] = {
+            'start': start.isoformat() if start is not None else None,
+            'end': end.isoformat() if end is not None else None
+        }
+    return parameters
+
+
+def _day_counts(dates: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique calendar days (datetime64[D], in the column's timezone) and their row counts."""
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    days = dates.to_numpy().astype('datetime64[D]')
+    return np.unique(days, return_counts=True)
+
+
+def partial_aggregates(df: pd.DataFrame, variables: List[str], now: float,
+                       applicability: Optional[Dict[str, np.ndarray]] = None,
+                       date_column: str = 'submission_date') -> Dict[str, Any]:
+    """
+    Mergeable aggregates of one unit's rows, as a JSON-serializable dict.
+
+    Args:
+        df: The unit's (filtered) rows
+        variables: Variables of the run
+        now: Run time (epoch seconds) for the recent-activity windows
+        applicability: Skip-logic applicability masks per variable
+        date_column: Submission timestamp column
+
+    Returns:
+        Dict with rows, completeness, numeric, categorical and temporal partials
+    """
+    applicability = applicability or {}
+    partial: Dict[str, Any] = {'rows': int(len(df)), 'completeness': {}, 'numeric': {}, 'categorical': {}}
+
+    for var in variables:
+        if var not in df.columns:
+            continue
+        present = df[var].notna().to_numpy()
+        applicable = applicability.get(var)
+        if applicable is None:
+            applicable = np.ones(len(df), dtype=bool)
+        partial['completeness'][var] = [int(len(df)), int(applicable.sum()), int((present & applicable).sum())]
+
+        if pd.api.types.is_numeric_dtype(df[var]):
+            values = df[var].to_numpy(dtype=float, na_value=np.nan)
+            moments = MomentSketch()
+            moments.add_many(values)
+            quantiles = QuantileSketch()
+            quantiles.add_many(values)
+            partial['numeric'][var] = {'moments': moments.to_dict(), 'quantiles': quantiles.to_dict()}
+        else:
+            partial['categorical'][var] = CategoricalSketch().update(df[var]).to_dict()
+
+    if date_column in df.columns:
+        dates = pd.to_datetime(df[date_column]).dropna()
+        if len(dates):
+            days, counts = _day_counts(dates)
+            tz = getattr(dates.dt, 'tz', None)
+            reference = pd.Timestamp(now, unit='s', tz='UTC')
+            reference = reference.tz_convert(tz) if tz is not None else pd.Timestamp(datetime.fromtimestamp(now))
+            partial['temporal'] = {
+                'daily': {str(day): int(count) for day, count in zip(days, counts)},
+                'recent': {
+                    str(days_back): int((dates >= reference - pd.Timedelta(days=days_back)).sum())
+                    for days_back in RECENT_DAYS
+                },
+                'start': dates.min().isoformat(),
+                'end': dates.max().isoformat()
+            }
+    return partial
+
+
+def run_worker(queue: JobQueue, load: Callable[[str, Dict[str, Any], List[str]], pd.DataFrame],
+               applicability: Optional[Callable[[str, pd.DataFrame], Dict[str, np.ndarray]]] = None,
+               worker_id: Optional[str] = None, run_id: Optional[str] = None,
+               idle_timeout: float = 0.0, poll: float = 1.0) -> int:
+    """
+    Claim and process units until the queue stays empty for ``idle_timeout`` seconds.
+
+    Args:
+        queue: The job queue
+        load: ``load(form_id, parameters, variables)`` returning the form's normalized rows
+            for the unit's parameters
+        applicability: ``applicability(form_id, df)`` returning skip-logic masks
+        worker_id: Worker name recorded on claimed units (default: host and PID)
+        run_id: Only process units of this run
+        idle_timeout: Seconds to keep polling an empty queue (0 returns at once)
+        poll: Seconds between polls of an empty queue
+
+    Returns:
+        Number of units completed by this worker
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    specs: Dict[str, Dict[str, Any]] = {}
+    completed = 0
+    idle_since = time.monotonic()
+
+    while True:
+        claimed = queue.claim(worker_id, run_id)
+        if claimed is None:
+            if time.monotonic() - idle_since >= idle_timeout:
+                return completed
+            time.sleep(poll)
+            continue
+
+        unit_run, unit_id, unit = claimed
+        if unit_run not in specs:
+            specs[unit_run] = queue.run_spec(unit_run)
+        spec = specs[unit_run]
+        form_id = unit['form_id']
+        started = time.perf_counter()
+        try:
+            parameters = unit_parameters(spec, unit)
+            df = load(form_id, parameters, spec['variables'])
+            df = FilterPlan.from_parameters(parameters, date_column='submission_date').apply(df, ignore_missing=True)
+            masks = applicability(form_id, df) if applicability is not None and not df.empty else None
+            partial = partial_aggregates(df, spec['variables'], spec['now'], masks)
+            partial.update({'form_id': form_id, 'unit_id': unit_id, 'worker': worker_id})
+            if queue.complete(unit_run, unit_id, worker_id, partial):
+                completed += 1
+            logger.info(
+                f"Unit {unit_run}/{unit_id} ({form_id}): {partial['rows']} rows "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            logger.error(f"Unit {unit_run}/{unit_id} ({form_id}) failed: {e}")
+            queue.fail(unit_run, unit_id, worker_id, str(e))
+        idle_since = time.monotonic()
+
+
+def finish_run(queue: JobQueue, run_id: str, work: Callable[[], int],
+               dead_workers: Optional[Callable[[], List[str]]] = None,
+               timeout: Optional[float] = DEFAULT_RUN_TIMEOUT, poll: float = 1.0) -> Dict[str, int]:
+    """
+    Keep working on a run until none of its units is pending or running.
+
+    ``work`` claims and processes units until nothing is claimable (e.g. ``run_worker``
+    with ``run_id``). Between passes the leases of ``dead_workers()`` are expired so
+    their units are claimed again at once; units of workers lost elsewhere are claimed
+    again when their lease runs out, and given up on after ``max_attempts``.
+
+    Args:
+        queue: The job queue
+        run_id: The run to finish
+        work: One pass of claiming and processing units of the run
+        dead_workers: Worker IDs known to have died (e.g. local processes that exited)
+        timeout: Seconds before giving up (None waits as long as units remain)
+        poll: Seconds between passes while other workers hold the remaining units
+
+    Returns:
+        The final progress counts
+
+    Raises:
+        TimeoutError: When ``timeout`` seconds pass first
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        work()
+        for worker_id in (dead_workers() if dead_workers is not None else []):
+            released = queue.expire_leases(run_id, worker_id)
+            if released:
+                logger.warning(f"Run {run_id}: worker {worker_id} died; released {released} units")
+        progress = queue.progress(run_id)
+        if progress['pending'] == 0 and progress['running'] == 0:
+            return progress
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Run {run_id} not finished after {timeout}s: {progress}")
+        time.sleep(poll)
+
+
+def _merge_counts(target: Dict[str, int], counts: Dict[str, int]):
+    for key, count in counts.items():
+        target[key] = target.get(key, 0) + count
+
+
+def _numeric_summary(moments: MomentSketch, quantiles: QuantileSketch) -> Dict[str, Any]:
+    """Same fields as ``describe()`` plus skewness and kurtosis; quartiles are sketch estimates."""
+    def rounded(value: Optional[float], digits: int) -> Optional[float]:
+        return round(value, digits) if value is not None else np.nan
+
+    return {
+        'count': int(moments.count),
+        'mean': rounded(moments.mean if moments.count else None, 2),
+        'std': rounded(moments.std, 2),
+        'min': rounded(moments.min if moments.count else None, 2),
+        '25%': rounded(quantiles.quantile(0.25), 2),
+        '50%': rounded(quantiles.quantile(0.5), 2),
+        '75%': rounded(quantiles.quantile(0.75), 2),
+        'max': rounded(moments.max if moments.count else None, 2),
+        'skewness': rounded(moments.skewness, 3),
+        'kurtosis': rounded(moments.kurtosis, 3)
+    }
+
+
+def temporal_summary(daily_counts: pd.Series, recent: Dict[int, int], start: str, end: str) -> Dict[str, Any]:
+    """
+    Temporal analysis entry of one form from aggregated counts.
+
+    Args:
+        daily_counts: Submissions per ``datetime.date``, in date order
+        recent: Submissions within the last N days, per N in RECENT_DAYS
+        start: ISO timestamp of the first submission
+        end: ISO timestamp of the last submission
+
+    Returns:
+        The ``temporal_analysis`` entry (daily, weekly and monthly counts, recent activity, stats)
+    """
+    index = pd.DatetimeIndex(daily_counts.index)
+    iso = index.isocalendar()
+    weekly = daily_counts.groupby([iso['year'].to_numpy(), iso['week'].to_numpy()]).sum()
+    monthly = daily_counts.groupby([index.year, index.month]).sum()
+    return {
+        'daily_submissions': daily_counts.to_dict(),
+        'weekly_trends': {key: int(value) for key, value in weekly.items()},
+        'monthly_trends': {key: int(value) for key, value in monthly.items()},
+        'recent_activity': {f'last_{days_back}_days': int(recent.get(days_back, 0)) for days_back in RECENT_DAYS},
+        'submission_stats': {
+            'total_submissions': int(daily_counts.sum()),
+            'date_range': {'start': start, 'end': end},
+            'avg_daily_submissions': round(daily_counts.mean(), 2),
+            'peak_day': daily_counts.idxmax().isoformat() if not daily_counts.empty else None
+        }
+    }
+
+
+def reduce_partials(spec: Dict[str, Any], partials: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge unit partials into the standard results dict.
+
+    Args:
+        spec: The run spec (variables, form_ids)
+        partials: Partial aggregates of the completed units
+
+    Returns:
+        Results with metadata, data_completeness, temporal_analysis and statistical_summaries
+    """
+    variables = spec['variables']
+    forms: Dict[str, Dict[str, Any]] = {}
+    for partial in partials:
+        form = forms.setdefault(partial['form_id'], {
+            'rows': 0, 'completeness': {}, 'numeric': {}, 'categorical': {},
+            'daily': {}, 'recent': {}, 'start': None, 'end': None
+        })
+        form['rows'] += partial['rows']
+        for var, counts in partial['completeness'].items():
+            form['completeness'][var] = [a + b for a, b in zip(form['completeness'].get(var, [0, 0, 0]), counts)]
+        for var, sketches in partial['numeric'].items():
+            if var not in form['numeric']:
+                form['numeric'][var] = (MomentSketch(), QuantileSketch(sketches['quantiles']['relative_accuracy']))
+            moments, quantiles = form['numeric'][var]
+            moments.merge(MomentSketch.from_dict(sketches['moments']))
+            quantiles.merge(QuantileSketch.from_dict(sketches['quantiles']))
+        for var, sketch in partial['categorical'].items():
+            sketch = CategoricalSketch.from_dict(sketch)
+            form['categorical'][var] = form['categorical'][var].merge(sketch) if var in form['categorical'] else sketch
+        temporal = partial.get('temporal')
+        if temporal:
+            _merge_counts(form['daily'], temporal['daily'])
+            _merge_counts(form['recent'], temporal['recent'])
+            form['start'] = min(filter(None, [form['start'], temporal['start']]), key=pd.Timestamp)
+            form['end'] = max(filter(None, [form['end'], temporal['end']]), key=pd.Timestamp)
+
+    # Forms without rows are skipped, as when loading them directly
+    form_ids = [form_id for form_id in spec.get('form_ids', forms) if forms.get(form_id, {}).get('rows')]
+    results = {
+        'timestamp': datetime.now().isoformat(),
+        'indicators': {},
+        'metadata': {
+            'forms_processed': form_ids,
+            'variables_used': variables,
+            'total_records': sum(forms[form_id]['rows'] for form_id in form_ids)
+        }
+    }
+
+    try:
+        completeness = {}
+        for form_id in form_ids:
+            form_completeness = {}
+            for var in variables:
+                if var not in forms[form_id]['completeness']:
+                    continue
+                total_count, applicable_count, non_null_count = forms[form_id]['completeness'][var]
+                form_completeness[var] = {
+                    'completeness_rate': round((non_null_count / applicable_count) * 100 if applicable_count > 0 else 0, 2),
+                    'non_null_count': non_null_count,
+                    'total_count': total_count,
+                    'applicable_count': applicable_count,
+                    'skipped_count': total_count - applicable_count,
+                    'missing_count': applicable_count - non_null_count
+                }
+            completeness[form_id] = form_completeness
+        overall_completeness = {}
+        for var in variables:
+            rates = [completeness[form_id][var]['completeness_rate'] for form_id in form_ids
+                     if var in completeness[form_id]]
+            if rates:
+                overall_completeness[var] = {
+                    'mean_completeness': round(np.mean(rates), 2),
+                    'min_completeness': round(min(rates), 2),
+                    'max_completeness': round(max(rates), 2),
+                    'std_completeness': round(np.std(rates), 2)
+                }
+        completeness['overall'] = overall_completeness
+        results['indicators']['data_completeness'] = completeness
+
+        results['indicators']['temporal_analysis'] = {
+            form_id: temporal_summary(
+                pd.Series({date.fromisoformat(day): count for day, count in sorted(forms[form_id]['daily'].items())}),
+                {int(days_back): count for days_back, count in forms[form_id]['recent'].items()},
+                forms[form_id]['start'], forms[form_id]['end']
+            )
+            for form_id in form_ids if forms[form_id]['daily']
+        }
+
+        summaries = {}
+        for form_id in form_ids:
+            form_summaries = {}
+            for var in variables:
+                # A variable sketched as categorical in any unit stays categorical
+                if var in forms[form_id]['categorical']:
+                    form_summaries[var] = forms[form_id]['categorical'][var].summary()
+                elif var in forms[form_id]['numeric']:
+                    form_summaries[var] = _numeric_summary(*forms[form_id]['numeric'][var])
+            summaries[form_id] = form_summaries
+        overall = {}
+        for var in variables:
+            sketches = [forms[form_id]['categorical'][var] for form_id in form_ids
+                        if var in forms[form_id]['categorical']]
+            if len(sketches) >= 2:
+                merged = CategoricalSketch.from_dict(sketches[0].to_dict())
+                for sketch in sketches[1:]:
+                    merged.merge(sketch)
+                overall[var] = merged.summary()
+        if overall:
+            summaries['overall'] = overall
+        results['indicators']['statistical_summaries'] = summaries
+
+    except Exception as e:
+        logger.error(f"Error reducing sharded results: {e}")
+        results['error'] = str(e)
+
+    return results
+
+
+def reduce_run(queue: JobQueue, run_id: str) -> Dict[str, Any]:
+    """
+    Merge the completed units of a run into the standard results dict.
+
+    Failed units are listed under ``metadata.sharding.failed_units`` and reported in ``error``.
+    """
+    spec = queue.run_spec(run_id)
+    units = queue.units(run_id)
+    results = reduce_partials(spec, queue.results(run_id))
+    failed = [
+        {key: unit.get(key) for key in ('unit_id', 'form_id', 'start', 'end', 'attempts', 'error')}
+        for unit in units if unit['status'] == 'failed'
+    ]
+    results['metadata']['sharding'] = {
+        'run_id': run_id,
+        'units': len(units),
+        'completed_units': sum(unit['status'] == 'done' for unit in units),
+        'workers': sorted({unit['worker'] for unit in units if unit['status'] == 'done'}),
+        'failed_units': failed
+    }
+    if failed:
+        logger.warning(f"Run {run_id}: {len(failed)} of {len(units)} units failed")
+        results.setdefault('error', f"{len(failed)} of {len(units)} work units failed")
+    return results
+
+
+def submit_run(queue: JobQueue, form_ids: List[str], variables: List[str],
+               parameters: Optional[Dict[str, Any]] = None, shard_days: Optional[int] = None,
+               form_bounds: Optional[Dict[str, Tuple[Any, Any]]] = None) -> str:
+    """
+    Plan a run and enqueue its units.
+
+    Args:
+        queue: The job queue
+        form_ids: Forms to analyse
+        variables: Variables to analyse
+        parameters: Execute parameters (dateRange, filters, dedup)
+        shard_days: Split each form into windows of this many days (needs a bounded range)
+        form_bounds: Per-form (start, end) of the submissions, see ``plan_units``
+
+    Returns:
+        The run ID
+    """
+    now = time.time()
+    units = plan_units(form_ids, parameters, shard_days, now, form_bounds)
+    spec = {'form_ids': form_ids, 'variables': variables, 'parameters': parameters or {}, 'now': now}
+    run_id = queue.create_run(spec, units)
+    logger.info(f"Run {run_id}: {len(units)} units for {len(form_ids)} forms")
+    return run_id
+
+
+def main():
+    """Submit a sharded run, work on queued units, or reduce a finished run."""
+    parser = argparse.ArgumentParser(description='Sharded multi-form indicator execution')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    submit = subcommands.add_parser('submit', help='Plan a run and enqueue its units')
+    submit.add_argument('--form-ids', required=True, help='Comma-separated list of form IDs')
+    submit.add_argument('--variables', required=True, help='Comma-separated list of variables to analyze')
+    submit.add_argument('--parameters', help='JSON execute parameters, e.g. \'{"dateRange": "last_365_days"}\'')
+    submit.add_argument('--shard-days', type=int, help='Split forms into windows of this many days')
+
+    worker = subcommands.add_parser('worker', help='Process queued units')
+    worker.add_argument('--api-url', required=True, help='Base URL for the API')
+    worker.add_argument('--auth-token', required=True, help='Authentication token')
+    worker.add_argument('--run-id', help='Only process units of this run')
+    worker.add_argument('--worker-id', help='Worker name (default: host:pid)')
+    worker.add_argument('--idle-timeout', type=float, default=0.0, help='Seconds to wait for new units')
+
+    reduce = subcommands.add_parser('reduce', help='Merge a run into the standard report')
+    reduce.add_argument('--run-id', required=True, help='Run to reduce')
+    reduce.add_argument('--wait', type=float, help='Seconds to wait for unfinished units')
+    reduce.add_argument('--output', help='Output file for the report')
+
+    for subcommand in (submit, worker, reduce):
+        subcommand.add_argument('--queue', required=True, help='SQLite job queue file')
+        subcommand.add_argument('--no-wal', action='store_true', help='Disable WAL (network filesystems)')
+
+    args = parser.parse_args()
+
+    # Importing here keeps this module usable without the processor's logging setup
+    from multi_form_indicator_script import MultiFormIndicatorProcessor
+
+    queue = JobQueue(args.queue, wal=not args.no_wal)
+
+    if args.command == 'submit':
+        run_id = submit_run(
+            queue,
+            [form_id.strip() for form_id in args.form_ids.split(',')],
+            [var.strip() for var in args.variables.split(',')],
+            json.loads(args.parameters) if args.parameters else None,
+            args.shard_days
+        )
+        print(run_id)
+    elif args.command == 'worker':
+        processor = MultiFormIndicatorProcessor(args.api_url, args.auth_token)
+        completed = processor.run_shard_worker(queue, args.run_id, args.worker_id, args.idle_timeout)
+        logger.info(f"Worker finished after {completed} units")
+    else:
+        if args.wait is not None:
+            queue.wait(args.run_id, timeout=args.wait)
+        results = reduce_run(queue, args.run_id)
+        report = MultiFormIndicatorProcessor('', '').generate_report(results, args.output)
+        if not args.output:
+            print(report)
+        if results.get('error'):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Coalescing
+========================
+
+Concurrent calls for the same key share one in-flight computation: the first
+caller (the leader) runs it, every caller arriving while it runs waits for and
+receives the leader's result (or exception). Successful results stay fresh for
+a short window so callers arriving just after the leader finished reuse them
+as well.
+
+This removes the thundering herd when many scheduled indicators ask for the
+same form at the same moment. It is thread based; asyncio callers can run the
+blocking fetches through ``asyncio.to_thread`` and still share requests.
+
+Usage:
+    flight = SingleFlight(ttl=5.0)
+    data = flight.do(('submissions', form_id), lambda: fetch(form_id))
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+def _non_empty(value: Any) -> bool:
+    """Default reuse predicate: keep results that are not None or empty (lists, dicts, DataFrames)."""
+    if value is None:
+        return False
+    try:
+        return len(value) > 0
+    except TypeError:
+        return True
+
+
+class _Call:
+    """An in-flight computation that followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Per-key request coalescing with a freshness window.
+    """
+
+    def __init__(self, ttl: float = 5.0, cache_if: Callable[[Any], bool] = _non_empty):
+        """
+        Initialize the coalescer.
+
+        Args:
+            ttl: Seconds a successful result stays fresh (0 disables reuse after completion)
+            cache_if: Predicate deciding whether a result may be reused (empty results are
+                usually failed fetches and are not kept by default)
+        """
+        self.ttl = ttl
+        self.cache_if = cache_if
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self.stats = {'executed': 0, 'coalesced': 0, 'fresh_hits': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Return ``fn()`` for ``key``, sharing the call with concurrent callers.
+
+        Args:
+            key: Identity of the request
+            fn: Function performing the request
+
+        Returns:
+            The (shared) result
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                if time.monotonic() - cached[0] <= self.ttl:
+                    self.stats['fresh_hits'] += 1
+                    return cached[1]
+                del self._results[key]
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['executed'] += 1
+            else:
+                call.followers += 1
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None and self.ttl > 0 and self.cache_if(call.value):
+                    now = time.monotonic()
+                    for stale in [k for k, (stored, _) in self._results.items() if now - stored > self.ttl]:
+                        del self._results[stale]
+                    self._results[key] = (now, call.value)
+            call.done.set()
+        return call.value
+
+    def forget(self, key: Optional[Hashable] = None):
+        """Drop the fresh result for ``key`` (or all results)."""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+"""
+Mergeable Sketches
+==================
+
+Small, mergeable summaries used by the streaming indicators. Sketches built
+over different chunks, connections, forms or time windows can be merged into
+one without going back to the raw rows.
+
+- QuantileSketch: relative-error quantiles (p50/p95/p99) using logarithmic
+  buckets; any quantile is within ``relative_accuracy`` of the true value.
+- MomentSketch: count, mean, std, skewness and kurtosis from exactly
+  mergeable central moments.
+- HyperLogLog: distinct counts with a relative standard error of
+  ``1.04 / sqrt(2 ** precision)`` in a fixed ``2 ** precision`` bytes.
+- SpaceSaving: top-k heavy hitters with per-item overestimation bounds.
+- CategoricalSketch: both of the above plus value and missing counts, the
+  mergeable replacement for ``value_counts()`` in categorical summaries.
+- SketchStore: categorical sketches per (form, variable, month) persisted
+  as JSON and updated with new submissions only; cross-form and
+  multi-period summaries are merges of the stored sketches.
+"""
+
+import base64
+import json
+import math
+import os
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ingest_log import IngestLog, row_keys
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch with a relative accuracy guarantee.
+
+    Positive and negative values are bucketed by magnitude separately; exact
+    zeros are counted on their own.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.negative_buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return int(math.ceil(math.log(value) / self._log_gamma))
+
+    def add(self, value: float, count: int = 1):
+        """Add a value."""
+        if value is None or value != value:
+            return
+        if value == 0:
+            self.zero_count += count
+        else:
+            buckets = self.buckets if value > 0 else self.negative_buckets
+            key = self._key(abs(value))
+            buckets[key] = buckets.get(key, 0) + count
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def add_many(self, values: np.ndarray):
+        """Add an array of values in one vectorized step."""
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        self.zero_count += int(np.count_nonzero(values == 0))
+        for buckets, magnitudes in ((self.buckets, values[values > 0]), (self.negative_buckets, -values[values < 0])):
+            if len(magnitudes):
+                keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64), return_counts=True)
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    buckets[key] = buckets.get(key, 0) + count
+        self.count += int(len(values))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Merge another sketch (with the same accuracy) into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge quantile sketches with different relative accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        for key, count in other.negative_buckets.items():
+            self.negative_buckets[key] = self.negative_buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile ``q`` (0..1), or None for an empty sketch."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+
+        # Walk the buckets in value order: negatives (largest magnitude first), zeros, positives
+        ordered = [(-1, key, self.negative_buckets[key]) for key in sorted(self.negative_buckets, reverse=True)]
+        ordered.append((0, 0, self.zero_count))
+        ordered.extend((1, key, self.buckets[key]) for key in sorted(self.buckets))
+        seen = 0
+        for sign, key, count in ordered:
+            seen += count
+            if seen > rank:
+                if sign == 0:
+                    return 0.0
+                # Bucket midpoint in the relative sense, clamped to the observed range
+                value = sign * 2 * self.gamma ** key / (1 + self.gamma)
+                return float(min(max(value, self.min), self.max))
+        return float(self.max)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'buckets': {str(key): count for key, count in self.buckets.items()},
+            'negative_buckets': {str(key): count for key, count in self.negative_buckets.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.buckets = {int(key): count for key, count in data['buckets'].items()}
+        sketch.negative_buckets = {int(key): count for key, count in data.get('negative_buckets', {}).items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+class MomentSketch:
+    """
+    Count, mean, central moments (up to the fourth), min and max of a numeric
+    variable, merged exactly with the pairwise update formulas of Pebay (2008).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add_many(self, values: np.ndarray):
+        """Add an array of values (non-finite values are ignored)."""
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        other = MomentSketch()
+        other.count = int(len(values))
+        other.mean = float(values.mean())
+        deviations = values - other.mean
+        squared = deviations * deviations
+        other.m2 = float(squared.sum())
+        other.m3 = float((squared * deviations).sum())
+        other.m4 = float((squared * squared).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: 'MomentSketch') -> 'MomentSketch':
+        """Merge another sketch into this one."""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.m3, self.m4 = other.count, other.mean, other.m2, other.m3, other.m4
+            self.min, self.max = other.min, other.max
+            return self
+        n_a, n_b = self.count, other.count
+        n = n_a + n_b
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        m4 = (self.m4 + other.m4
+              + delta ** 4 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b) / n ** 3
+              + 6 * delta_n ** 2 * (n_a * n_a * other.m2 + n_b * n_b * self.m2)
+              + 4 * delta_n * (n_a * other.m3 - n_b * self.m3))
+        m3 = (self.m3 + other.m3
+              + delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2
+              + 3 * delta_n * (n_a * other.m2 - n_b * self.m2))
+        self.m2 = self.m2 + other.m2 + delta * delta_n * n_a * n_b
+        self.m3, self.m4 = m3, m4
+        self.mean += delta_n * n_b
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance (ddof=1, like pandas)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def std(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(max(variance, 0.0)) if variance is not None else None
+
+    @property
+    def skewness(self) -> Optional[float]:
+        """Bias-corrected sample skewness (same estimator as ``Series.skew``)."""
+        n = self.count
+        if n < 3 or self.m2 <= 0:
+            return None
+        g1 = math.sqrt(n) * self.m3 / self.m2 ** 1.5
+        return g1 * math.sqrt(n * (n - 1)) / (n - 2)
+
+    @property
+    def kurtosis(self) -> Optional[float]:
+        """Bias-corrected excess kurtosis (same estimator as ``Series.kurt``)."""
+        n = self.count
+        if n < 4 or self.m2 <= 0:
+            return None
+        g2 = n * self.m4 / (self.m2 * self.m2) - 3
+        return (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * g2 + 6)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'm3': self.m3,
+            'm4': self.m4,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MomentSketch':
+        sketch = cls()
+        sketch.count = data['count']
+        sketch.mean, sketch.m2, sketch.m3, sketch.m4 = data['mean'], data['m2'], data['m3'], data['m4']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+def _leading_zeros(values: np.ndarray) -> np.ndarray:
+    """Leading zero bits of each uint64 (64 for zero), by a vectorized binary search."""
+    values = values.copy()
+    zeros = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (values >> np.uint64(64 - shift)) == 0
+        zeros += empty * shift
+        values = np.where(empty, values << np.uint64(shift), values)
+    return zeros + (values == 0)
+
+
+def value_hashes(values: Iterable[Any]) -> np.ndarray:
+    """Stable 64-bit hashes of the string form of each value (same label, same hash, in any process)."""
+    labels = pd.Series(list(values), dtype=object)
+    if pd.api.types.infer_dtype(labels, skipna=True) != 'string':
+        labels = labels.map(str)
+    return pd.util.hash_array(labels.to_numpy(), categorize=False)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch over 64-bit hashes.
+    """
+
+    def __init__(self, precision: int = 12):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            precision: Index bits; the sketch uses ``2 ** precision`` one-byte registers
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of ``count()``."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Add an array of uint64 hashes in one vectorized step."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        rank = np.minimum(_leading_zeros(hashes << np.uint64(self.precision)) + 1, 64 - self.precision + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def add(self, values: Iterable[Any]):
+        """Add values (hashed with ``value_hashes``)."""
+        self.add_hashes(value_hashes(values))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Merge another sketch (with the same precision) into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        """Estimated number of distinct values (linear counting for small cardinalities)."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and empty:
+            estimate = m * math.log(m / empty)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'precision': self.precision,
+            'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HyperLogLog':
+        sketch = cls(data['precision'])
+        sketch.registers = np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8).copy()
+        return sketch
+
+
+def _plain(value: Any) -> Any:
+    """JSON-friendly item key (numpy scalars unwrapped, list answers as tuples)."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k summary, mergeable (parallel Space-Saving).
+
+    Each monitored item has an upper-bound ``count`` and the ``error`` by which
+    it may be overestimated; ``floor`` bounds the count of any item that is
+    not monitored. Exact while fewer than ``capacity`` distinct items were seen.
+    """
+
+    def __init__(self, capacity: int = 50):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+        self.floor = 0
+        self.total = 0
+
+    def _truncate(self, counts: Dict[Any, int], errors: Dict[Any, int], floor: int):
+        """Keep the ``capacity`` largest counters; dropped counts raise the floor."""
+        if len(counts) > self.capacity:
+            ranked = sorted(counts, key=counts.get, reverse=True)
+            floor = max(floor, counts[ranked[self.capacity]])
+            counts = {item: counts[item] for item in ranked[:self.capacity]}
+            errors = {item: errors[item] for item in counts}
+        self.counts, self.errors, self.floor = counts, errors, floor
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """
+        Merge another summary into this one.
+
+        An item missing from one side is assumed to have that side's ``floor``
+        count (its upper bound), which keeps every count an upper bound.
+        """
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, self.floor) + other.counts.get(item, other.floor)
+            errors[item] = self.errors.get(item, self.floor) + other.errors.get(item, other.floor)
+        self.total += other.total
+        self._truncate(counts, errors, self.floor + other.floor)
+        return self
+
+    def add_counts(self, values: List[Any], counts: np.ndarray):
+        """Add exact per-value counts of a batch (e.g. one chunk's ``value_counts``)."""
+        counts = np.asarray(counts, dtype=np.int64)
+        nonzero = np.flatnonzero(counts)
+        batch = SpaceSaving(self.capacity)
+        batch.total = int(counts[nonzero].sum())
+        if len(nonzero) > self.capacity:
+            # Only the batch's top ``capacity`` values become counters
+            order = nonzero[np.argpartition(-counts[nonzero], self.capacity)]
+            nonzero, batch.floor = order[:self.capacity], int(counts[order[self.capacity:]].max())
+        batch.counts = {_plain(values[i]): int(counts[i]) for i in nonzero.tolist()}
+        batch.errors = dict.fromkeys(batch.counts, 0)
+        self.merge(batch)
+
+    def add(self, value: Any, count: int = 1):
+        self.add_counts([value], np.array([count]))
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Any, int, int]]:
+        """(item, count, error) of the ``n`` most frequent items, largest first."""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return [(item, count, self.errors[item]) for item, count in ranked[:n]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'floor': self.floor,
+            'items': [[item, count, error] for item, count, error in self.top()]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SpaceSaving':
+        summary = cls(data['capacity'])
+        summary.total = data['total']
+        summary.floor = data['floor']
+        for item, count, error in data['items']:
+            item = _plain(item)
+            summary.counts[item] = count
+            summary.errors[item] = error
+        return summary
+
+
+def _factorize(values: pd.Series) -> Tuple[np.ndarray, List[Any]]:
+    """Codes (-1 for missing) and distinct values; list answers become tuples."""
+    try:
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    except TypeError:
+        values = values.map(lambda v: tuple(v) if isinstance(v, list) else v)
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes, list(uniques)
+
+
+class CategoricalSketch:
+    """
+    Mergeable summary of a categorical column: distinct count, top values and missing count.
+    """
+
+    def __init__(self, precision: int = 12, capacity: int = 50):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            precision: HyperLogLog precision of the distinct count
+            capacity: Items monitored by the top-k summary
+        """
+        self.distinct = HyperLogLog(precision)
+        self.heavy_hitters = SpaceSaving(capacity)
+        self.count = 0
+        self.missing = 0
+
+    def add_counts(self, values: List[Any], hashes: np.ndarray, counts: np.ndarray, missing: int = 0):
+        """Add per-value counts of a batch whose distinct ``values`` were hashed with ``value_hashes``."""
+        present = np.asarray(counts) > 0
+        self.distinct.add_hashes(np.asarray(hashes)[present])
+        self.heavy_hitters.add_counts(values, counts)
+        self.count += int(np.sum(counts))
+        self.missing += int(missing)
+
+    def update(self, values: pd.Series, weights: Optional[np.ndarray] = None) -> 'CategoricalSketch':
+        """
+        Add a column, hashing and counting each distinct value once.
+
+        Args:
+            values: The column
+            weights: Optional row weights (counts become rounded weight sums)
+
+        Returns:
+            The sketch itself
+        """
+        codes, uniques = _factorize(values)
+        present = codes >= 0
+        weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        counts = np.bincount(codes[present], weights=None if weights is None else weights[present],
+                             minlength=len(uniques))
+        missing = np.count_nonzero(~present) if weights is None else weights[~present].sum()
+        self.add_counts(uniques, value_hashes(uniques), np.rint(counts).astype(np.int64), int(round(missing)))
+        return self
+
+    def merge(self, other: 'CategoricalSketch') -> 'CategoricalSketch':
+        self.distinct.merge(other.distinct)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.count += other.count
+        self.missing += other.missing
+        return self
+
+    def unique_values(self) -> int:
+        """Distinct values: exact while the top-k summary holds every value, estimated otherwise."""
+        if self.heavy_hitters.floor == 0:
+            return len(self.heavy_hitters.counts)
+        return max(self.distinct.count(), len(self.heavy_hitters.counts))
+
+    def summary(self, top: int = 5) -> Dict[str, Any]:
+        """Categorical summary in the ``value_counts()`` based format."""
+        exact = self.heavy_hitters.floor == 0
+        summary = {
+            'type': 'categorical',
+            'unique_values': self.unique_values(),
+            'most_common': {item: count for item, count, _ in self.heavy_hitters.top(top)},
+            'missing_count': self.missing
+        }
+        if not exact:
+            summary['unique_values_relative_error'] = round(self.distinct.relative_error, 4)
+            summary['most_common_max_error'] = {item: error for item, _, error in self.heavy_hitters.top(top)}
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'distinct': self.distinct.to_dict(),
+            'heavy_hitters': self.heavy_hitters.to_dict(),
+            'count': self.count,
+            'missing': self.missing
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CategoricalSketch':
+        sketch = cls()
+        sketch.distinct = HyperLogLog.from_dict(data['distinct'])
+        sketch.heavy_hitters = SpaceSaving.from_dict(data['heavy_hitters'])
+        sketch.count = data['count']
+        sketch.missing = data['missing']
+        return sketch
+
+
+def _month_keys(data: pd.DataFrame, date_column: Optional[str]) -> Tuple[np.ndarray, List[str]]:
+    """Month code per row and the 'YYYY-MM' labels ('all' without a date column, 'NaT' for missing dates)."""
+    if not date_column or date_column not in data.columns:
+        return np.zeros(len(data), dtype=np.int64), ['all']
+    dates = pd.to_datetime(data[date_column])
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    codes, uniques = pd.factorize(dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]'), use_na_sentinel=False)
+    return codes, [str(month) for month in uniques]
+
+
+class SketchStore:
+    """
+    Categorical sketches per (form, variable, month), persisted as one JSON file.
+
+    Each form keeps an ingest log of the submissions folded in (by ``_id``, or by
+    content when the frame has no ID column), so passing the form's whole frame
+    again only adds the submissions not seen before, including late-synced ones
+    with old dates. A variable sketched for the first time is folded in from the
+    whole frame.
+    """
+
+    def __init__(self, path: Optional[str] = None, precision: int = 12, capacity: int = 50,
+                 date_column: Optional[str] = 'submission_date'):
+        """
+        Args:
+            path: JSON file to persist to (None keeps the store in memory)
+            precision: HyperLogLog precision of new sketches
+            capacity: Top-k capacity of new sketches
+            date_column: Date column the month periods come from
+        """
+        self.path = path
+        self.precision = precision
+        self.capacity = capacity
+        self.date_column = date_column
+        self.sketches: Dict[Tuple[str, str, str], CategoricalSketch] = {}
+        self.ingested: Dict[str, IngestLog] = {}
+        self.variables: Dict[str, set] = {}
+
+    def update(self, form_id: str, df: pd.DataFrame, variables: Iterable[str],
+               weights: Optional[np.ndarray] = None) -> 'SketchStore':
+        """
+        Fold a form's new submissions into its per-month sketches.
+
+        Each column is factorized and hashed once; per-month counts come from one
+        ``bincount`` over (month, value) codes.
+
+        Args:
+            form_id: The form ID
+            df: The form's normalized DataFrame (submissions already folded in are skipped)
+            variables: Categorical variables to sketch
+            weights: Optional row weights (e.g. sampling weights)
+
+        Returns:
+            The store itself
+        """
+        variables = [variable for variable in variables if variable in df.columns]
+        if not variables or len(df) == 0:
+            return self
+        # The date is left out of content keys: it may be stamped at load time
+        keys = row_keys(df, ignore=[self.date_column] if self.date_column else ())
+        new = self.ingested.setdefault(form_id, IngestLog()).claim(keys)
+        tracked = self.variables.setdefault(form_id, set())
+        for variable in variables:
+            rows = new if variable in tracked else ~pd.Series(keys).duplicated().to_numpy()
+            tracked.add(variable)
+            if not rows.any():
+                continue
+            frame = df[rows] if not rows.all() else df
+            row_weights = None if weights is None else np.asarray(weights, dtype=np.float64)[rows]
+
+            codes, uniques = _factorize(frame[variable])
+            months, labels = _month_keys(frame, self.date_column)
+            hashes = value_hashes(uniques)
+            present = codes >= 0
+            cells = months[present] * len(uniques) + codes[present]
+            counts = np.bincount(cells, weights=None if row_weights is None else row_weights[present],
+                                 minlength=len(labels) * len(uniques)).reshape(len(labels), len(uniques))
+            missing = np.bincount(months[~present], weights=None if row_weights is None else row_weights[~present],
+                                  minlength=len(labels))
+            for position, label in enumerate(labels):
+                if not counts[position].any() and not missing[position]:
+                    continue
+                key = (form_id, variable, label)
+                sketch = self.sketches.get(key)
+                if sketch is None:
+                    sketch = self.sketches[key] = CategoricalSketch(self.precision, self.capacity)
+                sketch.add_counts(uniques, hashes, np.rint(counts[position]).astype(np.int64),
+                                  int(round(missing[position])))
+        return self
+
+    def periods(self, form_id: str, variable: str) -> List[str]:
+        return sorted(label for form, name, label in self.sketches if form == form_id and name == variable)
+
+    def merged(self, form_ids: Iterable[str], variable: str,
+               periods: Optional[Iterable[str]] = None) -> Optional[CategoricalSketch]:
+        """
+        Merge the sketches of ``variable`` over forms and months.
+
+        Args:
+            form_ids: Forms to combine
+            variable: The variable
+            periods: 'YYYY-MM' months to combine (defaults to all stored months)
+
+        Returns:
+            The merged sketch, or None when nothing is stored for them
+        """
+        form_ids = set(form_ids)
+        periods = set(periods) if periods is not None else None
+        merged = None
+        for (form_id, name, label), sketch in self.sketches.items():
+            if name != variable or form_id not in form_ids or (periods is not None and label not in periods):
+                continue
+            if merged is None:
+                merged = CategoricalSketch(sketch.distinct.precision, sketch.heavy_hitters.capacity)
+            merged.merge(sketch)
+        return merged
+
+    def save(self, path: Optional[str] = None):
+        """Write the store as JSON (atomically)."""
+        path = path or self.path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stored = {
+            'precision': self.precision,
+            'capacity': self.capacity,
+            'date_column': self.date_column,
+            'ingested': [[form_id, log.encode(), sorted(self.variables.get(form_id, ()))]
+                         for form_id, log in self.ingested.items()],
+            'sketches': [[form_id, variable, label, sketch.to_dict()]
+                         for (form_id, variable, label), sketch in self.sketches.items()]
+        }
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(stored, f, default=str)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'SketchStore':
+        """Load a store written with ``save`` (an empty store bound to ``path`` when the file is missing)."""
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            stored = json.load(f)
+        store = cls(path, stored['precision'], stored['capacity'], stored['date_column'])
+        for form_id, log, variables in stored.get('ingested', []):
+            store.ingested[form_id] = IngestLog.decode(log)
+            store.variables[form_id] = set(variables)
+        store.sketches = {
+            (form_id, variable, label): CategoricalSketch.from_dict(sketch)
+            for form_id, variable, label, sketch in stored['sketches']
+        }
+        return store
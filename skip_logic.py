@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Skip-Logic Compiler
+===================
+
+Compiles the ``skipLogic`` rules of a form structure into vectorized
+applicability masks over a normalized submissions DataFrame, so indicators can
+tell a legitimately skipped question from a missing answer.
+
+Rules follow the conditional-rule editor: a rule has ``conditions`` (each with
+``targetField``, ``operator`` and ``value``/``checkboxValue``), a
+``matchType`` of ``all``/``any`` and ``actions``. ``Show`` actions make their
+target field applicable only where the rule matches, ``Hide`` actions make it
+not applicable there. A rule without show/hide actions applies to the field it
+is attached to (the field is shown when the rule matches).
+
+Each condition column is dictionary-encoded once; operators are evaluated over
+the distinct values only and broadcast back to the rows through the codes, so
+thousands of conditions over millions of rows never evaluate per row in Python.
+
+Usage:
+    program = SkipLogicProgram.compile(form_structure)
+    masks = program.applicability(df)     # {field: boolean ndarray}
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+PRESENT_OPERATORS = {
+    'is present', 'has option selected', 'has file selected', 'is checked', 'has been submitted'
+}
+BLANK_OPERATORS = {
+    'is blank', 'has no option selected', 'has no file selected', 'is not checked'
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _field_name(field: Dict[str, Any]) -> str:
+    return field.get('name', field.get('label', ''))
+
+
+def _field_id(field: Dict[str, Any]) -> Optional[str]:
+    field_id = field.get('_id') or field.get('id')
+    if isinstance(field_id, dict):
+        field_id = field_id.get('$oid')
+    return field_id
+
+
+def _is_blank(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, (str, tuple, list)):
+        return len(value) == 0
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _equals(value: Any, expected: str) -> bool:
+    if isinstance(value, tuple):
+        return expected in (_as_text(item) for item in value)
+    return _as_text(value) == expected
+
+
+def _contains(value: Any, expected: str) -> bool:
+    if isinstance(value, tuple):
+        return any(expected in _as_text(item) for item in value)
+    return expected in _as_text(value)
+
+
+def _predicate(operator: str, value: Any, checkbox_value: Any) -> Callable[[Any], bool]:
+    """Per-value predicate for one condition (called once per distinct value)."""
+    operator = (operator or '').strip().lower()
+    expected = '' if value is None else _as_text(value)
+
+    if operator in PRESENT_OPERATORS:
+        return lambda v: not _is_blank(v)
+    if operator in BLANK_OPERATORS:
+        return _is_blank
+    if operator in ('has value', 'does not have value'):
+        target = _as_text(checkbox_value) if checkbox_value not in (None, '') else None
+        has = (lambda v: not _is_blank(v) and _equals(v, target)) if target else (lambda v: not _is_blank(v))
+        return has if operator == 'has value' else (lambda v: not has(v))
+    if operator == 'equals':
+        return lambda v: not _is_blank(v) and _equals(v, expected)
+    if operator == 'does not equal':
+        return lambda v: _is_blank(v) or not _equals(v, expected)
+    if operator == 'contains':
+        return lambda v: not _is_blank(v) and _contains(v, expected)
+    if operator in ('does not contains', 'does not contain'):
+        return lambda v: _is_blank(v) or not _contains(v, expected)
+    if operator == 'starts with':
+        return lambda v: not _is_blank(v) and _as_text(v).startswith(expected)
+    if operator == 'ends with':
+        return lambda v: not _is_blank(v) and _as_text(v).endswith(expected)
+    raise ValueError(f"Unsupported skip-logic operator: {operator}")
+
+
+class _EncodedFrame:
+    """Lazily dictionary-encodes condition columns and memoizes condition masks."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._columns: Dict[str, Tuple[np.ndarray, List[Any]]] = {}
+        self._masks: Dict[tuple, np.ndarray] = {}
+
+    def _encode(self, column: str) -> Tuple[np.ndarray, List[Any]]:
+        if column not in self._columns:
+            values = self.df[column]
+            try:
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            except TypeError:
+                # Checkbox answers arrive as lists; make them hashable once
+                values = values.map(lambda v: tuple(v) if isinstance(v, list) else v)
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+            self._columns[column] = (codes, list(uniques))
+        return self._columns[column]
+
+    def mask(self, column: Optional[str], operator: str, value: Any, checkbox_value: Any) -> np.ndarray:
+        key = (column, operator, _as_text(value) if value is not None else None, checkbox_value)
+        if key in self._masks:
+            return self._masks[key]
+
+        predicate = _predicate(operator, value, checkbox_value)
+        if column is None or column not in self.df.columns:
+            # Unknown field: every row sees a blank answer
+            result = np.full(len(self.df), predicate(None), dtype=bool)
+        else:
+            codes, uniques = self._encode(column)
+            # Evaluate on the distinct values; the last slot stands for missing (code -1)
+            lookup = np.array([predicate(unique) for unique in uniques] + [predicate(None)], dtype=bool)
+            result = lookup[codes]
+        self._masks[key] = result
+        return result
+
+
+class SkipLogicProgram:
+    """
+    Compiled skip-logic rules of one form.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        """
+        Args:
+            rules: Compiled rules with ``target``, ``show``, ``match`` and ``conditions``
+                (column, operator, value, checkbox value) entries
+        """
+        self.rules = rules
+
+    @classmethod
+    def compile(cls, form_structure: Dict[str, Any]) -> 'SkipLogicProgram':
+        """
+        Compile the skip-logic rules of a form structure.
+
+        Args:
+            form_structure: Form structure with ``fields`` (and optional ``repeatable``)
+
+        Returns:
+            The compiled program (empty when the form has no rules)
+        """
+        fields = list(form_structure.get('fields', []))
+        for repeatable in form_structure.get('repeatable', []):
+            prefix = repeatable.get('name', '')
+            for sub_field in repeatable.get('repeatable', {}).get('fields', []):
+                fields.append({**sub_field, 'name': f"{prefix}_{_field_name(sub_field)}"})
+
+        # Conditions and actions may reference fields by id, name or label
+        columns: Dict[str, str] = {}
+        for field in fields:
+            name = _field_name(field)
+            for alias in (_field_id(field), field.get('label'), name):
+                if alias:
+                    columns.setdefault(str(alias), name)
+
+        rules = []
+        for field in fields:
+            logic = field.get('skipLogic') or {}
+            for rule in (logic if isinstance(logic, list) else [logic]):
+                conditions = rule.get('conditions') or []
+                if not conditions or rule.get('enabled') is False:
+                    continue
+                compiled_conditions = [
+                    (columns.get(str(condition.get('targetField')), condition.get('targetField')),
+                     condition.get('operator', ''), condition.get('value'), condition.get('checkboxValue'))
+                    for condition in conditions
+                ]
+                match = 'any' if str(rule.get('matchType', 'all')).lower() == 'any' else 'all'
+
+                visibility = [
+                    (columns.get(str(action.get('targetField') or action.get('target')), action.get('targetField')),
+                     str(action.get('type', '')).lower().startswith('show'))
+                    for action in rule.get('actions') or []
+                    if str(action.get('type', '')).lower().split(' ')[0] in ('show', 'hide')
+                ]
+                if not visibility:
+                    visibility = [(_field_name(field), True)]
+
+                for target, show in visibility:
+                    rules.append({'target': target, 'show': show, 'match': match, 'conditions': compiled_conditions})
+
+        # Validate operators up front; a field with a rule that cannot be evaluated
+        # is treated as always applicable rather than failing the run
+        unsupported = set()
+        for rule in rules:
+            for _, operator, value, checkbox_value in rule['conditions']:
+                try:
+                    _predicate(operator, value, checkbox_value)
+                except ValueError as e:
+                    logger.error(f"Ignoring the skip logic of field {rule['target']!r}: {e}")
+                    unsupported.add(rule['target'])
+        return cls([rule for rule in rules if rule['target'] not in unsupported])
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    @property
+    def targets(self) -> Set[str]:
+        return {rule['target'] for rule in self.rules}
+
+    def dependencies(self, fields: Iterable[str]) -> List[str]:
+        """Condition columns needed to evaluate the applicability of ``fields``."""
+        fields = set(fields)
+        needed = {}
+        for rule in self.rules:
+            if rule['target'] in fields:
+                for column, _, _, _ in rule['conditions']:
+                    if column:
+                        needed[column] = True
+        return list(needed)
+
+    def applicability(self, df: pd.DataFrame, fields: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Boolean masks of the rows where each rule-governed field applies.
+
+        Args:
+            df: Normalized submissions of the form
+            fields: Restrict to these fields (defaults to every rule target)
+
+        Returns:
+            Dict of field -> boolean mask; fields without rules are omitted (always applicable)
+        """
+        wanted = set(fields) if fields is not None else None
+        encoded = _EncodedFrame(df)
+        masks: Dict[str, np.ndarray] = {}
+
+        for rule in self.rules:
+            target = rule['target']
+            if wanted is not None and target not in wanted:
+                continue
+            combine = np.logical_and if rule['match'] == 'all' else np.logical_or
+            conditions = iter(rule['conditions'])
+            matched = encoded.mask(*next(conditions)).copy()
+            for condition in conditions:
+                combine(matched, encoded.mask(*condition), out=matched)
+            if not rule['show']:
+                np.logical_not(matched, out=matched)
+            if target in masks:
+                np.logical_and(masks[target], matched, out=masks[target])
+            else:
+                masks[target] = matched
+        return masks
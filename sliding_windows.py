@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Sliding Windows
+===============
+
+Per-day aggregates of the most recent ``days`` days kept in ring buffers, so
+"last 30 days vs the 30 before" and month-over-month indicators are answered
+from at most ``days`` slots instead of scanning submissions.
+
+Every key owns one row of a (keys x days) count array and sum array:
+
+- ``(form, None, None)``: submissions per day
+- ``(form, variable, category)``: submissions per day with that category
+- ``(form, variable, None)``: non-missing values and their sum per day (numeric)
+
+Day ``d`` (days since 1970-01-01, in the submissions' wall time) lives in slot
+``d % days``. Adding a submission costs O(1) per tracked variable. When a newer
+day arrives the head advances and the slots of the days that left the window
+are zeroed; submissions older than the window are ignored.
+
+``update(data, only_new=True)`` skips the submissions (by ID, per form) already
+added, so stored buffers can be refreshed with the full dataset or a retried run.
+
+Usage:
+    windows = SlidingWindows.load(path) if os.path.exists(path) else SlidingWindows()
+    windows.update(submissions, only_new=True).advance(date.today())
+    windows.save(path)
+    windows.count('default', 'status', 'positive', start=date.today() - timedelta(days=29))
+"""
+
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ingest_log import IngestLog, row_keys
+
+DEFAULT_DAYS = 90
+DEFAULT_CATEGORICAL = ('category', 'status', 'gender', 'region')
+DEFAULT_NUMERIC = ('age',)
+DEFAULT_FORM = 'default'
+
+Key = Tuple[str, Optional[str], Any]
+Day = Any  # int day number, date, datetime or Timestamp
+
+
+def day_number(value: Day) -> int:
+    """Days since 1970-01-01 of a date-like value (its wall-clock date for tz-aware values)."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return (value - date(1970, 1, 1)).days
+    return int(pd.Timestamp(value).tz_localize(None).to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+
+class SlidingWindows:
+    """
+    Ring buffers of per-day counts and sums for the last ``days`` days.
+    """
+
+    def __init__(self, days: int = DEFAULT_DAYS, categorical: Sequence[str] = DEFAULT_CATEGORICAL,
+                 numeric: Sequence[str] = DEFAULT_NUMERIC):
+        """
+        Initialize empty buffers.
+
+        Args:
+            days: Days retained (must cover the longest window queried, e.g. 62 for
+                month-over-month changes and 60 for two 30-day periods)
+            categorical: Variables whose per-category counts are kept
+            numeric: Variables whose per-day value counts and sums are kept
+        """
+        self.days = int(days)
+        self.categorical = list(categorical)
+        self.numeric = list(numeric)
+        self.head: Optional[int] = None
+        self.keys: Dict[Key, int] = {}
+        self.counts = np.zeros((0, self.days), dtype=np.float64)
+        self.sums = np.zeros((0, self.days), dtype=np.float64)
+        self.ingested: Dict[str, IngestLog] = {}
+
+    @property
+    def first_day(self) -> Optional[int]:
+        """Oldest day still retained."""
+        return self.head - self.days + 1 if self.head is not None else None
+
+    def _row(self, key: Key) -> int:
+        if key not in self.keys:
+            self.keys[key] = len(self.keys)
+            if len(self.keys) > len(self.counts):
+                capacity = max(8, 2 * len(self.counts))
+                self.counts = np.vstack([self.counts, np.zeros((capacity - len(self.counts), self.days))])
+                self.sums = np.vstack([self.sums, np.zeros((capacity - len(self.sums), self.days))])
+        return self.keys[key]
+
+    def advance(self, day: Day) -> 'SlidingWindows':
+        """Move the head to ``day`` (if later), zeroing the slots of the days that expire."""
+        day = day_number(day)
+        if self.head is None:
+            self.head = day
+        elif day > self.head:
+            if day - self.head >= self.days:
+                self.counts[:] = 0
+                self.sums[:] = 0
+            else:
+                slots = np.arange(self.head + 1, day + 1) % self.days
+                self.counts[:, slots] = 0
+                self.sums[:, slots] = 0
+            self.head = day
+        return self
+
+    def add(self, day: Day, values: Dict[str, Any], form_id: str = DEFAULT_FORM) -> bool:
+        """
+        Add one submission in O(1) per tracked variable.
+
+        Args:
+            day: Submission date
+            values: The submission's field values
+            form_id: Form the submission belongs to
+
+        Returns:
+            False when the submission is older than the retained window (and was ignored)
+        """
+        day = day_number(day)
+        self.advance(day)
+        if day < self.first_day:
+            return False
+        slot = day % self.days
+        # Resolve rows before indexing: a new key may reallocate the arrays
+        row = self._row((form_id, None, None))
+        self.counts[row, slot] += 1
+        for variable in self.categorical:
+            value = values.get(variable)
+            if value is not None and not pd.isna(value):
+                row = self._row((form_id, variable, value))
+                self.counts[row, slot] += 1
+        for variable in self.numeric:
+            value = values.get(variable)
+            if value is not None and not pd.isna(value):
+                row = self._row((form_id, variable, None))
+                self.counts[row, slot] += 1
+                self.sums[row, slot] += float(value)
+        return True
+
+    def update(self, data: pd.DataFrame, form_id: str = DEFAULT_FORM, date_column: str = 'date',
+               only_new: bool = False) -> 'SlidingWindows':
+        """
+        Add a batch of new submissions (vectorized ``add``); rows without a date are skipped.
+
+        Args:
+            data: Submissions
+            form_id: Form the submissions belong to
+            date_column: Submission date column
+            only_new: Add only the submissions (by ID) of ``form_id`` not added by an
+                earlier ``only_new`` update, and record them
+
+        Returns:
+            The buffers themselves
+        """
+        if len(data) == 0 or date_column not in data.columns:
+            return self
+        if only_new:
+            log = self.ingested.setdefault(form_id, IngestLog())
+            data = data[log.claim(row_keys(data, ignore=['_month']))]
+            if len(data) == 0:
+                return self
+        dates = pd.to_datetime(data[date_column])
+        if getattr(dates.dt, 'tz', None) is not None:
+            dates = dates.dt.tz_localize(None)
+        stamps = dates.to_numpy().astype('datetime64[D]')
+        dated = ~np.isnat(stamps)
+        if not dated.any():
+            return self
+        days = stamps.astype(np.int64)
+        self.advance(int(days[dated].max()))
+        keep = dated & (days >= self.first_day)
+        slots = days[keep] % self.days
+
+        def accumulate(key: Key, key_slots: np.ndarray, weights: Optional[np.ndarray] = None):
+            row = self._row(key)
+            self.counts[row] += np.bincount(key_slots, minlength=self.days)
+            if weights is not None:
+                self.sums[row] += np.bincount(key_slots, weights=weights, minlength=self.days)
+
+        accumulate((form_id, None, None), slots)
+        for variable in self.categorical:
+            if variable not in data.columns:
+                continue
+            codes, categories = pd.factorize(data[variable].to_numpy()[keep], use_na_sentinel=True)
+            present = codes >= 0
+            per_category = np.bincount(codes[present] * self.days + slots[present],
+                                       minlength=len(categories) * self.days).reshape(len(categories), self.days)
+            for code, category in enumerate(categories.tolist()):
+                row = self._row((form_id, variable, category))
+                self.counts[row] += per_category[code]
+        for variable in self.numeric:
+            if variable not in data.columns:
+                continue
+            values = pd.to_numeric(data[variable], errors='coerce').to_numpy(dtype=np.float64)[keep]
+            present = ~np.isnan(values)
+            accumulate((form_id, variable, None), slots[present], values[present])
+        return self
+
+    def _slots(self, start: Optional[Day], end: Optional[Day]) -> np.ndarray:
+        """Slots of the retained days with start <= day < end (end defaults to after the head)."""
+        if self.head is None:
+            return np.empty(0, dtype=np.int64)
+        first = self.first_day if start is None else day_number(start)
+        if first < self.first_day:
+            raise ValueError(f"Window starts before the {self.days} retained days")
+        last = self.head if end is None else min(day_number(end) - 1, self.head)
+        return np.arange(first, last + 1) % self.days
+
+    def count(self, form_id: str = DEFAULT_FORM, variable: Optional[str] = None, category: Any = None,
+              start: Optional[Day] = None, end: Optional[Day] = None) -> int:
+        """
+        Submissions in [start, end): all of them, those with ``variable == category``, or
+        (numeric ``variable`` without ``category``) those with a value.
+        """
+        row = self.keys.get((form_id, variable, category))
+        if row is None:
+            return 0
+        return int(round(self.counts[row, self._slots(start, end)].sum()))
+
+    def mean(self, form_id: str, variable: str, start: Optional[Day] = None, end: Optional[Day] = None) -> float:
+        """Mean of a numeric variable in [start, end) (NaN when it has no values)."""
+        row = self.keys.get((form_id, variable, None))
+        slots = self._slots(start, end)
+        count = self.counts[row, slots].sum() if row is not None else 0
+        return float(self.sums[row, slots].sum() / count) if count else np.nan
+
+    def save(self, path: str):
+        """Persist the buffers as a single npz file (written atomically)."""
+        forms = list(self.ingested)
+        meta = {
+            'days': self.days, 'categorical': self.categorical, 'numeric': self.numeric,
+            'head': self.head, 'keys': [list(key) for key in self.keys], 'forms': forms
+        }
+        tmp_path = path + '.tmp.npz'
+        rows = len(self.keys)
+        ingested = {f'ingested_{i}': self.ingested[form_id].hashes for i, form_id in enumerate(forms)}
+        np.savez(tmp_path, counts=self.counts[:rows], sums=self.sums[:rows],
+                 meta=np.array(json.dumps(meta, default=str)), **ingested)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'SlidingWindows':
+        """Load buffers written with ``save``."""
+        with np.load(path) as stored:
+            meta = json.loads(str(stored['meta']))
+            windows = cls(meta['days'], meta['categorical'], meta['numeric'])
+            windows.head = meta['head']
+            windows.keys = {tuple(key): row for row, key in enumerate(meta['keys'])}
+            windows.counts = stored['counts'].copy()
+            windows.sums = stored['sums'].copy()
+            windows.ingested = {
+                form_id: IngestLog(stored[f'ingested_{i}']) for i, form_id in enumerate(meta.get('forms', []))
+            }
+        return windows
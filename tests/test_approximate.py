@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from approximate import ExactRefresher, StratifiedReservoir
+
+
+def _submissions(rows: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        '_id': [f"s{i}" for i in range(rows)],
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 200, rows), unit='D'),
+        'category': rng.choice(['a', 'b', None], rows),
+        'age': np.where(rng.random(rows) < 0.1, np.nan, rng.integers(0, 90, rows)),
+        'tags': [['x', 'y']] * rows,
+    })
+
+
+def test_only_new_adds_late_synced_and_same_timestamp_rows():
+    data = _submissions()
+    reservoir = StratifiedReservoir(50, seed=0).update(data, only_new=True)
+    late = data.iloc[:2].assign(_id=['late', 'tied'], date=[pd.Timestamp('2024-01-02'), data['date'].max()])
+    reservoir.update(pd.concat([data, late]), only_new=True)
+    reservoir.update(pd.concat([data, late]), only_new=True)
+    assert reservoir.population == len(data) + 2
+
+
+def test_save_load_round_trip_without_pickle(tmp_path):
+    path = str(tmp_path / 'sample.npz')
+    reservoir = StratifiedReservoir(50, seed=0).update(_submissions(), only_new=True)
+    reservoir.save(path)
+    with np.load(path) as stored:  # allow_pickle=False
+        assert all(stored[name].dtype != object for name in stored.files)
+    loaded = StratifiedReservoir.load(path)
+    pd.testing.assert_frame_equal(loaded.rows, reservoir.rows)
+    assert loaded.seen == reservoir.seen
+    loaded.update(_submissions(), only_new=True)
+    assert loaded.population == reservoir.population
+
+
+def test_refresher_bounds_pending_runs():
+    refresher = ExactRefresher(max_pending=2)
+    release = threading.Event()
+    futures = [refresher.submit(None, release.wait) for _ in range(4)]
+    assert [future is not None for future in futures] == [True, True, False, False]
+    release.set()
+    refresher.shutdown()
+    assert not refresher._results
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from dedup import column_hashes, deduplicate
+
+
+def test_swapped_numeric_values_are_not_near_duplicates():
+    df = pd.DataFrame({'age': [20, 29], 'days': [29, 20], 'ward': ['a', 'a']})
+    deduplicated, report = deduplicate(df, near=True, threshold=0.9)
+    assert report['near_duplicates'] == 0
+    assert len(deduplicated) == 2
+
+
+def test_column_hashes_differ_per_field():
+    df = pd.DataFrame({'age': [20], 'days': [20], 'ward': ['x'], 'name': ['x']})
+    hashes = column_hashes(df, list(df.columns))
+    assert len(np.unique(hashes)) == 4
+
+
+def test_random_rows_have_no_false_near_duplicates():
+    rng = np.random.default_rng(0)
+    rows = 50000
+    df = pd.DataFrame({
+        'age': rng.integers(0, 90, rows),
+        'days': rng.integers(0, 90, rows),
+        'ward': rng.choice(list('abc'), rows),
+    }).drop_duplicates()
+    _, report = deduplicate(df, near=True, threshold=0.9)
+    assert report['near_duplicates'] == 0
+
+
+def test_near_duplicates_still_found():
+    df = pd.DataFrame({
+        'a': [1, 1], 'b': [2, 2], 'c': [3, 3], 'd': [4, 4], 'e': [5, 5],
+        'f': [6, 6], 'g': [7, 7], 'h': [8, 8], 'i': [9, 9], 'j': [10, 11],
+    })
+    _, report = deduplicate(df, near=True, threshold=0.8)
+    assert report['near_duplicates'] == 1
@@ -0,0 +1,137 @@
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_transport import HTTPTransport
+from multi_form_indicator_script import MultiFormIndicatorProcessor
+
+ROWS = 500
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    - ``/data``: a JSON body, gzip-compressed when the client accepts it
+    - ``/flaky/<n>``: 503 with ``Retry-After: 0`` for the first n requests, then ``/data``
+    - ``/drop/<n>``: closes the connection without a response for the first n requests
+    - ``/slow``: answers after ``server.delay`` seconds
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _hits(self) -> int:
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            self.server.clients.add(self.client_address)
+            return self.server.hits[self.path]
+
+    def _send(self, status: int, body: bytes = b'', headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        hits = self._hits()
+        parts = self.path.strip('/').split('/')
+        if parts[0] == 'flaky' and hits <= int(parts[1]):
+            self._send(503, headers={'Retry-After': '0'})
+            return
+        if parts[0] == 'drop' and hits <= int(parts[1]):
+            self.close_connection = True
+            return
+        if parts[0] == 'slow':
+            time.sleep(self.server.delay)
+        body = json.dumps([{'_id': i, 'status': 'ok'} for i in range(ROWS)]).encode()
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            self._send(200, gzip.compress(body), {'Content-Encoding': 'gzip', 'Content-Type': 'application/json'})
+        else:
+            self._send(200, body, {'Content-Type': 'application/json'})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay: float):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.clients = set()
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close the connection mid-response
+        pass
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+@pytest.fixture
+def server():
+    stub = StubServer(delay=0.5)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+
+@pytest.fixture
+def transport():
+    http = HTTPTransport(pool_maxsize=2, read_timeout=0.2, max_retries=2, backoff_factor=0.01)
+    yield http
+    http.close()
+
+
+def test_gzip_is_negotiated_and_bytes_are_counted(server, transport):
+    response = transport.get(f"{server.url}/data")
+    assert response.status_code == 200
+    assert len(response.json()) == ROWS
+    summary = transport.stats.summary()
+    assert 0 < summary['wire_bytes'] < summary['decoded_bytes']
+
+
+def test_keep_alive_connection_is_reused(server, transport):
+    for _ in range(20):
+        transport.get(f"{server.url}/data")
+    assert len(server.clients) == 1
+
+
+def test_transient_status_is_retried(server, transport):
+    response = transport.get(f"{server.url}/flaky/2")
+    assert response.status_code == 200
+    assert transport.stats.records[-1]['attempts'] == 3
+
+
+def test_retries_are_bounded(server, transport):
+    response = transport.get(f"{server.url}/flaky/5")
+    assert response.status_code == 503
+    assert transport.stats.records[-1]['attempts'] == 3
+    assert transport.stats.summary()['failures'] == 1
+
+
+def test_dropped_connection_is_retried(server, transport):
+    response = transport.get(f"{server.url}/drop/1")
+    assert response.status_code == 200
+    assert transport.stats.records[-1]['attempts'] == 2
+
+
+def test_read_timeout_raises_after_retries(server, transport):
+    with pytest.raises(requests.exceptions.RequestException):
+        transport.get(f"{server.url}/slow")
+    assert transport.stats.records[-1]['attempts'] == 3
+
+
+def test_processor_rejects_fetch_concurrency_with_a_transport(transport):
+    with pytest.raises(ValueError):
+        MultiFormIndicatorProcessor('http://127.0.0.1', 'token', fetch_concurrency=2, transport=transport)
+    assert MultiFormIndicatorProcessor('http://127.0.0.1', 'token', transport=transport).transport is transport
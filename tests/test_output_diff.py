@@ -0,0 +1,46 @@
+import json
+import threading
+
+from ingest_log import locked
+from output_diff import OutputHashStore, diff_outputs, mark_changes
+
+
+def _output(output_id: str, value: int) -> dict:
+    return {'id': output_id, 'type': 'single_value', 'data': {'value': value}}
+
+
+def test_removed_outputs_become_tombstones():
+    previous = mark_changes([_output('a', 1), _output('b', 2)], None)
+    marked = mark_changes([_output('a', 1)], previous, only_changed=True)
+    assert marked == [{'id': 'b', 'removed': True, 'changed': True, 'contentHash': None}]
+
+
+def test_removed_is_limited_to_the_requested_scope():
+    previous = {'a': 'x', 'b': 'y'}
+    assert diff_outputs([_output('a', 1)], previous, scope=['a'])['removed'] == []
+    assert diff_outputs([_output('a', 1)], previous)['removed'] == ['b']
+
+
+def test_store_forgets_removed_outputs(tmp_path):
+    store = OutputHashStore(str(tmp_path / 'hashes.json'))
+    store.save(mark_changes([_output('a', 1), _output('b', 2)], store.load()))
+    store.save(mark_changes([_output('a', 1)], store.load()))
+    assert set(store.load()) == {'a'}
+    assert mark_changes([_output('a', 1)], store.load(), only_changed=True) == []
+
+
+def test_locked_updates_keep_every_hash(tmp_path):
+    store = OutputHashStore(str(tmp_path / 'hashes.json'))
+
+    def execute(output_id: str):
+        for value in range(20):
+            with locked(store.path):
+                store.save(mark_changes([_output(output_id, value)], store.load(), scope=[output_id]))
+
+    threads = [threading.Thread(target=execute, args=(f"output{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(store.path) as f:
+        assert len(json.load(f)) == 8
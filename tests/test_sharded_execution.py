@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import os
+import socket
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from sharded_execution import JobQueue, finish_run, reduce_run, run_worker, submit_run
+
+VARIABLES = ['age', 'score', 'sex']
+PARAMETERS = {'dateRange': 'last_365_days'}
+SHARD_DAYS = 30
+SECTIONS = ('data_completeness', 'temporal_analysis', 'statistical_summaries')
+
+
+def _frames(forms: int = 3, rows: int = 5000):
+    rng = np.random.default_rng(0)
+    # Whole hours half an hour away from now, so the recent windows agree between runs
+    latest = pd.Timestamp.now().floor('h') - pd.Timedelta(minutes=30)
+    return {
+        f"form{i}": pd.DataFrame({
+            'submission_date': latest - pd.to_timedelta(rng.integers(0, 300 * 24, rows), unit='h'),
+            'age': np.where(rng.random(rows) < 0.1, np.nan, rng.integers(0, 90, rows)),
+            'score': rng.normal(50, 10, rows).round(1),
+            'sex': rng.choice(['male', 'female', None], rows, p=[0.45, 0.45, 0.1]),
+        })
+        for i in range(forms)
+    }
+
+
+FRAMES = _frames()
+
+
+def _load(form_id, unit_parameters, unit_variables):
+    return FRAMES[form_id]
+
+
+def _sharded_run(path: str, local_workers: int, crash: bool):
+    """Run on ``local_workers`` forked workers plus this process; optionally one worker dies holding a unit."""
+    context = multiprocessing.get_context('fork')
+    with JobQueue(path) as queue:
+        run_id = submit_run(queue, list(FRAMES), VARIABLES, PARAMETERS, SHARD_DAYS)
+
+        def work():
+            with JobQueue(path) as worker_queue:
+                run_worker(worker_queue, _load, run_id=run_id)
+
+        def die():
+            with JobQueue(path) as worker_queue:
+                worker_queue.claim(f"{socket.gethostname()}:{os.getpid()}", run_id)
+            os._exit(1)
+
+        processes = []
+        if crash:
+            processes.append(context.Process(target=die, daemon=True))
+            processes[0].start()
+            processes[0].join()
+        processes += [context.Process(target=work, daemon=True) for _ in range(local_workers)]
+        for process in processes[int(crash):]:
+            process.start()
+        host = socket.gethostname()
+        try:
+            finish_run(
+                queue, run_id, lambda: run_worker(queue, _load, run_id=run_id),
+                lambda: [f"{host}:{process.pid}" for process in processes if process.exitcode not in (None, 0)],
+                timeout=120, poll=0.2
+            )
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+        return reduce_run(queue, run_id)
+
+
+@pytest.fixture(scope='module')
+def runs(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('queues')
+    sharded = _sharded_run(str(directory / 'sharded.db'), local_workers=2, crash=True)
+    single = _sharded_run(str(directory / 'single.db'), local_workers=0, crash=False)
+    return sharded, single
+
+
+def test_every_unit_completes_after_a_worker_dies(runs):
+    sharded, _ = runs
+    sharding = sharded['metadata']['sharding']
+    assert not sharded.get('error')
+    assert sharding['completed_units'] == sharding['units']
+
+
+def test_several_workers_take_part(runs):
+    sharded, _ = runs
+    assert len(sharded['metadata']['sharding']['workers']) > 1
+
+
+@pytest.mark.parametrize('section', SECTIONS)
+def test_sharded_run_matches_one_process(runs, section):
+    sharded, single = runs
+    assert sharded['metadata'].get('total_records') == single['metadata'].get('total_records')
+    assert (json.dumps(sharded.get(section), sort_keys=True, default=str)
+            == json.dumps(single.get(section), sort_keys=True, default=str))
@@ -0,0 +1,24 @@
+from transmission_log_indicators import TransmissionLogAnalyzer
+
+
+def _log(connection: str, duration: int, status: str = 'success') -> dict:
+    return {
+        'connectionId': {'$oid': connection},
+        'startTime': {'$date': '2024-05-01T10:00:00Z'},
+        'status': status,
+        'duration': duration,
+        'dataVolume': {'records': 10, 'size': 1000},
+    }
+
+
+def test_merge_does_not_share_stats_with_the_other_analyzer():
+    first, second = TransmissionLogAnalyzer(), TransmissionLogAnalyzer()
+    second.add(_log('c1', 100))
+    first.merge(second)
+    first.add(_log('c1', 200))
+    first.merge(second)
+
+    assert second.summary()['overall']['runs'] == 1
+    assert first.summary()['overall']['runs'] == 3
+    second.add(_log('c1', 300, 'failed'))
+    assert first.summary()['overall']['failures'] == 0
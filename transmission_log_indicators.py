@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Transmission Log Indicators
+===========================
+
+Connector health indicators computed from transmission logs (one JSON
+document per line, as exported in ``mongo/transmissionlogs.json``).
+
+The logs are streamed in a single pass. For every connection and time bucket
+the analyzer keeps run/success/failure/retry counters, record and byte
+volumes, and a mergeable duration sketch for p50/p95/p99 latency, so results
+from several files or workers can be merged without rereading the logs.
+
+Usage:
+    python transmission_log_indicators.py --logs mongo/transmissionlogs.json --bucket day
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Union
+
+from sketches import QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+# Characters of the ISO timestamp that identify each bucket size
+BUCKET_PREFIX_LENGTHS = {'month': 7, 'day': 10, 'hour': 13}
+
+
+def _oid(value: Any) -> str:
+    """Unwrap a MongoDB extended-JSON ObjectId."""
+    if isinstance(value, dict):
+        return value.get('$oid', '')
+    return str(value) if value is not None else 'unknown'
+
+
+def _date(value: Any) -> str:
+    """Unwrap a MongoDB extended-JSON date into its ISO string."""
+    if isinstance(value, dict):
+        value = value.get('$date', '')
+    return value if isinstance(value, str) else ''
+
+
+class TransmissionStats:
+    """
+    Mergeable counters and duration sketch for one (connection, bucket) cell.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.runs = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.records = 0
+        self.bytes = 0
+        self.duration_ms = 0
+        self.durations = QuantileSketch(relative_accuracy)
+
+    def add(self, log: Dict[str, Any]):
+        status = log.get('status')
+        duration = log.get('duration') or 0
+        volume = log.get('dataVolume') or {}
+
+        self.runs += 1
+        if status == 'success':
+            self.successes += 1
+        elif status == 'failed':
+            self.failures += 1
+        self.retries += log.get('retryAttempts') or 0
+        self.records += volume.get('records') or 0
+        self.bytes += volume.get('size') or 0
+        self.duration_ms += duration
+        self.durations.add(duration)
+
+    def merge(self, other: 'TransmissionStats') -> 'TransmissionStats':
+        self.runs += other.runs
+        self.successes += other.successes
+        self.failures += other.failures
+        self.retries += other.retries
+        self.records += other.records
+        self.bytes += other.bytes
+        self.duration_ms += other.duration_ms
+        self.durations.merge(other.durations)
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        seconds = self.duration_ms / 1000
+        return {
+            'runs': self.runs,
+            'successes': self.successes,
+            'failures': self.failures,
+            'success_rate': round(self.successes / self.runs * 100, 2) if self.runs else 0,
+            'failure_rate': round(self.failures / self.runs * 100, 2) if self.runs else 0,
+            'retries': self.retries,
+            'records': self.records,
+            'bytes': self.bytes,
+            'records_per_second': round(self.records / seconds, 2) if seconds > 0 else 0,
+            'bytes_per_second': round(self.bytes / seconds, 2) if seconds > 0 else 0,
+            'duration_p50_ms': self.durations.quantile(0.50),
+            'duration_p95_ms': self.durations.quantile(0.95),
+            'duration_p99_ms': self.durations.quantile(0.99)
+        }
+
+
+class TransmissionLogAnalyzer:
+    """
+    Single-pass streaming analyzer over transmission logs.
+    """
+
+    def __init__(self, bucket: str = 'day', relative_accuracy: float = 0.01):
+        """
+        Initialize the analyzer.
+
+        Args:
+            bucket: Time bucket size: 'month', 'day' or 'hour'
+            relative_accuracy: Relative accuracy of the duration percentiles
+        """
+        if bucket not in BUCKET_PREFIX_LENGTHS:
+            raise ValueError(f"Unsupported bucket: {bucket}")
+        self.bucket = bucket
+        self.relative_accuracy = relative_accuracy
+        self.cells: Dict[tuple, TransmissionStats] = {}
+        self.skipped_lines = 0
+
+    def add(self, log: Dict[str, Any]):
+        """Add one transmission log document."""
+        connection_id = _oid(log.get('connectionId'))
+        bucket = _date(log.get('startTime') or log.get('createdAt'))[:BUCKET_PREFIX_LENGTHS[self.bucket]]
+
+        key = (connection_id, bucket)
+        stats = self.cells.get(key)
+        if stats is None:
+            stats = self.cells[key] = TransmissionStats(self.relative_accuracy)
+        stats.add(log)
+
+    def consume(self, source: Union[str, Iterable[str]]) -> 'TransmissionLogAnalyzer':
+        """
+        Stream logs from a JSONL file path or an iterable of lines.
+
+        Args:
+            source: File path or iterable of JSON lines
+
+        Returns:
+            The analyzer itself
+        """
+        if isinstance(source, str):
+            with open(source) as f:
+                return self.consume(f)
+
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self.add(json.loads(line))
+            except (ValueError, AttributeError) as e:
+                self.skipped_lines += 1
+                logger.warning(f"Skipping malformed transmission log line: {e}")
+        return self
+
+    def merge(self, other: 'TransmissionLogAnalyzer') -> 'TransmissionLogAnalyzer':
+        """Merge the results of another analyzer with the same bucket size and accuracy (``other`` is left unchanged)."""
+        if other.bucket != self.bucket:
+            raise ValueError("Cannot merge analyzers with different bucket sizes")
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge analyzers with different relative accuracy")
+        for key, stats in other.cells.items():
+            if key not in self.cells:
+                self.cells[key] = TransmissionStats(self.relative_accuracy)
+            self.cells[key].merge(stats)
+        self.skipped_lines += other.skipped_lines
+        return self
+
+    def _rollup(self, by: Optional[int]) -> Dict[Any, TransmissionStats]:
+        """Merge cells by connection (0), bucket (1) or everything (None)."""
+        rolled = {}
+        for key, stats in self.cells.items():
+            group = key[by] if by is not None else 'all'
+            if group not in rolled:
+                rolled[group] = TransmissionStats(self.relative_accuracy)
+            rolled[group].merge(stats)
+        return rolled
+
+    def summary(self) -> Dict[str, Any]:
+        """Summaries overall, per connection, per bucket and per (connection, bucket)."""
+        return {
+            'overall': self._rollup(None).get('all', TransmissionStats(self.relative_accuracy)).summary(),
+            'by_connection': {key: stats.summary() for key, stats in sorted(self._rollup(0).items())},
+            'by_bucket': {key: stats.summary() for key, stats in sorted(self._rollup(1).items())},
+            'by_connection_bucket': {
+                f"{connection}|{bucket}": stats.summary() for (connection, bucket), stats in sorted(self.cells.items())
+            },
+            'skipped_lines': self.skipped_lines
+        }
+
+    def generate_outputs(self) -> List[Dict]:
+        """Connector health in the standard indicator output format."""
+        overall = self._rollup(None).get('all', TransmissionStats(self.relative_accuracy)).summary()
+        by_connection = sorted(self._rollup(0).items())
+        by_bucket = sorted(self._rollup(1).items())
+        bucket_summaries = [stats.summary() for _, stats in by_bucket]
+        connection_summaries = [stats.summary() for _, stats in by_connection]
+
+        return [
+            {
+                "id": "transmission_total_runs",
+                "name": "Connector Runs",
+                "type": "numeric_value",
+                "description": "Total number of connector transmission runs",
+                "data": {"value": overall['runs'], "unit": "runs", "format": "number", "precision": 0}
+            },
+            {
+                "id": "transmission_success_rate",
+                "name": "Transmission Success Rate",
+                "type": "numeric_value",
+                "description": "Percentage of connector runs that succeeded",
+                "data": {"value": overall['success_rate'], "unit": "%", "format": "percentage", "precision": 1}
+            },
+            {
+                "id": "transmission_p95_duration",
+                "name": "p95 Transmission Duration",
+                "type": "numeric_value",
+                "description": "95th percentile duration of connector runs",
+                "data": {"value": round(overall['duration_p95_ms'] or 0, 1), "unit": "ms", "format": "number", "precision": 1}
+            },
+            {
+                "id": "transmission_throughput",
+                "name": "Transmission Throughput",
+                "type": "numeric_value",
+                "description": "Records transferred per second of connector run time",
+                "data": {"value": overall['records_per_second'], "unit": "records/s", "format": "number", "precision": 2}
+            },
+            {
+                "id": "connection_failure_rates",
+                "name": "Failure Rate by Connection",
+                "type": "bar_chart",
+                "description": "Percentage of failed runs per connection",
+                "data": {
+                    "categories": [connection for connection, _ in by_connection],
+                    "values": [summary['failure_rate'] for summary in connection_summaries],
+                    "orientation": "horizontal",
+                    "colors": ["#FF6B6B"],
+                    "xAxisLabel": "Failure rate (%)",
+                    "yAxisLabel": "Connection"
+                }
+            },
+            {
+                "id": "transmission_volume_trend",
+                "name": "Transmission Volume",
+                "type": "line_chart",
+                "description": f"Connector runs and failures per {self.bucket}",
+                "data": {
+                    "labels": [bucket for bucket, _ in by_bucket],
+                    "datasets": [
+                        {
+                            "label": "Runs",
+                            "data": [summary['runs'] for summary in bucket_summaries],
+                            "borderColor": "#0088FE",
+                            "backgroundColor": "rgba(0, 136, 254, 0.1)",
+                            "fill": True
+                        },
+                        {
+                            "label": "Failures",
+                            "data": [summary['failures'] for summary in bucket_summaries],
+                            "borderColor": "#FF6B6B",
+                            "backgroundColor": "rgba(255, 107, 107, 0.1)",
+                            "fill": False
+                        }
+                    ],
+                    "xAxisLabel": "Date",
+                    "yAxisLabel": "Runs"
+                }
+            },
+            {
+                "id": "transmission_latency_percentiles",
+                "name": "Transmission Latency",
+                "type": "line_chart",
+                "description": f"p50/p95/p99 run duration per {self.bucket}",
+                "data": {
+                    "labels": [bucket for bucket, _ in by_bucket],
+                    "datasets": [
+                        {
+                            "label": label,
+                            "data": [round(summary[key] or 0, 1) for summary in bucket_summaries],
+                            "borderColor": color,
+                            "fill": False
+                        }
+                        for label, key, color in (
+                            ("p50", 'duration_p50_ms', "#00C49F"),
+                            ("p95", 'duration_p95_ms', "#FFBB28"),
+                            ("p99", 'duration_p99_ms', "#FF8042")
+                        )
+                    ],
+                    "xAxisLabel": "Date",
+                    "yAxisLabel": "Duration (ms)"
+                }
+            }
+        ]
+
+
+def analyze_transmission_logs(path: str, bucket: str = 'day') -> List[Dict]:
+    """Stream a transmission log file and return connector health outputs."""
+    return TransmissionLogAnalyzer(bucket).consume(path).generate_outputs()
+
+
+def main():
+    """Analyze a transmission log export and print the outputs."""
+    parser = argparse.ArgumentParser(description='Transmission Log Indicators')
+    parser.add_argument('--logs', required=True, help='Path to the transmission logs (one JSON document per line)')
+    parser.add_argument('--bucket', default='day', choices=sorted(BUCKET_PREFIX_LENGTHS), help='Time bucket size')
+    parser.add_argument('--summary', action='store_true', help='Print detailed per-connection/bucket summaries')
+    args = parser.parse_args()
+
+    analyzer = TransmissionLogAnalyzer(args.bucket).consume(args.logs)
+    result = {
+        "success": True,
+        "outputs": analyzer.generate_outputs(),
+        "executedAt": datetime.now().isoformat()
+    }
+    if args.summary:
+        result["summary"] = analyzer.summary()
+
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
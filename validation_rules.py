@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Field Validation Rules
+======================
+
+Compiles per-field validation rules from a form structure and evaluates them
+over a normalized submissions DataFrame with vectorized checks:
+
+- ``required``: the answer is missing on a row where the question applies
+- ``type``: the value does not parse as the field type (number, email, date)
+- ``min`` / ``max``: numeric bounds (or length bounds for text)
+- ``pattern``: the value does not fully match the field's regular expression
+- ``options``: the value is not one of the field's ``options`` (select/radio/checkbox)
+
+Rules come from the field definition itself (``type``, ``required``,
+``options``) plus optional bounds given either directly on the field or in a
+``validation`` object (``min``, ``max``, ``minLength``, ``maxLength``,
+``pattern``).
+
+String checks (regex, options, email, date parsing) run once per distinct
+value and are broadcast back to the rows through the factorized codes.
+
+Usage:
+    program = ValidationProgram.compile(form_structure)
+    result = program.evaluate(df)
+    result.field_violations['age']   # {'type': 3, 'min': 1}
+    result.row_violations            # violations per row
+"""
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+EMAIL_PATTERN = r'[^@\s]+@[^@\s]+\.[^@\s]+'
+OPTION_TYPES = {'select', 'radio', 'checkbox', 'dropdown'}
+NUMERIC_TYPES = {'number', 'integer', 'decimal'}
+
+logger = logging.getLogger(__name__)
+
+
+def _option_values(options: Iterable[Any]) -> List[str]:
+    values = []
+    for option in options or []:
+        if isinstance(option, dict):
+            option = option.get('value', option.get('label'))
+        if option is not None:
+            values.append(str(option))
+    return values
+
+
+def _factorize(values: pd.Series) -> Tuple[np.ndarray, List[Any]]:
+    """Codes (-1 for missing) and distinct values; list answers become tuples."""
+    try:
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    except TypeError:
+        values = values.map(lambda v: tuple(v) if isinstance(v, list) else v)
+        codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    return codes, list(uniques)
+
+
+def _per_unique(codes: np.ndarray, uniques: List[Any], check) -> np.ndarray:
+    """Evaluate ``check`` on each distinct value and broadcast the verdicts to the rows."""
+    verdicts = np.array([bool(check(value)) for value in uniques] + [False], dtype=bool)
+    return verdicts[codes]
+
+
+class FieldRules:
+    """
+    Compiled validation rules of one field.
+    """
+
+    def __init__(self, name: str, field_type: str = 'text', required: bool = False,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None,
+                 min_length: Optional[int] = None, max_length: Optional[int] = None,
+                 pattern: Optional[str] = None, options: Optional[List[str]] = None):
+        self.name = name
+        self.type = (field_type or 'text').lower()
+        self.required = bool(required)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_length = min_length
+        self.max_length = max_length
+        self.pattern = None
+        if pattern:
+            try:
+                self.pattern = re.compile(pattern)
+            except (re.error, TypeError) as e:
+                # One malformed form definition must not stop the whole run
+                logger.warning(f"Skipping invalid pattern {pattern!r} of field {name!r}: {e}")
+        self.options = set(options) if options else None
+
+    @classmethod
+    def from_field(cls, field: Dict[str, Any], name: Optional[str] = None) -> 'FieldRules':
+        validation = {**field, **(field.get('validation') or {})}
+        field_type = (field.get('type') or 'text').lower()
+        return cls(
+            name=name or field.get('name', field.get('label', '')),
+            field_type=field_type,
+            required=field.get('required', False),
+            minimum=validation.get('min'),
+            maximum=validation.get('max'),
+            min_length=validation.get('minLength'),
+            max_length=validation.get('maxLength'),
+            pattern=validation.get('pattern'),
+            options=_option_values(field.get('options')) if field_type in OPTION_TYPES else None
+        )
+
+    def check(self, values: pd.Series, applicable: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Evaluate the rules over a column.
+
+        Args:
+            values: The field's column
+            applicable: Rows where the question applies (defaults to all rows)
+
+        Returns:
+            Dict of rule name -> boolean violation mask (rules that cannot fail are omitted)
+        """
+        codes, uniques = _factorize(values)
+        present = codes >= 0
+        if applicable is not None:
+            present &= applicable
+        violations: Dict[str, np.ndarray] = {}
+
+        if self.required:
+            missing = codes < 0
+            violations['required'] = missing if applicable is None else missing & applicable
+
+        if self.type in NUMERIC_TYPES or self.minimum is not None or self.maximum is not None:
+            if pd.api.types.is_numeric_dtype(values.dtype):
+                numbers = values.to_numpy(dtype=float, na_value=np.nan)
+            else:
+                numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            if self.type in NUMERIC_TYPES:
+                violations['type'] = present & np.isnan(numbers)
+            with np.errstate(invalid='ignore'):
+                if self.minimum is not None:
+                    violations['min'] = present & (numbers < float(self.minimum))
+                if self.maximum is not None:
+                    violations['max'] = present & (numbers > float(self.maximum))
+
+        if self.type == 'email':
+            email = re.compile(EMAIL_PATTERN)
+            violations['type'] = present & _per_unique(codes, uniques, lambda v: not email.fullmatch(str(v)))
+        elif self.type == 'date':
+            parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce', format='mixed', utc=True)
+            verdicts = np.append(parsed.isna().to_numpy(), False)
+            violations['type'] = present & verdicts[codes]
+
+        if self.min_length is not None or self.max_length is not None:
+            lengths = np.append(np.array([len(str(v)) for v in uniques], dtype=np.int64), 0)[codes]
+            if self.min_length is not None:
+                violations['min_length'] = present & (lengths < int(self.min_length))
+            if self.max_length is not None:
+                violations['max_length'] = present & (lengths > int(self.max_length))
+
+        if self.pattern is not None:
+            violations['pattern'] = present & _per_unique(codes, uniques, lambda v: not self.pattern.fullmatch(str(v)))
+
+        if self.options:
+            def invalid_option(value):
+                items = value if isinstance(value, tuple) else (value,)
+                return any(str(item) not in self.options for item in items)
+            violations['options'] = present & _per_unique(codes, uniques, invalid_option)
+
+        return violations
+
+
+class ValidationResult:
+    """
+    Per-field and per-row outcome of a validation pass.
+    """
+
+    def __init__(self, n_rows: int):
+        self.row_violations = np.zeros(n_rows, dtype=np.int32)
+        self.field_violations: Dict[str, Dict[str, int]] = {}
+        self.field_invalid: Dict[str, int] = {}
+        self.field_checked: Dict[str, int] = {}
+
+    def validity(self, field: str) -> Optional[float]:
+        """Share (0..1) of checked rows without any violation, or None when the field was not checked."""
+        checked = self.field_checked.get(field)
+        if checked is None:
+            return None
+        return 1 - self.field_invalid[field] / checked if checked > 0 else 1.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'rows_with_violations': int(np.count_nonzero(self.row_violations)),
+            'total_violations': int(self.row_violations.sum()),
+            'field_violations': self.field_violations
+        }
+
+
+class ValidationProgram:
+    """
+    Compiled validation rules of one form.
+    """
+
+    def __init__(self, fields: List[FieldRules]):
+        self.fields = {field.name: field for field in fields}
+
+    @classmethod
+    def compile(cls, form_structure: Dict[str, Any]) -> 'ValidationProgram':
+        """
+        Compile the validation rules of every field (repeater sub-fields included).
+
+        Args:
+            form_structure: Form structure with ``fields`` (and optional ``repeatable``)
+
+        Returns:
+            The compiled program
+        """
+        fields = [FieldRules.from_field(field) for field in form_structure.get('fields', [])]
+        for repeatable in form_structure.get('repeatable', []):
+            prefix = repeatable.get('name', '')
+            for sub_field in repeatable.get('repeatable', {}).get('fields', []):
+                name = f"{prefix}_{sub_field.get('name', sub_field.get('label', ''))}"
+                fields.append(FieldRules.from_field(sub_field, name))
+        return cls(fields)
+
+    def evaluate(self, df: pd.DataFrame, fields: Optional[Iterable[str]] = None,
+                 applicability: Optional[Dict[str, np.ndarray]] = None) -> ValidationResult:
+        """
+        Validate the frame in one pass over the rule-bearing columns.
+
+        Args:
+            df: Normalized submissions of the form
+            fields: Restrict to these fields (defaults to every compiled field present in ``df``)
+            applicability: Optional skip-logic masks; skipped rows are not validated
+
+        Returns:
+            The validation result
+        """
+        applicability = applicability or {}
+        result = ValidationResult(len(df))
+        names = self.fields if fields is None else [name for name in fields if name in self.fields]
+
+        for name in names:
+            if name not in df.columns:
+                continue
+            rules = self.fields[name]
+            applicable = applicability.get(name)
+            violations = rules.check(df[name], applicable)
+
+            invalid = np.zeros(len(df), dtype=bool)
+            counts = {}
+            for rule, mask in violations.items():
+                count = int(np.count_nonzero(mask))
+                if count:
+                    counts[rule] = count
+                    result.row_violations += mask
+                    invalid |= mask
+            result.field_violations[name] = counts
+            result.field_invalid[name] = int(np.count_nonzero(invalid))
+            result.field_checked[name] = len(df) if applicable is None else int(np.count_nonzero(applicable))
+        return result
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+"""
+Submission Warehouse
+====================
+
+Optional storage backend that keeps normalized submissions in a local SQLite
+database, so indicators are computed as SQL aggregates and pandas only sees
+the aggregated results.
+
+All forms share one ``submissions`` table; columns are added as new fields
+arrive and a small catalog records each form's columns and their kind
+(numeric, categorical). Every row also carries integer date keys derived
+once at load time: ``_ts`` (nanoseconds, wall time in the form's timezone),
+``_day`` (days since 1970-01-01) and ``_month`` (year * 100 + month). Indexes
+cover ``(form_id, _ts)`` and ``(form_id, field)`` for the commonly filtered
+fields, so date windows and equality filters are index range scans.
+Aggregates create the covering ``(form_id, ...)`` index they scan on first
+use (cube dimensions, numeric variables, day keys), so repeated indicator
+runs read indexes only and quartiles are two-row index lookups.
+
+Skip-logic applicability is evaluated while loading and stored per row
+(``_applicable:<field>``), which lets completeness be pushed down as well.
+
+Pushed-down aggregates:
+
+- row counts (optionally within date windows), completeness counts
+- group-by counts over any fields and the date keys (``day``, ``month``);
+  ``count_cube`` builds the template's count cube from one GROUP BY
+- numeric summaries: count, mean, exact quartiles, central moments
+  (std, skewness, kurtosis) and min/max
+- categorical summaries: distinct count, most common values and missing count
+
+Usage:
+    warehouse = SubmissionWarehouse('/var/lib/gconnector/warehouse.db')
+    warehouse.load('form1', df)
+    warehouse.count('form1', FilterPlan.from_parameters({'dateRange': 'last_30_days'}))
+    warehouse.group_counts('form1', ['region', 'month'])
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from count_cube import CountCube, DEFAULT_DIMENSIONS
+from filter_plan import FilterPlan
+from sketches import MomentSketch
+
+DEFAULT_INDEX_FIELDS = ('category', 'status', 'gender', 'region')
+APPLICABLE_PREFIX = '_applicable:'
+_NS_PER_DAY = 86400 * 10 ** 9
+
+Forms = Union[str, Sequence[str]]
+
+
+def _quote(name: str) -> str:
+    """Quote an identifier for SQLite."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sql_scalar(value: Any) -> Any:
+    """One answer as a value SQLite can bind (lists, dicts and other objects become text)."""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _sql_values(values: pd.Series) -> np.ndarray:
+    """Column values as an object array of SQLite-compatible Python scalars (None for missing)."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        numbers = values.to_numpy(dtype=float, na_value=np.nan)
+        result = numbers.astype(object)
+        result[np.isnan(numbers)] = None
+        return result
+    result = np.array([_sql_scalar(value) for value in values.astype(object).to_numpy()], dtype=object)
+    result[pd.isna(values).to_numpy()] = None
+    return result
+
+
+class SubmissionWarehouse:
+    """
+    Normalized submissions of many forms in one SQLite database.
+    """
+
+    def __init__(self, path: str = ':memory:', index_fields: Iterable[str] = DEFAULT_INDEX_FIELDS,
+                 date_column: str = 'submission_date', id_column: str = '_id', ignore_missing: bool = True):
+        """
+        Open (and create) the warehouse.
+
+        Args:
+            path: SQLite file (``:memory:`` for a private in-memory database)
+            index_fields: Commonly filtered or grouped fields, indexed as ``(form_id, field)``
+            date_column: Submission timestamp column of the loaded frames
+            id_column: Submission ID column; rows with an ID already stored replace it
+            ignore_missing: Filters on fields a form does not have are skipped for that form
+                (as the processor applies one plan to several forms); otherwise they select
+                none of its rows (as the output template does)
+        """
+        self.path = path
+        self.index_fields = list(index_fields)
+        self.date_column = date_column
+        self.id_column = id_column
+        self.ignore_missing = ignore_missing
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL' if path != ':memory:' else 'PRAGMA journal_mode=MEMORY')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS submissions '
+                '(form_id TEXT NOT NULL, _ts INTEGER, _day INTEGER, _month INTEGER)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS submissions_form_ts ON submissions (form_id, _ts)')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS catalog (form_id TEXT PRIMARY KEY, timezone TEXT, columns TEXT NOT NULL)'
+            )
+        self._table_columns = self._read_table_columns()
+        self._indexes = {row[1] for row in self._connection.execute('PRAGMA index_list(submissions)')}
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self) -> 'SubmissionWarehouse':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_table_columns(self) -> List[str]:
+        return [row[1] for row in self._connection.execute('PRAGMA table_info(submissions)')]
+
+    def _query(self, sql: str, parameters: Sequence[Any] = ()) -> List[Tuple]:
+        with self._lock:
+            return self._connection.execute(sql, list(parameters)).fetchall()
+
+    # Catalog
+
+    def forms(self) -> List[str]:
+        return [row[0] for row in self._query('SELECT form_id FROM catalog ORDER BY form_id')]
+
+    def columns(self, form_id: str) -> Dict[str, str]:
+        """Data columns of a form and their kind ('numeric' or 'categorical')."""
+        row = self._query('SELECT columns FROM catalog WHERE form_id = ?', (form_id,))
+        return json.loads(row[0][0]) if row else {}
+
+    def _timezone(self, form_id: str) -> Optional[str]:
+        row = self._query('SELECT timezone FROM catalog WHERE form_id = ?', (form_id,))
+        return row[0][0] if row else None
+
+    def schema_frame(self, form_id: str, date_column: Optional[str] = None) -> pd.DataFrame:
+        """Empty frame with the form's columns (and its date column), for output availability checks."""
+        columns = {name: pd.Series(dtype=float if kind == 'numeric' else object)
+                   for name, kind in self.columns(form_id).items()}
+        if self.date_range(form_id)[0] is not None:
+            columns[date_column or self.date_column] = pd.Series(dtype='datetime64[ns]')
+        return pd.DataFrame(columns)
+
+    # Loading
+
+    def _ensure_columns(self, names: Iterable[str]):
+        # Another connection may have added columns since this one last looked
+        self._table_columns = self._read_table_columns()
+        missing = [name for name in names if name not in self._table_columns]
+        for name in missing:
+            self._connection.execute(f'ALTER TABLE submissions ADD COLUMN {_quote(name)}')
+            self._table_columns.append(name)
+        for name in missing:
+            if name in self.index_fields:
+                self.ensure_index([name])
+            if name == self.id_column:
+                self._connection.execute(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS submissions_form_id ON submissions (form_id, {_quote(name)})'
+                )
+
+    def ensure_index(self, fields: Sequence[str]):
+        """Create the ``(form_id, *fields)`` index unless it exists (``month``/``day`` mean the date keys)."""
+        columns = ['_month' if field == 'month' else '_day' if field == 'day' else field for field in fields]
+        name = 'submissions_form_' + '_'.join(columns)
+        if name in self._indexes or not all(column in self._table_columns for column in columns):
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON submissions "
+                f"(form_id, {', '.join(_quote(column) for column in columns)})"
+            )
+        self._indexes.add(name)
+
+    def load(self, form_id: str, df: pd.DataFrame, applicability: Optional[Dict[str, np.ndarray]] = None,
+             replace: bool = False) -> int:
+        """
+        Store a form's normalized submissions.
+
+        Args:
+            form_id: The form ID
+            df: Normalized submissions
+            applicability: Skip-logic masks per field (stored so completeness can be pushed down)
+            replace: Drop the form's stored submissions first; otherwise rows are appended
+                (and rows whose ID is already stored replace the stored row)
+
+        Returns:
+            Number of rows stored
+        """
+        data_columns = [column for column in df.columns if column != self.date_column and column != 'form_id']
+        mask_columns = [APPLICABLE_PREFIX + field for field in (applicability or {}) if field in df.columns]
+        timezone = None
+
+        columns: Dict[str, np.ndarray] = {'form_id': np.full(len(df), form_id, dtype=object)}
+        if self.date_column in df.columns:
+            dates = pd.to_datetime(df[self.date_column])
+            if getattr(dates.dt, 'tz', None) is not None:
+                timezone = str(dates.dt.tz)
+                dates = dates.dt.tz_localize(None)
+            stamps = dates.to_numpy().astype('datetime64[ns]')
+            missing = np.isnat(stamps)
+            nanoseconds = stamps.astype(np.int64)
+            months = stamps.astype('datetime64[M]').astype(np.int64)
+            keys = {
+                '_ts': nanoseconds,
+                '_day': np.floor_divide(nanoseconds, _NS_PER_DAY),
+                '_month': (months // 12 + 1970) * 100 + months % 12 + 1
+            }
+            for name, values in keys.items():
+                values = values.astype(object)
+                values[missing] = None
+                columns[name] = values
+        for column in data_columns:
+            columns[column] = _sql_values(df[column])
+        for field, mask_column in zip([field for field in (applicability or {}) if field in df.columns], mask_columns):
+            columns[mask_column] = np.asarray(applicability[field], dtype=bool).astype(np.int64).astype(object)
+
+        kinds = self.columns(form_id) if not replace else {}
+        for column in data_columns:
+            kind = 'numeric' if pd.api.types.is_numeric_dtype(df[column]) and not pd.api.types.is_bool_dtype(df[column]) else 'categorical'
+            # A field stored as text in any load stays categorical
+            kinds[column] = 'categorical' if kinds.get(column) == 'categorical' else kind
+
+        names = list(columns)
+        statement = (
+            f"INSERT OR REPLACE INTO submissions ({', '.join(_quote(name) for name in names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+        with self._lock, self._connection:
+            self._ensure_columns(names)
+            if replace:
+                self._connection.execute('DELETE FROM submissions WHERE form_id = ?', (form_id,))
+            self._connection.executemany(statement, zip(*columns.values()))
+            self._connection.execute(
+                'INSERT OR REPLACE INTO catalog VALUES (?, ?, ?)',
+                (form_id, timezone or self._timezone(form_id), json.dumps(kinds))
+            )
+        return len(df)
+
+    def drop(self, form_id: str):
+        """Remove a form and its submissions."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM submissions WHERE form_id = ?', (form_id,))
+            self._connection.execute('DELETE FROM catalog WHERE form_id = ?', (form_id,))
+
+    # Predicates
+
+    def _bound(self, form_ids: List[str], value: Any) -> int:
+        """Nanosecond wall-time key of a date bound, in the forms' timezone."""
+        bound = pd.Timestamp(value)
+        if bound.tz is not None:
+            timezone = self._timezone(form_ids[0]) if len(form_ids) == 1 else None
+            bound = bound.tz_convert(timezone).tz_localize(None) if timezone else bound.tz_convert(None)
+        return int(bound.as_unit('ns').value)
+
+    def _where(self, form_id: Forms, plan: Optional[FilterPlan] = None, start: Any = None,
+               end: Any = None) -> Tuple[str, List[Any]]:
+        """WHERE clause (and its parameters) for forms, a filter plan and an extra [start, end) window."""
+        form_ids = [form_id] if isinstance(form_id, str) else list(form_id)
+        clauses = [f"form_id IN ({', '.join('?' for _ in form_ids)})"]
+        parameters: List[Any] = list(form_ids)
+        plan = plan or FilterPlan()
+        for lower in (plan.start, start):
+            if lower is not None:
+                clauses.append('_ts >= ?')
+                parameters.append(self._bound(form_ids, lower))
+        for upper in (plan.end, end):
+            if upper is not None:
+                clauses.append('_ts < ?')
+                parameters.append(self._bound(form_ids, upper))
+        for column, values in plan.filters.items():
+            lacking = [form for form in form_ids if column not in self.columns(form)]
+            if len(lacking) == len(form_ids):
+                if self.ignore_missing:
+                    continue
+                return '0', []
+            condition = f"{_quote(column)} IN ({', '.join('?' for _ in values)})"
+            if lacking and self.ignore_missing:
+                clauses.append(f"(form_id IN ({', '.join('?' for _ in lacking)}) OR {condition})")
+                parameters.extend(lacking)
+            else:
+                clauses.append(condition)
+            parameters.extend(values)
+        # Filtered counts and date windows scan one index
+        filtered = [column for column in plan.filters if column in self._table_columns]
+        if filtered:
+            self.ensure_index(filtered + ['_ts'])
+        return ' AND '.join(clauses), parameters
+
+    # Aggregates
+
+    def count(self, form_id: Forms, plan: Optional[FilterPlan] = None, start: Any = None, end: Any = None) -> int:
+        """Number of submissions (within the plan and the optional [start, end) window)."""
+        where, parameters = self._where(form_id, plan, start, end)
+        return int(self._query(f'SELECT COUNT(*) FROM submissions WHERE {where}', parameters)[0][0])
+
+    def completeness(self, form_id: str, variables: Iterable[str],
+                     plan: Optional[FilterPlan] = None) -> Dict[str, Tuple[int, int, int]]:
+        """
+        Completeness counts of the form's variables in one scan.
+
+        Returns:
+            Dict of variable -> (total, applicable, non-null and applicable) row counts
+        """
+        variables = [var for var in variables if var in self.columns(form_id)]
+        if not variables:
+            return {}
+        selects = ['COUNT(*)']
+        for var in variables:
+            mask = APPLICABLE_PREFIX + var
+            if mask in self._table_columns:
+                applicable = f'COALESCE({_quote(mask)}, 1)'
+                selects += [f'SUM({applicable})', f'SUM({applicable} * ({_quote(var)} IS NOT NULL))']
+            else:
+                selects += ['COUNT(*)', f'COUNT({_quote(var)})']
+        where, parameters = self._where(form_id, plan)
+        row = self._query(f"SELECT {', '.join(selects)} FROM submissions WHERE {where}", parameters)[0]
+        total = int(row[0])
+        return {
+            var: (total, int(row[1 + 2 * i] or 0), int(row[2 + 2 * i] or 0))
+            for i, var in enumerate(variables)
+        }
+
+    @staticmethod
+    def _group_expression(field: str) -> str:
+        if field == 'day':
+            return '_day'
+        if field == 'month':
+            return '_month'
+        return _quote(field)
+
+    def group_counts(self, form_id: Forms, by: Sequence[str], plan: Optional[FilterPlan] = None,
+                     start: Any = None, end: Any = None) -> pd.DataFrame:
+        """
+        Submission counts per combination of ``by`` values (missing values form their own group).
+
+        ``day`` and ``month`` group by the submission date and come back as
+        ``datetime.date`` objects and 'YYYY-MM' labels.
+
+        Returns:
+            DataFrame with the ``by`` columns and ``count``
+        """
+        by = list(by)
+        self.ensure_index(by)
+        where, parameters = self._where(form_id, plan, start, end)
+        present = [field for field in by if field in ('day', 'month') or field in self._table_columns]
+        expressions = [self._group_expression(field) for field in present]
+        select = ', '.join(expressions + ['COUNT(*)'])
+        group = f" GROUP BY {', '.join(expressions)}" if expressions else ''
+        rows = self._query(f'SELECT {select} FROM submissions WHERE {where}{group}', parameters)
+        frame = pd.DataFrame(rows, columns=present + ['count'])
+        for field in by:
+            if field not in present:
+                frame[field] = None
+        if 'day' in frame.columns:
+            days = frame['day'].to_numpy(dtype=float, na_value=np.nan)
+            frame['day'] = [
+                pd.Timestamp(int(day) * _NS_PER_DAY).date() if day == day else None for day in days
+            ]
+        if 'month' in frame.columns:
+            frame['month'] = [
+                f'{int(month) // 100:04d}-{int(month) % 100:02d}' if month is not None and month == month else None
+                for month in frame['month']
+            ]
+        if frame.empty:
+            frame['count'] = frame['count'].astype(np.int64)
+        return frame[by + ['count']]
+
+    def date_counts(self, form_id: Forms, freq: str = 'day', plan: Optional[FilterPlan] = None) -> pd.Series:
+        """Non-zero submission counts per ``day`` or ``month``, in date order."""
+        counts = self.group_counts(form_id, [freq], plan)
+        counts = counts[counts[freq].notna()].sort_values(freq)
+        return pd.Series(counts['count'].to_numpy(), index=pd.Index(counts[freq].tolist()))
+
+    def date_range(self, form_id: Forms, plan: Optional[FilterPlan] = None) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """First and last submission timestamps (wall time in the form's timezone)."""
+        where, parameters = self._where(form_id, plan)
+        first, last = self._query(f'SELECT MIN(_ts), MAX(_ts) FROM submissions WHERE {where}', parameters)[0]
+        timezone = self._timezone(form_id) if isinstance(form_id, str) else None
+
+        def timestamp(value):
+            if value is None:
+                return None
+            value = pd.Timestamp(int(value))
+            return value.tz_localize(timezone) if timezone else value
+
+        return timestamp(first), timestamp(last)
+
+    def now(self, form_id: str) -> pd.Timestamp:
+        """Current time comparable with the form's stored dates."""
+        timezone = self._timezone(form_id)
+        return pd.Timestamp.now(tz=timezone) if timezone else pd.Timestamp.now()
+
+    def mean(self, form_id: Forms, variable: str, plan: Optional[FilterPlan] = None,
+             start: Any = None, end: Any = None) -> float:
+        """Mean of a numeric variable (NaN when it has no values)."""
+        if variable not in self._table_columns:
+            return np.nan
+        where, parameters = self._where(form_id, plan, start, end)
+        value = self._query(f'SELECT AVG({_quote(variable)}) FROM submissions WHERE {where}', parameters)[0][0]
+        return float(value) if value is not None else np.nan
+
+    @staticmethod
+    def _covering(variable: str, plan: Optional[FilterPlan]) -> List[str]:
+        """Index fields answering a per-variable query without table lookups."""
+        fields = [variable]
+        if plan is not None:
+            fields += [column for column in plan.filters if column != variable]
+            if plan.start is not None or plan.end is not None:
+                fields.append('_ts')
+        return fields
+
+    def _quantile(self, column: str, where: str, parameters: List[Any], count: int, q: float) -> float:
+        """Quantile with linear interpolation (like pandas), reading at most two values."""
+        position = (count - 1) * q
+        lower = int(np.floor(position))
+        values = [row[0] for row in self._query(
+            f'SELECT {column} FROM submissions WHERE {where} AND {column} IS NOT NULL '
+            f'ORDER BY {column} LIMIT 2 OFFSET ?', parameters + [lower]
+        )]
+        if len(values) == 1 or position == lower:
+            return float(values[0])
+        return float(values[0] + (values[1] - values[0]) * (position - lower))
+
+    def numeric_summary(self, form_id: Forms, variable: str,
+                        plan: Optional[FilterPlan] = None) -> Optional[Dict[str, Any]]:
+        """
+        ``describe()`` statistics plus skewness and kurtosis of a numeric variable.
+
+        Quartiles are exact (two-row index or sort lookups); std, skewness and kurtosis use
+        the central moments from a second pass, with the same estimators as pandas.
+
+        Returns:
+            Dict with count, mean, std, min, 25%, 50%, 75%, max, skewness, kurtosis (NaN where
+            undefined), or None when the variable is not stored
+        """
+        if variable not in self._table_columns:
+            return None
+        self.ensure_index(self._covering(variable, plan))
+        column = _quote(variable)
+        where, parameters = self._where(form_id, plan)
+        count, mean, minimum, maximum = self._query(
+            f'SELECT COUNT({column}), AVG({column}), MIN({column}), MAX({column}) FROM submissions WHERE {where}',
+            parameters
+        )[0]
+        moments = MomentSketch()
+        if count:
+            m2, m3, m4 = self._query(
+                f'SELECT SUM(d * d), SUM(d * d * d), SUM(d * d * d * d) FROM '
+                f'(SELECT {column} - ? AS d FROM submissions WHERE {where} AND {column} IS NOT NULL)',
+                [mean] + parameters
+            )[0]
+            moments.count, moments.mean, moments.m2, moments.m3, moments.m4 = count, mean, m2, m3, m4
+            moments.min, moments.max = minimum, maximum
+
+        def defined(value: Optional[float]) -> float:
+            return float(value) if value is not None else np.nan
+
+        return {
+            'count': int(count),
+            'mean': defined(mean),
+            'std': defined(moments.std),
+            'min': defined(minimum),
+            '25%': self._quantile(column, where, parameters, count, 0.25) if count else np.nan,
+            '50%': self._quantile(column, where, parameters, count, 0.5) if count else np.nan,
+            '75%': self._quantile(column, where, parameters, count, 0.75) if count else np.nan,
+            'max': defined(maximum),
+            'skewness': defined(moments.skewness),
+            'kurtosis': defined(moments.kurtosis)
+        }
+
+    def categorical_summary(self, form_id: Forms, variable: str, plan: Optional[FilterPlan] = None,
+                            top: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        Distinct count, most common values and missing count of a variable (exact).
+
+        Returns:
+            Summary in the ``value_counts()`` based format, or None when the variable is not stored
+        """
+        if variable not in self._table_columns:
+            return None
+        self.ensure_index(self._covering(variable, plan))
+        column = _quote(variable)
+        where, parameters = self._where(form_id, plan)
+        unique_values, missing_count = self._query(
+            f'SELECT COUNT(DISTINCT {column}), COUNT(*) - COUNT({column}) FROM submissions WHERE {where}', parameters
+        )[0]
+        most_common = self._query(
+            f'SELECT {column}, COUNT(*) AS n FROM submissions WHERE {where} AND {column} IS NOT NULL '
+            f'GROUP BY {column} ORDER BY n DESC, {column} LIMIT ?', parameters + [top]
+        )
+        return {
+            'type': 'categorical',
+            'unique_values': int(unique_values),
+            'most_common': {value: int(count) for value, count in most_common},
+            'missing_count': int(missing_count)
+        }
+
+    def count_cube(self, form_id: Forms, dimensions: Optional[Sequence[str]] = None,
+                   plan: Optional[FilterPlan] = None) -> CountCube:
+        """
+        The template's count cube, built from one GROUP BY over its dimensions.
+
+        Args:
+            form_id: Form(s) to count
+            dimensions: Cube dimensions (defaults to the DEFAULT_DIMENSIONS the form has;
+                ``month`` when it has submission dates)
+            plan: Filters and date range
+
+        Returns:
+            The cube
+        """
+        if dimensions is None:
+            stored = set()
+            for form in ([form_id] if isinstance(form_id, str) else form_id):
+                stored |= set(self.columns(form))
+            has_dates = self.date_range(form_id)[0] is not None
+            dimensions = [
+                dimension for dimension in DEFAULT_DIMENSIONS
+                if dimension in stored or (dimension == 'month' and has_dates)
+            ]
+        grouped = self.group_counts(form_id, dimensions, plan)
+        if 'month' in grouped.columns:
+            grouped = grouped.rename(columns={'month': '_month'})
+        return CountCube.build(grouped, dimensions, weights=grouped['count'].to_numpy(dtype=np.float64))
+
+    def frame(self, form_id: Forms, columns: Sequence[str], plan: Optional[FilterPlan] = None,
+              date_column: Optional[str] = None) -> pd.DataFrame:
+        """
+        Rows of selected columns, for outputs that need row-level values (e.g. map points).
+
+        The date column (``date_column`` or the warehouse's) is rebuilt from ``_ts`` when requested.
+        """
+        date_column = date_column or self.date_column
+        stored = [column for column in columns if column in self._table_columns and column != date_column]
+        selects = [_quote(column) for column in stored]
+        names = list(stored)
+        if date_column in columns:
+            selects.append('_ts')
+            names.append(date_column)
+        where, parameters = self._where(form_id, plan)
+        rows = self._query(f"SELECT {', '.join(selects) or 'COUNT(*)'} FROM submissions WHERE {where}", parameters)
+        frame = pd.DataFrame(rows, columns=names) if names else pd.DataFrame(index=range(rows[0][0]))
+        if date_column in names:
+            dates = pd.to_datetime(frame[date_column], unit='ns')
+            timezone = self._timezone(form_id) if isinstance(form_id, str) else None
+            frame[date_column] = dates.dt.tz_localize(timezone) if timezone else dates
+        return frame